@@ -2,17 +2,47 @@
 import os
 import time
 import hashlib
-from datetime import datetime
+from datetime import datetime, timedelta
 import pickle
+import threading
+from urllib.parse import quote
+import numpy as np
 import pandas as pd
 import json
-import requests
 import lightgbm as lgb
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, url_for
 import osmnx as ox
 import networkx as nx
 from sklearn.model_selection import train_test_split
 from s3download import download_from_s3
+from weights import (
+    constant_features,
+    build_feature_matrix,
+    predict_edge_weights,
+    WeightTable,
+    compute_weight_slice,
+    compute_weight_slices,
+    hour_of_week,
+    classify_weather
+)
+from graph_store import load_graph_store
+from routing import RoutingGraph, ALGORITHMS
+from matrix import TravelTimeMatrix, MATRIX_MAX_CELLS
+from departures import sweep_departures, SWEEP_MAX_HOURS, SWEEP_DEFAULT_HOURS
+from contraction import load_hierarchies
+from route_cache import RouteCache, ttl_for_weight_key, cacheable_route, cached_route
+from spatial import load_or_build_spatial_index
+from incidents import IncidentStore, INCIDENT_RADIUS_M, INCIDENT_DEFAULT_TTL
+from route_format import compact_route, negotiate_encoding, compress, COMPRESS_MIN_BYTES
+from heatmap import load_or_build_heatmap
+from state_stats import StateStats, StateShapes
+from congestion_tiles import (CongestionTiles, CONGESTION_TILE_MIN_ZOOM, CONGESTION_TILE_MAX_ZOOM,
+                              CONGESTION_TILE_EXTENT, CONGESTION_CLASSES)
+from geocoder import LocalGeocoder, normalize_address
+from node_store import NodeStore
+from weather import WeatherProvider
+from forecast_scheduler import ForecastScheduler
+from startup import StartupStages
 
 # Flask app setup
 app = Flask(__name__)
@@ -21,12 +51,80 @@ app = Flask(__name__)
 MODEL = None
 GRAPH = None
 X_COLUMNS = None
+WEIGHT_TABLE = None
+EDGES = None
+EDGE_FEATURES = None
+ROUTER = None
+SPATIAL_INDEX = None
+LOCAL_GEOCODER = None
+WEATHER_PROVIDER = None
+FORECAST_SCHEDULER = None
+INCIDENTS = None
+HEATMAP = None
+STATE_STATS = None
+STATE_SHAPES = None
+CONGESTION_TILES = None
+# (hour, weights, weight key) of the weight slice the congestion overlay shows
+CONGESTION_SLICE = None
+CONGESTION_SLICE_LOCK = threading.Lock()
 INITIALIZATION_COMPLETE = False
 INITIALIZATION_ERROR = None
+STARTUP = None
+
+# Stages that must finish before routes are served (the rest only add speedups)
+ROUTING_STAGES = ('model', 'graph', 'geocoder', 'node_store', 'edge_weights', 'router', 'spatial_index', 'route_cache')
+
+# Endpoints that can serve before the routing stages are ready
+ENDPOINT_STAGES = {
+    'get_data': ('data_files',),
+    'get_heatmap': ('data_files', 'heatmap'),
+    'get_state_stats': ('data_files', 'state_stats'),
+    'get_state_shapes': ('data_files', 'state_stats'),
+    'congestion_tiles_info': ROUTING_STAGES + ('congestion_tiles',),
+    'get_congestion_tile': ROUTING_STAGES + ('congestion_tiles',),
+    'get_weather': ('weather',),
+    'forecast_status': ('weather', 'forecast_scheduler')
+}
+
+# Downloaded artifacts the app can rebuild itself: failing to sync them is only a warning
+REBUILDABLE_ARTIFACTS = {
+    'traffic_model.txt': 'trained from the dataset',
+    'x_columns.json': 'trained from the dataset',
+    'nyc_graph.pkl': 'downloaded from OpenStreetMap',
+    'edge_weights.pkl': 'recomputed from the model'
+}
+
+# Search algorithm used when a route request does not choose one
+DEFAULT_ROUTING_ALGORITHM = 'bidirectional'
+
+# Whether routes price each edge at the hour the trip reaches it, unless a request says otherwise
+DEFAULT_TIME_DEPENDENT = False
+
+# Most routes (best plus alternatives) returned for one /api/route request
+MAX_ROUTE_ALTERNATIVES = 5
+
+# Route response formats: per-edge dicts, or a polyline with per-edge column arrays
+ROUTE_FORMATS = ('full', 'compact')
+
+# Largest number of routes accepted in one /api/routes/batch request
+BATCH_MAX_ROUTES = 1000
+
+# Seconds browsers may reuse heatmap bins before revalidating them by ETag
+HEATMAP_MAX_AGE = 3600
+
+# Seconds browsers may reuse a year's state counts before revalidating them by ETag
+STATE_STATS_MAX_AGE = 3600
+
+# Seconds browsers may reuse the simplified state boundaries (their URL carries the version)
+STATE_SHAPES_MAX_AGE = 30 * 24 * 3600
+
+# Seconds browsers may reuse a congestion tile before revalidating it by ETag (incidents change tiles)
+CONGESTION_TILE_MAX_AGE = 300
 
 # Cache structures
-NODE_CACHE = {}
-ROUTE_CACHE = {}
+NODE_STORE = None
+LOCATION_CACHE = {}
+ROUTE_CACHE = None
 
 # Stats tracking
 PERF_STATS = {
@@ -36,61 +134,23 @@ PERF_STATS = {
     'cache_misses': 0
 }
 
-def normalize_address(address):
-    """Normalize address format for consistent lookup"""
-    if not address:
-        return ""
-    address = address.lower().strip()
-    address = ' '.join(address.split())
-    replacements = {
-        'street': 'st',
-        'avenue': 'ave',
-        'boulevard': 'blvd',
-        'drive': 'dr',
-        'road': 'rd',
-        'place': 'pl',
-        'lane': 'ln',
-        'court': 'ct',
-        'new york': 'ny',
-        'new york city': 'nyc'
-    }
-    for full, abbr in replacements.items():
-        address = address.replace(f" {full} ", f" {abbr} ")
-        address = address.replace(f" {full},", f" {abbr},")
-    return address
-
 def get_time_key(dt=None):
     """Create time key for caching"""
     if dt is None:
         dt = datetime.now()
     return dt.strftime('%Y%m%d_%H%M')
 
-def fetch_current_weather_nyc():
-    """Get NYC weather data"""
-    try:
-        lat, lon = 40.7128, -74.0060
-        url = f'https://api.weather.gov/points/{lat},{lon}'
-        response = requests.get(url)
-        response.raise_for_status()
-        forecast_url = response.json()['properties']['forecastHourly']
-        
-        forecast_response = requests.get(forecast_url)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
-        next_hour = forecast_data['properties']['periods'][0]
-
-        weather_features = {
-            'Temperature(F)': next_hour['temperature'],
-            'WindSpeed(mph)': int(next_hour['windSpeed'].split()[0]),
-            'Weather_Conditions': next_hour['shortForecast'],
-            'Humidity(%)': 50,
-            'Visibility(mi)': 10,
-            'Precipitation(in)': 0
-        }
-        return weather_features
-    except Exception as e:
-        print(f"Error fetching weather data: {e}")
+def weather_stamp(weather):
+    """Short hash of the weather values a weight slice is predicted from"""
+    values = ','.join(f"{name}={weather[name]!r}" for name in sorted(weather))
+    return hashlib.md5(values.encode()).hexdigest()[:8]
+
+def fetch_current_weather_nyc(route_datetime=None):
+    """Get NYC weather data from the cached forecast, for route_datetime's hour if it is covered"""
+    if WEATHER_PROVIDER is None:
         return None
+    weather = WEATHER_PROVIDER.forecast_for(route_datetime) if route_datetime else None
+    return weather or WEATHER_PROVIDER.current()
 
 def get_nyc_graph():
     """Get NYC road network graph"""
@@ -118,37 +178,63 @@ def get_nyc_graph():
         print(f"Error getting NYC graph: {e}")
         raise
 
+def geocode_address(address):
+    """Geocode address to (lat, lng), preferring the local street-name index"""
+    cache_key = hashlib.md5(normalize_address(address).encode()).hexdigest()
+    
+    if cache_key in LOCATION_CACHE:
+        return LOCATION_CACHE[cache_key]
+    
+    if LOCAL_GEOCODER is not None:
+        match = LOCAL_GEOCODER.resolve(address)
+        if match:
+            LOCATION_CACHE[cache_key] = (match['lat'], match['lng'])
+            return LOCATION_CACHE[cache_key]
+    
+    address_with_nyc = address + ', New York City'
+    coords = ox.geocoder.geocode(address_with_nyc)
+    LOCATION_CACHE[cache_key] = coords
+    return coords
+
+def nearest_graph_node(G, lat, lng):
+    """Nearest graph node to a point, using the spatial index for the shared graph"""
+    if G is GRAPH and SPATIAL_INDEX is not None:
+        index, _ = SPATIAL_INDEX.nearest_node(lat, lng)
+        return ROUTER.node_id(index)
+    return ox.distance.nearest_nodes(G, lng, lat)
+
 def find_nearest_node(G, address):
     """Find nearest node to address"""
     normalized_address = normalize_address(address)
     cache_key = hashlib.md5(normalized_address.encode()).hexdigest()
     
-    if cache_key in NODE_CACHE:
+    cached_node = NODE_STORE.get(cache_key) if G is GRAPH and NODE_STORE is not None else None
+    if cached_node is not None:
         print(f"Node cache hit for '{address}'")
-        return NODE_CACHE[cache_key]
+        return cached_node
     
     print(f"Node cache miss for '{address}', geocoding...")
     
     try:
-        address_with_nyc = address + ', New York City'
-        coords = ox.geocoder.geocode(address_with_nyc)
-        
-        node_id = ox.distance.nearest_nodes(G, coords[1], coords[0])
-        
-        NODE_CACHE[cache_key] = node_id
+        match = LOCAL_GEOCODER.resolve(address) if G is GRAPH and LOCAL_GEOCODER is not None else None
+        if match:
+            print(f"Resolved '{address}' locally to {match['streets'][0]} & {match['streets'][1]}")
+            node_id = match['node']
+            coords = (match['lat'], match['lng'])
+        else:
+            coords = geocode_address(address)
+            node_id = nearest_graph_node(G, coords[0], coords[1])
         
-        cache_path = 'static/models/node_cache.pkl'
-        if len(NODE_CACHE) % 10 == 0:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(NODE_CACHE, f)
+        if G is GRAPH and NODE_STORE is not None:
+            NODE_STORE.put(cache_key, node_id, coords[0], coords[1])
         
         return node_id
     except Exception as e:
         print(f"Error finding nearest node for '{address}': {e}")
         raise
 
-def calculate_edge_weights(G, model, current_weather, X_columns, force_recalculate=False, route_datetime=None):
-    """Calculate edge weights for routing"""
+def calculate_edge_weights(store, model, current_weather, X_columns, force_recalculate=False, route_datetime=None):
+    """Calculate default edge weights into the graph store"""
     t_start = time.time()
     
     now = route_datetime if route_datetime else datetime.now()
@@ -161,13 +247,9 @@ def calculate_edge_weights(G, model, current_weather, X_columns, force_recalcula
             with open(edge_weights_path, 'rb') as f:
                 edge_weights = pickle.load(f)
                 
-            weight_count = 0
-            for u, v, key, weight in edge_weights:
-                if u in G and v in G and key in G[u][v]:
-                    G.edges[u, v, key]['weight'] = weight
-                    weight_count += 1
+            weight_count = store.apply_edge_weights(edge_weights, os.path.getmtime(edge_weights_path))
             
-            print(f"Applied {weight_count} cached edge weights to the graph in {time.time() - t_start:.2f}s.")
+            print(f"Stored {weight_count} cached edge weights in the graph store in {time.time() - t_start:.2f}s.")
             PERF_STATS['cache_hits'] += 1
             return True
         except Exception as e:
@@ -177,165 +259,152 @@ def calculate_edge_weights(G, model, current_weather, X_columns, force_recalcula
     else:
         PERF_STATS['cache_misses'] += 1
     
+    if current_weather is None:
+        print("No weather data available. Edge weights not calculated.")
+        return False
+    
     print(f"Calculating edge weights (this may take some time)...")
     
-    edge_weights = []
-    for u, v, key, data in G.edges(keys=True, data=True):
-        edge_features = {
-            'Severity': 2,
-            'Start_Lat': data.get('y', 40.7128),
-            'Start_Lng': data.get('x', -74.0060),
-            'Distance(mi)': data.get('length', 100)/1609.34,
-            'Temperature(F)': current_weather['Temperature(F)'],
-            'Humidity(%)': current_weather['Humidity(%)'],
-            'Visibility(mi)': current_weather['Visibility(mi)'],
-            'WindSpeed(mph)': current_weather['WindSpeed(mph)'],
-            'Precipitation(in)': current_weather['Precipitation(in)'],
-            'Start_Hour': now.hour,
-            'Start_Minute': now.minute,
-            'Start_Day': now.day,
-            'Start_Month': now.month,
-            'Start_DayOfWeek': now.weekday(),
-            'Duration_min': 10,
-            'DelayFromFreeFlowSpeed(mins)': 0
-        }
-
-        current_condition = current_weather['Weather_Conditions']
-        for col in X_columns[X_columns.str.startswith('Weather_Conditions_')]:
-            condition_name = col.split('_')[-1]
-            edge_features[col] = int(condition_name in current_condition)
-
-        features_df = pd.DataFrame([edge_features])[X_columns]
+    constants = constant_features(current_weather, now, X_columns)
+    X = build_feature_matrix(store.edge_columns(), constants, X_columns)
 
-        predicted_delay = max(model.predict(features_df)[0], 0.1)
-        G.edges[u, v, key]['weight'] = predicted_delay
-        
-        edge_weights.append((u, v, key, predicted_delay))
+    predicted = predict_edge_weights(model, X)
     
     total_time = time.time() - t_start
     PERF_STATS['edge_weight_calculation_time'].append(total_time)
     print(f"Edge weights calculated in {total_time:.2f}s.")
     
     try:
+        edge_weights = [(u, v, key, weight) for (u, v, key), weight in zip(store.edge_list(), predicted.tolist())]
         os.makedirs('static/models', exist_ok=True)
         with open(edge_weights_path, 'wb') as f:
             pickle.dump(edge_weights, f)
+        store.set_weights(predicted, os.path.getmtime(edge_weights_path))
         print(f"Cached {len(edge_weights)} edge weights for future use.")
         return True
     except Exception as e:
         print(f"Error caching edge weights: {e}")
+        store.set_weights(predicted)
         return False
 
-def find_optimal_route(start_location, end_location, G, route_datetime=None):
-    """Find optimal route between locations"""
+def find_optimal_route(start_location, end_location, G, route_datetime=None, weights=None, weight_key=None,
+                       algorithm=DEFAULT_ROUTING_ALGORITHM, snap=False, alternatives=1, time_dependent=False):
+    """Find optimal route between locations, optionally overlaying a per-edge weight source
+
+    With snap=True the route starts and ends on the closest street to each
+    location rather than at the closest intersection. With alternatives > 1
+    up to that many diverse routes are found by the penalty method; the
+    best is returned as usual and the rest under 'alternatives'. Snapping
+    does not apply to alternatives, and snapped routes are always found by
+    Dijkstra's algorithm: the search info names the algorithm that ran,
+    plus the requested one when they differ.
+
+    With time_dependent=True the fastest route from route_datetime is found
+    with each edge priced at the hour the trip reaches it, from the weight
+    slices of the following hours; weights, algorithm, snap and
+    alternatives are ignored.
+
+    Routes served from the cache are copies whose search info is just
+    {'cached': True}, whichever algorithm was asked for.
+    """
     t_start = time.time()
     
     try:
         time_key = get_time_key(route_datetime) if route_datetime else 'default'
         
-        start_norm = normalize_address(start_location)
-        end_norm = normalize_address(end_location)
-        
-        cache_key = f"{start_norm}:{end_norm}:{time_key}"
-        route_cache_path = 'static/models/route_cache.pkl'
-        
-        if os.path.exists(route_cache_path):
-            try:
-                with open(route_cache_path, 'rb') as f:
-                    route_cache = pickle.load(f)
-                    
-                    if cache_key in route_cache:
-                        print(f"Route cache hit for {start_location} to {end_location} at {time_key}")
-                        PERF_STATS['cache_hits'] += 1
-                        return route_cache[cache_key]
-            except Exception as e:
-                print(f"Error reading route cache: {e}")
-        
-        PERF_STATS['cache_misses'] += 1
-        print(f"Route cache miss for {start_location} to {end_location}")
-        
         print(f"Finding route from '{start_location}' to '{end_location}'")
         
-        start_node = find_nearest_node(G, start_location)
-        end_node = find_nearest_node(G, end_location)
+        router = ROUTER if G is GRAPH and ROUTER is not None else RoutingGraph.from_graph(G)
+        snap = snap and G is GRAPH and SPATIAL_INDEX is not None and alternatives == 1 and not time_dependent
         
-        print(f"Start node: {start_node}, End node: {end_node}")
+        if snap:
+            start_snap = SPATIAL_INDEX.nearest_arc(router, *geocode_address(start_location))
+            end_snap = SPATIAL_INDEX.nearest_arc(router, *geocode_address(end_location))
+            if start_snap is None or end_snap is None:
+                print("Could not snap onto a street; routing between the nearest intersections instead.")
+                snap = False
+        if snap:
+            start_key = ('arc', start_snap['arc'], round(start_snap['fraction'], 3))
+            end_key = ('arc', end_snap['arc'], round(end_snap['fraction'], 3))
+            print(f"Start snapped {start_snap['distance']:.0f}m onto arc {start_snap['arc']}, "
+                  f"end snapped {end_snap['distance']:.0f}m onto arc {end_snap['arc']}")
+        else:
+            start_key = find_nearest_node(G, start_location)
+            end_key = find_nearest_node(G, end_location)
+            print(f"Start node: {start_key}, End node: {end_key}")
         
-        try:
-            route = nx.dijkstra_path(G, start_node, end_node, weight='weight')
-        except nx.NetworkXNoPath:
-            route = nx.astar_path(G, start_node, end_node, heuristic=None, weight='weight')
+        cacheable = ROUTE_CACHE is not None and G is GRAPH and (weights is None or weight_key is not None)
+        if time_dependent:
+            departure_hour = route_datetime.replace(minute=0, second=0, microsecond=0)
+            hour_slices = {}
+            def hour_weights(i):
+                if i not in hour_slices:
+                    hour_slices[i] = select_weight_slice(departure_hour + timedelta(hours=i))
+                return hour_slices[i]
+            weights, weight_key = hour_weights(0)
         
-        edges = []
-        total_distance = 0
-        total_base_time = 0
-        total_congestion_effect = 0
+        cache_key = (start_key, end_key, weight_key or 'default')
+        if time_dependent:
+            # Later hours' slices are picked during the search, so key on the departure they follow from
+            cache_key += ('time_dependent', route_datetime.strftime('%Y-%m-%dT%H:%M'))
+        elif alternatives > 1:
+            cache_key += (alternatives,)
+        if cacheable:
+            cached = ROUTE_CACHE.get(cache_key)
+            if cached is not None:
+                print(f"Route cache hit for {start_location} to {end_location} at {time_key}")
+                PERF_STATS['cache_hits'] += 1
+                return cached_route(cached)
         
-        for i in range(len(route) - 1):
-            u, v = route[i], route[i + 1]
-            
-            edge_data = None
-            
-            for key in G[u][v]:
-                if edge_data is None or G[u][v][key]['weight'] < edge_data['weight']:
-                    edge_data = G[u][v][key]
-            
-            if edge_data:
-                distance_mi = edge_data.get('length', 0) / 1609.34
-                
-                base_time = distance_mi * (60 / 25)
-                
-                congestion_factor = edge_data['weight']
-                
-                congestion_multiplier = 1.0 + (congestion_factor * 0.5)
-                actual_time = base_time * congestion_multiplier
-                
-                congestion_impact = actual_time - base_time
-                
-                total_distance += distance_mi
-                total_base_time += base_time
-                total_congestion_effect += congestion_impact
-                
-                congestion_level = min(1.0, congestion_factor / 3.0)
-                
-                edges.append({
-                    'start': (G.nodes[u]['y'], G.nodes[u]['x']),
-                    'end': (G.nodes[v]['y'], G.nodes[v]['x']),
-                    'distance': distance_mi,
-                    'base_time': base_time,
-                    'actual_time': actual_time,
-                    'congestion_impact': congestion_impact,
-                    'congestion_level': congestion_level
-                })
-        
-        route_coords = [(G.nodes[node]['y'], G.nodes[node]['x']) for node in route]
-        
-        total_estimated_time = total_base_time + total_congestion_effect
-        
-        result = {
-            'route_nodes': route,
-            'route_coords': route_coords,
-            'edges': edges,
-            'estimated_travel_time': round(total_estimated_time, 1),
-            'base_travel_time': round(total_base_time, 1),
-            'congestion_delay': round(total_congestion_effect, 1),
-            'distance_miles': round(total_distance, 1),
-            'route_length': len(route)
+        PERF_STATS['cache_misses'] += 1
+        print(f"Route cache miss for {start_location} to {end_location}")
+        
+        t_search = time.time()
+        delay_version = router.delay_version
+        if time_dependent:
+            path = router.time_dependent_path(start_key, end_key, hour_weights, start_minute=route_datetime.minute)
+        elif alternatives > 1:
+            paths = router.alternative_paths(start_key, end_key, k=alternatives, weights=weights, key=weight_key)
+            path = paths[0]
+        elif snap:
+            path = router.shortest_path_between(start_snap, end_snap, weights=weights, key=weight_key)
+        else:
+            path = router.shortest_path(start_key, end_key, weights=weights, key=weight_key, algorithm=algorithm)
+        search_time = time.time() - t_search
+        result = router.route_summary(path)
+        result['search'] = {
+            'algorithm': path['algorithm'],
+            'settled_nodes': path['settled'],
+            'search_time_ms': round(search_time * 1000, 1)
         }
+        print(f"{path['algorithm']} search settled {path['settled']} nodes in {search_time * 1000:.1f}ms.")
+        if not time_dependent and alternatives == 1 and path['algorithm'] != algorithm:
+            result['search']['requested_algorithm'] = algorithm
+        if time_dependent:
+            result['search']['hourly_slices'] = path['hours']
+        elif alternatives > 1:
+            result['search']['search_time_ms'] = round(path['search_ms'], 1)
+            result['alternatives'] = []
+            for alternative in paths[1:]:
+                summary = router.route_summary(alternative)
+                summary['stretch'] = round(alternative['stretch'], 3)
+                summary['overlap'] = round(alternative['overlap'], 3)
+                summary['search'] = {
+                    'algorithm': alternative['algorithm'],
+                    'settled_nodes': alternative['settled'],
+                    'search_time_ms': round(alternative['search_ms'], 1)
+                }
+                result['alternatives'].append(summary)
+            print(f"Found {len(paths) - 1} alternative routes; "
+                  f"search ms per route: {[round(p['search_ms'], 1) for p in paths]}")
         
-        try:
-            route_cache = {}
-            if os.path.exists(route_cache_path):
-                with open(route_cache_path, 'rb') as f:
-                    route_cache = pickle.load(f)
-            
-            route_cache[cache_key] = result
-            
-            with open(route_cache_path, 'wb') as f:
-                pickle.dump(route_cache, f)
+        # Routes found under incident delays are transient; one that raced a delay change is not cached
+        if cacheable and router.delay_version == delay_version:
+            ttl = ttl_for_weight_key(weight_key)
+            if time_dependent:
+                ttl = min(ttl_for_weight_key(key) for _, key in hour_slices.values())
+            ROUTE_CACHE.put(cache_key, cacheable_route(result), ttl, transient=router.delayed_edges > 0)
             print(f"Route cached for future use with key: {cache_key}")
-        except Exception as e:
-            print(f"Error caching route result: {e}")
         
         total_time = time.time() - t_start
         PERF_STATS['route_calculation_time'].append(total_time)
@@ -348,6 +417,165 @@ def find_optimal_route(start_location, end_location, G, route_datetime=None):
         traceback.print_exc()
         raise
 
+def parse_route_datetime(date, time_str):
+    """Departure datetime from 'YYYY-MM-DD' and 'HH:MM' request fields"""
+    dt_parts = date.split('-')
+    time_parts = time_str.split(':')
+    return datetime(int(dt_parts[0]), int(dt_parts[1]), int(dt_parts[2]), int(time_parts[0]), int(time_parts[1]))
+
+def find_weight_slice(route_datetime, weather):
+    """(weights, weight_key) of a precomputed or cached slice for a departure; weights is None when it must be computed"""
+    hour = hour_of_week(route_datetime)
+    weather_class = classify_weather(weather['Weather_Conditions'], X_COLUMNS)
+    forecast_slice = FORECAST_SCHEDULER.lookup(route_datetime) if FORECAST_SCHEDULER is not None else None
+    if forecast_slice is not None:
+        print(f"Using precomputed forecast weight slice")
+        return forecast_slice
+    weight_slice = WEIGHT_TABLE.get_slice(hour, weather_class) if WEIGHT_TABLE is not None else None
+    if weight_slice is not None:
+        print(f"Using precomputed weight slice")
+        return weight_slice, f"table:{hour}:{weather_class}"
+    weight_key = f"forecast:{get_time_key(route_datetime)}:{weather_class}:{weather_stamp(weather)}"
+    weight_slice = ROUTER.cached_weights(weight_key) if ROUTER is not None else None
+    if weight_slice is not None:
+        print(f"Using cached weight slice")
+    return weight_slice, weight_key
+
+def select_weight_slice(route_datetime):
+    """(weights, weight_key) for a departure time: forecast slice, weight table slice or computed on demand
+
+    Returns (None, None) when no weather is available, i.e. the default weights.
+    """
+    weather = fetch_current_weather_nyc(route_datetime)
+    if not weather:
+        print("Could not fetch weather. Using previously calculated weights.")
+        return None, None
+    weight_slice, weight_key = find_weight_slice(route_datetime, weather)
+    if weight_slice is not None:
+        return weight_slice, weight_key
+    print(f"No precomputed weight slice found, calculating...")
+    t_calc = time.time()
+    weight_slice = compute_weight_slice(EDGE_FEATURES, MODEL, weather, X_COLUMNS, route_datetime)
+    PERF_STATS['edge_weight_calculation_time'].append(time.time() - t_calc)
+    return weight_slice, weight_key
+
+def select_weight_slices(route_datetimes):
+    """select_weight_slice for several departure times, predicting every missing slice in one batched pass"""
+    slices = []
+    missing = {}
+    for route_datetime in route_datetimes:
+        weather = fetch_current_weather_nyc(route_datetime)
+        if not weather:
+            slices.append((None, None))
+            continue
+        weight_slice, weight_key = find_weight_slice(route_datetime, weather)
+        if weight_slice is None:
+            missing.setdefault(weight_key, (weather, route_datetime))
+        slices.append((weight_slice, weight_key))
+    if missing:
+        print(f"Calculating {len(missing)} missing weight slices...")
+        t_calc = time.time()
+        computed = dict(zip(missing, compute_weight_slices(EDGE_FEATURES, MODEL, list(missing.values()), X_COLUMNS)))
+        PERF_STATS['edge_weight_calculation_time'].append(time.time() - t_calc)
+        slices = [(computed[key], key) if weights is None and key is not None else (weights, key) for weights, key in slices]
+    return slices
+
+def batch_routes(entries):
+    """Route a batch of {start, end, date, time} entries, yielding (index, result) as each is found
+
+    Every distinct address is resolved once and every distinct departure
+    time is mapped to its weight slice once. Entries are then grouped by
+    (weight slice, start node), and each group is answered from one
+    single-source search that stops when all of its destinations are settled.
+    """
+    stats = {'routes': len(entries), 'addresses': 0, 'slices': 0, 'searches': 0, 'cache_hits': 0}
+    departures = {}
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get('start') or not entry.get('end'):
+            yield i, {"success": False, "error": "Start and End locations are required."}
+            continue
+        date, time_str = entry.get('date'), entry.get('time')
+        if date and time_str:
+            try:
+                departures[i] = parse_route_datetime(date, time_str)
+            except (ValueError, IndexError):
+                yield i, {"success": False, "error": f"Invalid date/time '{date} {time_str}'."}
+        else:
+            departures[i] = None
+
+    nodes = {}
+    for i in departures:
+        for address in (entries[i]['start'], entries[i]['end']):
+            if address not in nodes:
+                try:
+                    nodes[address] = find_nearest_node(GRAPH, address)
+                except Exception as e:
+                    print(f"Geocoding error in batch for '{address}': {e}")
+                    nodes[address] = None
+    stats['addresses'] = len(nodes)
+
+    slices = {}
+    groups = {}
+    for i, route_datetime in departures.items():
+        start, end = entries[i]['start'], entries[i]['end']
+        bad = [address for address in (start, end) if nodes[address] is None]
+        if bad:
+            yield i, {"success": False, "error": f"Could not understand location '{bad[0]}'."}
+            continue
+        if route_datetime not in slices:
+            slices[route_datetime] = select_weight_slice(route_datetime) if route_datetime else (None, None)
+        weights, weight_key = slices[route_datetime]
+        groups.setdefault((weight_key, nodes[start]), (weights, []))[1].append((i, nodes[end]))
+    stats['slices'] = len(set(key for _, key in slices.values()))
+
+    router = ROUTER if ROUTER is not None else RoutingGraph.from_graph(GRAPH)
+    for (weight_key, start_node), (weights, members) in groups.items():
+        misses = []
+        for i, end_node in members:
+            cache_key = (start_node, end_node, weight_key or 'default')
+            cached = ROUTE_CACHE.get(cache_key) if ROUTE_CACHE is not None else None
+            if cached is not None:
+                PERF_STATS['cache_hits'] += 1
+                stats['cache_hits'] += 1
+                yield i, {"success": True, "route": cached_route(cached)}
+            else:
+                PERF_STATS['cache_misses'] += 1
+                misses.append((i, end_node))
+        if not misses:
+            continue
+
+        t_search = time.time()
+        delay_version = router.delay_version
+        paths = router.shortest_paths_from(start_node, [end_node for _, end_node in misses],
+                                           weights=weights, key=weight_key)
+        search_time = time.time() - t_search
+        stats['searches'] += 1
+        for i, end_node in misses:
+            path = paths[end_node]
+            if path is None:
+                yield i, {"success": False, "error": "No path found between the specified locations in the road network."}
+                continue
+            result = router.route_summary(path)
+            result['search'] = {
+                'algorithm': path['algorithm'],
+                'settled_nodes': path['settled'],
+                'search_time_ms': round(search_time * 1000, 1),
+                'shared_by': len(misses)
+            }
+            if ROUTE_CACHE is not None and router.delay_version == delay_version:
+                ROUTE_CACHE.put((start_node, end_node, weight_key or 'default'), cacheable_route(result),
+                                ttl_for_weight_key(weight_key), transient=router.delayed_edges > 0)
+            yield i, {"success": True, "route": result}
+    return stats
+
+def resolve_point(point):
+    """Graph node for an address string or a {"lat", "lng"} point"""
+    if isinstance(point, dict):
+        return nearest_graph_node(GRAPH, float(point['lat']), float(point['lng']))
+    if isinstance(point, str) and point:
+        return find_nearest_node(GRAPH, point)
+    raise ValueError(f"Unrecognized point {point!r}")
+
 def load_or_train_model():
     """Load or train traffic prediction model"""
     try:
@@ -436,90 +664,293 @@ def load_or_train_model():
         print(f"Error loading/training model: {e}")
         raise
 
-def initialize():
-    """Initialize application components"""
-    global MODEL, GRAPH, X_COLUMNS, INITIALIZATION_COMPLETE, INITIALIZATION_ERROR, NODE_CACHE
-    
-    if INITIALIZATION_COMPLETE or INITIALIZATION_ERROR:
+def sync_artifacts_stage(data=False, models=False):
+    """Sync one artifact group; returns warnings, failing only for missing files the app cannot rebuild"""
+    results = download_from_s3(data=data, models=models)
+    if not results:
+        # Nothing synced: the stages that load each file report what is missing
+        return ["Artifact sync unavailable; using local files."]
+    warnings, missing = [], []
+    for key, result in results.items():
+        if result['status'] == 'failed':
+            if key in REBUILDABLE_ARTIFACTS:
+                warnings.append(f"Could not download {key} ({result.get('error')}); it will be "
+                                f"{REBUILDABLE_ARTIFACTS[key]}.")
+            else:
+                missing.append(f"{key} ({result.get('error')})")
+        elif result['status'] == 'kept':
+            warnings.append(f"Could not check {key} at the source ({result.get('error')}); using the local copy.")
+    if missing:
+        raise RuntimeError(f"Could not download {', '.join(missing)}")
+    return warnings
+
+def load_weather_stage():
+    global WEATHER_PROVIDER
+    WEATHER_PROVIDER = WeatherProvider().start()
+    print(f"Weather provider started ({WEATHER_PROVIDER.status()['periods']} forecast periods loaded).")
+
+def load_model_stage():
+    global MODEL, X_COLUMNS
+    MODEL, X_COLUMNS = load_or_train_model()
+    print("Model loaded/trained.")
+
+def load_graph_stage():
+    global GRAPH, EDGES, EDGE_FEATURES
+    GRAPH = load_graph_store(get_nyc_graph)
+    EDGES = GRAPH.edge_array()
+    EDGE_FEATURES = GRAPH.edge_columns()
+    print(f"Graph store loaded with {GRAPH.num_nodes} nodes and {GRAPH.num_edges} edges.")
+
+def load_geocoder_stage():
+    global LOCAL_GEOCODER
+    LOCAL_GEOCODER = LocalGeocoder.from_store(GRAPH)
+    print(f"Indexed {len(LOCAL_GEOCODER)} street names for local geocoding.")
+
+def load_node_store_stage():
+    global NODE_STORE
+    NODE_STORE = NodeStore()
+    imported = NODE_STORE.import_pickle()
+    if imported:
+        print(f"Imported {imported} node mappings from node_cache.pkl.")
+    print(f"Node store has {len(NODE_STORE)} cached node mappings.")
+
+def load_edge_weights_stage():
+    if GRAPH.weights_current():
+        print("Using edge weights from the graph store.")
+    elif calculate_edge_weights(GRAPH, MODEL, fetch_current_weather_nyc(), X_COLUMNS):
+        print("Edge weights stored.")
+
+def build_router_stage():
+    global ROUTER
+    ROUTER = RoutingGraph.from_store(GRAPH)
+    print(f"Routing graph built with {ROUTER.num_nodes} nodes and {ROUTER.num_arcs} arcs.")
+
+def load_spatial_index_stage():
+    global SPATIAL_INDEX
+    SPATIAL_INDEX = load_or_build_spatial_index(ROUTER)
+
+def load_hierarchies_stage():
+    hierarchy_count = load_hierarchies(ROUTER)
+    if hierarchy_count:
+        print(f"Loaded {hierarchy_count} contraction hierarchies.")
+
+def load_weight_table_stage():
+    global WEIGHT_TABLE
+    table = WeightTable.load()
+    if table is None:
         return
+    if table.matches(EDGES):
+        WEIGHT_TABLE = table
+        print(f"Loaded weight table with {int(table.ready.sum())} precomputed slices.")
+    else:
+        print("Weight table was built for a different graph. Ignoring it.")
+
+def load_route_cache_stage():
+    global ROUTE_CACHE
+    cache = RouteCache(version=GRAPH.version())
+    print(f"Loaded {cache.load()} cached routes.")
+    ROUTE_CACHE = cache
+
+def invalidate_routes_over(arcs):
+    """Drop cached routes that drive any of these routing-graph arcs; returns how many"""
+    if ROUTE_CACHE is None or len(arcs) == 0:
+        return 0
+    segments = [('arc', a) for a in arcs.tolist()]
+    segments += [(ROUTER.node_id(u), ROUTER.node_id(v))
+                 for u, v in zip(ROUTER.arc_source[arcs].tolist(), ROUTER.arc_target[arcs].tolist())]
+    removed = ROUTE_CACHE.invalidate_segments(segments)
+    if removed:
+        print(f"Invalidated {removed} cached routes over {len(arcs)} reweighted arcs.")
+    return removed
+
+def invalidate_reweighted_arcs(arcs, lifted=False):
+    """Drop cached routes and congestion tiles over reweighted arcs; returns how many routes
+
+    When delays were lifted, routes found while they were active (detours
+    that avoid these arcs) are dropped too.
+    """
+    if CONGESTION_TILES is not None:
+        CONGESTION_TILES.invalidate_arcs(arcs)
+    removed = invalidate_routes_over(arcs)
+    if lifted and ROUTE_CACHE is not None:
+        detours = ROUTE_CACHE.invalidate_transient()
+        if detours:
+            print(f"Invalidated {detours} cached routes found during lifted incidents.")
+        removed += detours
+    return removed
+
+def start_incident_store_stage():
+    global INCIDENTS
+    INCIDENTS = IncidentStore(ROUTER, SPATIAL_INDEX, on_change=invalidate_reweighted_arcs).start()
+    print("Incident store started.")
+
+def load_heatmap_stage():
+    global HEATMAP
+    HEATMAP = load_or_build_heatmap()
+    print(f"Heatmap bins ready for {len(HEATMAP.years)} years, zooms 0-{HEATMAP.max_zoom}.")
+
+def load_state_stats_stage():
+    global STATE_STATS, STATE_SHAPES
+    STATE_STATS = StateStats.from_csv()
+    STATE_SHAPES = StateShapes.from_file()
+    print(f"State counts indexed for {len(STATE_STATS.years)} years; state boundaries simplified from "
+          f"{STATE_SHAPES.source_bytes / 1e6:.1f}MB to {len(STATE_SHAPES.body) / 1e6:.2f}MB.")
+
+def build_congestion_tiles_stage():
+    global CONGESTION_TILES
+    CONGESTION_TILES = CongestionTiles(ROUTER)
+    print(f"Congestion tiles indexed {CONGESTION_TILES.num_segments} street segments.")
+
+def current_congestion_slice():
+    """(weights, weight key) of this hour's weight slice, chosen once per hour"""
+    global CONGESTION_SLICE
+    hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+    with CONGESTION_SLICE_LOCK:
+        if CONGESTION_SLICE is None or CONGESTION_SLICE[0] != hour:
+            weights, key = select_weight_slice(hour)
+            CONGESTION_SLICE = (hour, weights, key or 'default')
+        return CONGESTION_SLICE[1], CONGESTION_SLICE[2]
+
+def start_forecast_scheduler_stage():
+    global FORECAST_SCHEDULER
+    FORECAST_SCHEDULER = ForecastScheduler(WEATHER_PROVIDER, MODEL, EDGE_FEATURES, X_COLUMNS).start()
+    print("Forecast weight precompute started in the background.")
+
+def startup_complete(stages):
+    """Record the overall outcome once every stage has finished"""
+    global INITIALIZATION_COMPLETE, INITIALIZATION_ERROR
+    INITIALIZATION_ERROR = stages.error(ROUTING_STAGES)
+    INITIALIZATION_COMPLETE = INITIALIZATION_ERROR is None
+    if INITIALIZATION_COMPLETE:
+        print(f"Initialization successful in {stages.status()['elapsed_ms'] / 1000:.2f}s.")
+    else:
+        print(f"FATAL ERROR during initialization: {INITIALIZATION_ERROR}")
+    print_cache_status()
+
+def initialize(wait=False):
+    """Start initialization stages in the background; optionally block until they finish"""
+    global STARTUP
+    
+    if STARTUP is not None:
+        if wait:
+            STARTUP.wait()
+        return STARTUP
     
     print("Initializing application...")
-    try:
-        t_start = time.time()
+    STARTUP = StartupStages()
+    STARTUP.add('data_files', lambda: sync_artifacts_stage(data=True))
+    STARTUP.add('model_files', lambda: sync_artifacts_stage(models=True))
+    STARTUP.add('weather', load_weather_stage)
+    STARTUP.add('heatmap', load_heatmap_stage, deps=('data_files',))
+    STARTUP.add('state_stats', load_state_stats_stage, deps=('data_files',))
+    STARTUP.add('node_store', load_node_store_stage)
+    STARTUP.add('model', load_model_stage, deps=('model_files',))
+    STARTUP.add('graph', load_graph_stage, deps=('model_files',))
+    STARTUP.add('geocoder', load_geocoder_stage, deps=('graph',))
+    STARTUP.add('weight_table', load_weight_table_stage, deps=('graph',))
+    STARTUP.add('edge_weights', load_edge_weights_stage, deps=('graph', 'model', 'weather'))
+    STARTUP.add('router', build_router_stage, deps=('edge_weights',))
+    STARTUP.add('route_cache', load_route_cache_stage, deps=('edge_weights',))
+    STARTUP.add('spatial_index', load_spatial_index_stage, deps=('router',))
+    STARTUP.add('hierarchies', load_hierarchies_stage, deps=('router',))
+    STARTUP.add('congestion_tiles', build_congestion_tiles_stage, deps=('router',))
+    STARTUP.add('incidents', start_incident_store_stage, deps=('spatial_index', 'route_cache'))
+    STARTUP.add('forecast_scheduler', start_forecast_scheduler_stage, deps=('weather', 'model', 'graph'))
+    STARTUP.on_complete(startup_complete)
+    STARTUP.start()
+    if wait:
+        STARTUP.wait()
+    return STARTUP
 
-        download_from_s3();
-        
-        MODEL, X_COLUMNS = load_or_train_model()
-        print("Model loaded/trained.")
-        
-        GRAPH = get_nyc_graph()
-        print("Graph loaded.")
-        
-        node_cache_path = 'static/models/node_cache.pkl'
-        if os.path.exists(node_cache_path):
-            with open(node_cache_path, 'rb') as f:
-                NODE_CACHE = pickle.load(f)
-            print(f"Loaded {len(NODE_CACHE)} cached node mappings.")
-        
-        edge_weights_path = 'static/models/edge_weights.pkl'
-        edge_weights_cached = os.path.exists(edge_weights_path)
-        
-        if edge_weights_cached:
-            try:
-                with open(edge_weights_path, 'rb') as f:
-                    edge_weights = pickle.load(f)
-                
-                weight_count = 0
-                for u, v, key, weight in edge_weights:
-                    if u in GRAPH and v in GRAPH and key in GRAPH[u][v]:
-                        GRAPH.edges[u, v, key]['weight'] = weight
-                        weight_count += 1
-                
-                print(f"Applied {weight_count} cached edge weights to the graph.")
-            except Exception as e:
-                edge_weights_cached = False
-                print(f"Error loading cached edge weights: {e}")
-        
-        if not edge_weights_cached:
-            weather = fetch_current_weather_nyc()
-            if weather:
-                calculate_edge_weights(GRAPH, MODEL, weather, X_COLUMNS)
-                print("Edge weights calculated and cached.")
-            else:
-                print("Could not fetch initial weather. Edge weights not calculated.")
-        
-        route_cache_path = 'static/models/route_cache.pkl'
-        if not os.path.exists(route_cache_path):
-            with open(route_cache_path, 'wb') as f:
-                pickle.dump({}, f)
-            print("Created empty route cache.")
-        
-        INITIALIZATION_COMPLETE = True
-        init_time = time.time() - t_start
-        print(f"Initialization successful in {init_time:.2f}s.")
-    except Exception as e:
-        INITIALIZATION_ERROR = str(e)
-        print(f"FATAL ERROR during initialization: {e}")
-        import traceback
-        traceback.print_exc()
+def endpoint_stages():
+    """Startup stages the current request's endpoint needs"""
+    if request.endpoint in ENDPOINT_STAGES:
+        return ENDPOINT_STAGES[request.endpoint]
+    if request.endpoint in ('static', 'ready') or request.path.startswith('/static/'):
+        return ()
+    return ROUTING_STAGES
 
 @app.before_request
 def check_initialization():
-    """Check initialization status"""
-    if request.path.startswith('/static/'):
+    """Check the stages this endpoint depends on have loaded"""
+    stages = endpoint_stages()
+    if not stages:
         return None
-        
-    if not INITIALIZATION_COMPLETE and not INITIALIZATION_ERROR:
-        return "Application is initializing, please wait...", 503
-    return None
+    if STARTUP is None:
+        waiting, error = list(stages), None
+    else:
+        if STARTUP.ready(stages):
+            return None
+        waiting, error = STARTUP.waiting_for(stages), STARTUP.error(stages)
+    
+    if request.path.startswith('/api/'):
+        if error:
+            return jsonify({"success": False, "error": f"Initialization failed: {error}"}), 500
+        return jsonify({"success": False, "error": "Application initializing.", "waiting_for": waiting}), 503
+    if error:
+        return f"Application initialization failed: {error}", 500
+    return "Application is initializing, please wait...", 503
+
+@app.after_request
+def compress_response(response):
+    """gzip or brotli-encode larger JSON responses for clients that accept it"""
+    if (response.is_streamed or response.status_code != 200 or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = negotiate_encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def etag_matches(etag):
+    """Whether the request's If-None-Match holds this ETag, weak or strong"""
+    return request.if_none_match.contains_weak(etag)
+
+def set_cache_headers(response, etag, max_age):
+    """Publicly cacheable for max_age seconds under a weak ETag
+
+    The ETag is weak because compress_response may encode the body
+    differently per client; Vary keeps shared caches from mixing encodings.
+    """
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
+
+def print_cache_status():
+    """Startup summary of cached artifacts"""
+    model_path = 'static/models/traffic_model.txt'
+    graph_path = 'static/models/nyc_graph.pkl'
+    edge_weights_path = 'static/models/edge_weights.pkl'
+    
+    print("\nCache Status:")
+    print(f"- Model cached: {'Yes' if os.path.exists(model_path) else 'No'}")
+    print(f"- Graph cached: {'Yes' if os.path.exists(graph_path) else 'No'}")
+    print(f"- Edge weights cached: {'Yes' if os.path.exists(edge_weights_path) else 'No'}")
+    print(f"- Node mappings cached: {len(NODE_STORE) if NODE_STORE is not None else 0} addresses")
+    print(f"- Route cache: {len(ROUTE_CACHE) if ROUTE_CACHE is not None else 0} routes")
+    print("="*50)
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Per-stage initialization status and durations"""
+    if STARTUP is None:
+        return jsonify({"ready": False, "complete": False, "stages": {}}), 503
+    status = STARTUP.status()
+    status['ready'] = STARTUP.ready(ROUTING_STAGES)
+    status['endpoints'] = {
+        endpoint: STARTUP.ready(stages) for endpoint, stages in ENDPOINT_STAGES.items()
+    }
+    return jsonify(status), 200 if status['ready'] else 503
 
 @app.route('/')
 def index():
     """Main page"""
-    if INITIALIZATION_ERROR:
-        return f"Application initialization failed: {INITIALIZATION_ERROR}", 500
-    if not INITIALIZATION_COMPLETE:
-        return "Application is initializing, please wait...", 503
     return render_template('map.html')
 
 @app.route('/data')
@@ -531,14 +962,83 @@ def get_data():
                            years=years,
                            selected_year=year)
 
+@app.route('/api/heatmap', methods=['GET'])
+def get_heatmap():
+    """Location count heatmap bins for a bounding box and map zoom
+
+    Query: bbox=west,south,east,north, zoom, and year (all years if
+    omitted). Returns [lat, lng, count] bins sized for the zoom, with an
+    ETag; requests repeating it in If-None-Match get a 304.
+    """
+    try:
+        west, south, east, north = (float(v) for v in request.args['bbox'].split(','))
+        zoom = int(request.args.get('zoom', 0))
+        year = int(request.args['year']) if request.args.get('year') else None
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "error": "Query needs bbox=west,south,east,north and a whole-number zoom."})
+
+    # Bins only change with the source data, so the version and query identify the response
+    etag = hashlib.sha1(f"{HEATMAP.version}:{request.query_string.decode()}".encode()).hexdigest()
+    if etag_matches(etag):
+        response = app.response_class(status=304)
+    else:
+        try:
+            level, lat, lng, count, year_max = HEATMAP.query(south, west, north, east, zoom, year)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)})
+        response = jsonify({
+            "success": True,
+            "zoom": level,
+            "year": year,
+            "max": year_max,
+            "bins": np.column_stack((lat.astype(np.float64).round(5), lng.astype(np.float64).round(5),
+                                     count.astype(np.float64))).tolist()
+        })
+    return set_cache_headers(response, etag, HEATMAP_MAX_AGE)
+
+@app.route('/api/state-stats', methods=['GET'])
+def get_state_stats():
+    """One year's incident counts by state with choropleth class breaks
+
+    Query: year (the latest if omitted). The response names the versioned
+    state boundaries URL, so year switches reuse the cached geometry.
+    """
+    try:
+        year = int(request.args['year']) if request.args.get('year') else None
+    except ValueError:
+        return jsonify({"success": False, "error": "Year must be a whole number."})
+    try:
+        stats = STATE_STATS.year_stats(year)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)})
+
+    etag = hashlib.sha1(f"{STATE_STATS.version}:{STATE_SHAPES.version}:{stats['year']}".encode()).hexdigest()
+    if etag_matches(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(dict(stats, success=True, shapes=url_for('get_state_shapes', v=STATE_SHAPES.version)))
+    return set_cache_headers(response, etag, STATE_STATS_MAX_AGE)
+
+@app.route('/api/state-shapes', methods=['GET'])
+def get_state_shapes():
+    """Simplified state boundaries GeoJSON, precompressed, cached for as long as its version holds"""
+    if etag_matches(STATE_SHAPES.version):
+        response = app.response_class(status=304)
+    else:
+        encoding = negotiate_encoding(request.accept_encodings)
+        if len(STATE_SHAPES.body) < COMPRESS_MIN_BYTES:
+            encoding = None
+        response = app.response_class(STATE_SHAPES.encoded(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    set_cache_headers(response, STATE_SHAPES.version, STATE_SHAPES_MAX_AGE)
+    if request.args.get('v') == STATE_SHAPES.version:
+        response.cache_control.immutable = True
+    return response
+
 @app.route('/api/weather', methods=['GET'])
 def get_weather():
     """Weather API endpoint"""
-    if INITIALIZATION_ERROR:
-        return jsonify({"success": False, "error": f"Initialization failed: {INITIALIZATION_ERROR}"})
-    if not INITIALIZATION_COMPLETE:
-        return jsonify({"success": False, "error": "Application initializing."})
-         
     try:
         weather = fetch_current_weather_nyc()
         if weather:
@@ -550,12 +1050,11 @@ def get_weather():
 
 @app.route('/api/route', methods=['POST'])
 def calculate_route():
-    """Route calculation API endpoint"""
-    if INITIALIZATION_ERROR:
-        return jsonify({"success": False, "error": f"Initialization failed: {INITIALIZATION_ERROR}"})
-    if not INITIALIZATION_COMPLETE:
-        return jsonify({"success": False, "error": "Application initializing."})
-        
+    """Route calculation API endpoint
+
+    "format": "compact" returns the route as an encoded polyline with
+    per-edge column arrays (see route_format.compact_route).
+    """
     t_start = time.time()
     try:
         data = request.json
@@ -563,61 +1062,62 @@ def calculate_route():
         end = data.get('end')
         date = data.get('date')
         time_str = data.get('time')
+        algorithm = data.get('algorithm', DEFAULT_ROUTING_ALGORITHM)
+        snap = bool(data.get('snap', False))
+        alternatives = data.get('alternatives', 1)
+        time_dependent = bool(data.get('time_dependent', DEFAULT_TIME_DEPENDENT))
+        output = data.get('format', 'full')
+        
+        def route_response(result):
+            return jsonify({"success": True, "route": compact_route(result) if output == 'compact' else result})
         
         if not start or not end:
             return jsonify({"success": False, "error": "Start and End locations are required."})
+        if not isinstance(alternatives, int) or not 1 <= alternatives <= MAX_ROUTE_ALTERNATIVES:
+            return jsonify({"success": False, "error": f"Alternatives must be a whole number from 1 to {MAX_ROUTE_ALTERNATIVES}."})
+        if time_dependent and alternatives > 1:
+            return jsonify({"success": False, "error": "Alternatives are not available for time-dependent routes."})
+        if algorithm not in ALGORITHMS:
+            return jsonify({"success": False, "error": f"Unknown algorithm '{algorithm}'. Use one of: {', '.join(ALGORITHMS)}."})
+        if output not in ROUTE_FORMATS:
+            return jsonify({"success": False, "error": f"Format must be one of: {', '.join(ROUTE_FORMATS)}."})
 
         print(f"Calculating route from '{start}' to '{end}'")
         
+        if time_dependent:
+            try:
+                route_datetime = parse_route_datetime(date, time_str) if date and time_str else datetime.now()
+            except (ValueError, IndexError):
+                return jsonify({"success": False, "error": f"Invalid date/time '{date} {time_str}'."})
+            print(f"Finding time-dependent route departing {route_datetime}...")
+            result = find_optimal_route(start, end, GRAPH, route_datetime, time_dependent=True)
+            print(f"Total route API request time: {time.time() - t_start:.2f}s")
+            return route_response(result)
+        
         route_datetime = None
         if date and time_str:
             print(f"For date/time: {date} {time_str}")
             try:
-                dt_parts = date.split('-')
-                time_parts = time_str.split(':')
-                
-                year = int(dt_parts[0])
-                month = int(dt_parts[1])
-                day = int(dt_parts[2])
-                hour = int(time_parts[0])
-                minute = int(time_parts[1])
-                
-                route_datetime = datetime(year, month, day, hour, minute)
+                route_datetime = parse_route_datetime(date, time_str)
                 print(f"Using datetime: {route_datetime}")
                 
-                date_specific_cache = f'static/models/edge_weights.pkl'
-                
-                weather = fetch_current_weather_nyc()
-                if weather:
-                    import copy
-                    request_graph = copy.deepcopy(GRAPH)
-                    
-                    force_recalc = not os.path.exists(date_specific_cache)
-                    
-                    if force_recalc:
-                        print(f"No cached weights found, calculating...")
-                    else:
-                        print(f"Using cached weights")
-                        
-                    calculate_edge_weights(request_graph, MODEL, weather, X_COLUMNS, 
-                                          force_recalculate=force_recalc, 
-                                          route_datetime=route_datetime)
-                    
+                weight_slice, weight_key = select_weight_slice(route_datetime)
+                if weight_key is not None:
                     print("Finding optimal route with time-specific weights...")
-                    result = find_optimal_route(start, end, request_graph, route_datetime)
+                    result = find_optimal_route(start, end, GRAPH, route_datetime,
+                                                weights=weight_slice, weight_key=weight_key,
+                                                algorithm=algorithm, snap=snap, alternatives=alternatives)
                     print("Route found.")
-                    return jsonify({"success": True, "route": result})
-                else:
-                    print("Could not fetch weather. Using previously calculated weights.")
+                    return route_response(result)
             except Exception as e:
                 print(f"Error parsing date/time: {e}. Using current time.")
                 route_datetime = datetime.now()
         
         print("Finding optimal route...")
-        result = find_optimal_route(start, end, GRAPH)
+        result = find_optimal_route(start, end, GRAPH, algorithm=algorithm, snap=snap, alternatives=alternatives)
         print("Route found.")
         print(f"Total route API request time: {time.time() - t_start:.2f}s")
-        return jsonify({"success": True, "route": result})
+        return route_response(result)
         
     except ValueError as geo_err:
         print(f"Geocoding error: {geo_err}")
@@ -631,6 +1131,268 @@ def calculate_route():
         traceback.print_exc()
         return jsonify({"success": False, "error": f"An unexpected server error occurred."})
 
+@app.route('/api/routes/batch', methods=['POST'])
+def calculate_routes_batch():
+    """Batch route API endpoint, streaming one NDJSON line per route as it completes
+
+    Body: {"routes": [{"id", "start", "end", "date", "time"}, ...]}. Lines
+    carry the entry's index (and id, if given) since they arrive out of
+    order; a final {"summary": ...} line follows the last route.
+    """
+    data = request.json or {}
+    entries = data.get('routes')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"success": False, "error": "A non-empty 'routes' list is required."})
+    if len(entries) > BATCH_MAX_ROUTES:
+        return jsonify({"success": False, "error": f"At most {BATCH_MAX_ROUTES} routes per batch."})
+    print(f"Calculating batch of {len(entries)} routes")
+
+    def generate():
+        t_start = time.time()
+        succeeded = 0
+        results = batch_routes(entries)
+        try:
+            while True:
+                i, result = next(results)
+                line = {"index": i}
+                if isinstance(entries[i], dict) and 'id' in entries[i]:
+                    line['id'] = entries[i]['id']
+                line.update(result)
+                succeeded += result['success']
+                yield json.dumps(line) + '\n'
+        except StopIteration as done:
+            summary = dict(done.value, succeeded=succeeded, time_ms=round((time.time() - t_start) * 1000, 1))
+        except Exception as e:
+            print(f"Error calculating batch routes: {type(e).__name__} - {e}")
+            import traceback
+            traceback.print_exc()
+            summary = {"error": "An unexpected server error occurred.", "succeeded": succeeded}
+        print(f"Batch routes: {summary}")
+        yield json.dumps({"summary": summary}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/matrix', methods=['POST'])
+def calculate_matrix():
+    """Origin-destination travel time (minutes) and distance (miles) matrix API endpoint
+
+    Body: {"origins": [...], "destinations": [...], "date", "time", "format"}.
+    Points are addresses or {"lat", "lng"} objects. "format": "binary"
+    streams a little-endian float32 (origins, destinations, 2) array of
+    [minutes, miles] cells, NaN where unreachable; JSON uses null.
+    """
+    t_start = time.time()
+    data = request.json or {}
+    origins = data.get('origins')
+    destinations = data.get('destinations')
+    output = data.get('format', 'json')
+    if not isinstance(origins, list) or not isinstance(destinations, list) or not origins or not destinations:
+        return jsonify({"success": False, "error": "Non-empty 'origins' and 'destinations' lists are required."})
+    if len(origins) * len(destinations) > MATRIX_MAX_CELLS:
+        return jsonify({"success": False, "error": f"At most {MATRIX_MAX_CELLS} origin x destination cells per matrix."})
+    if output not in ('json', 'binary'):
+        return jsonify({"success": False, "error": "Format must be 'json' or 'binary'."})
+
+    nodes = {}
+    for point in origins + destinations:
+        key = json.dumps(point, sort_keys=True)
+        if key not in nodes:
+            try:
+                nodes[key] = ROUTER.node_index[resolve_point(point)]
+            except Exception as e:
+                print(f"Could not resolve matrix point {point!r}: {e}")
+                return jsonify({"success": False, "error": f"Could not understand location {point!r}."})
+    origin_nodes = [nodes[json.dumps(p, sort_keys=True)] for p in origins]
+    destination_nodes = [nodes[json.dumps(p, sort_keys=True)] for p in destinations]
+
+    weights, weight_key = None, None
+    if data.get('date') and data.get('time'):
+        try:
+            weights, weight_key = select_weight_slice(parse_route_datetime(data['date'], data['time']))
+        except (ValueError, IndexError):
+            return jsonify({"success": False, "error": f"Invalid date/time '{data['date']} {data['time']}'."})
+    matrix = TravelTimeMatrix(ROUTER, ROUTER.prepare(weights, weight_key))
+    print(f"Calculating {len(origins)}x{len(destinations)} matrix with {weight_key or 'default'} weights")
+
+    if output == 'binary':
+        def generate():
+            for minutes, miles in matrix.rows(origin_nodes, destination_nodes):
+                yield np.stack((minutes, miles), axis=-1).astype('<f4').tobytes()
+            print(f"Matrix streamed in {time.time() - t_start:.2f}s")
+        return Response(stream_with_context(generate()), mimetype='application/octet-stream', headers={
+            'X-Matrix-Shape': f"{len(origins)},{len(destinations)},2",
+            'X-Matrix-Dtype': 'float32',
+            'X-Matrix-Weights': weight_key or 'default'
+        })
+
+    minutes, miles = matrix.compute(origin_nodes, destination_nodes)
+    print(f"Matrix calculated in {time.time() - t_start:.2f}s")
+    return jsonify({
+        "success": True,
+        "shape": [len(origins), len(destinations)],
+        "weights": weight_key or 'default',
+        "travel_time": np.where(np.isnan(minutes), None, minutes.astype(np.float64).round(2)).tolist(),
+        "distance": np.where(np.isnan(miles), None, miles.astype(np.float64).round(3)).tolist()
+    })
+
+@app.route('/api/departure-sweep', methods=['POST'])
+def departure_sweep():
+    """Travel time for each hourly departure in a window, and the best departure
+
+    Body: {"start", "end", "date", "time" (window start, default now),
+    "hours" (window length), "exact"}. Without "exact" only every few hours
+    get a full search and the rest are priced over those searches' paths.
+    """
+    t_start = time.time()
+    data = request.json or {}
+    start = data.get('start')
+    end = data.get('end')
+    hours = data.get('hours', SWEEP_DEFAULT_HOURS)
+    if not start or not end:
+        return jsonify({"success": False, "error": "Start and End locations are required."})
+    if not isinstance(hours, int) or not 1 <= hours <= SWEEP_MAX_HOURS:
+        return jsonify({"success": False, "error": f"Hours must be a whole number from 1 to {SWEEP_MAX_HOURS}."})
+    try:
+        if data.get('date') and data.get('time'):
+            window_start = parse_route_datetime(data['date'], data['time'])
+        else:
+            window_start = datetime.now().replace(second=0, microsecond=0)
+    except (ValueError, IndexError):
+        return jsonify({"success": False, "error": f"Invalid date/time '{data.get('date')} {data.get('time')}'."})
+
+    try:
+        start_node = find_nearest_node(GRAPH, start)
+        end_node = find_nearest_node(GRAPH, end)
+    except Exception as e:
+        print(f"Geocoding error: {e}")
+        return jsonify({"success": False, "error": f"Could not understand location. Ensure '{start}' and '{end}' are specific, valid locations in NYC."})
+
+    departures = [window_start + timedelta(hours=h) for h in range(hours)]
+    slices = select_weight_slices(departures)
+    t_sweep = time.time()
+    try:
+        sweep = sweep_departures(ROUTER, start_node, end_node, slices,
+                                 **({'search_every': 1, 'alternatives': 1} if data.get('exact') else {}))
+    except nx.NetworkXNoPath:
+        return jsonify({"success": False, "error": "No path found between the specified locations in the road network."})
+    best = sweep['best']
+    print(f"Swept {hours} departures over {sweep['paths']} paths ({sweep['searches']} searches) "
+          f"in {(time.time() - t_sweep) * 1000:.0f}ms")
+    return jsonify({
+        "success": True,
+        "departures": [
+            {
+                "departure": departure.isoformat(timespec='minutes'),
+                "weights": key or 'default',
+                "estimated_travel_time": round(float(minutes), 1),
+                "distance_miles": round(float(miles), 1),
+                "path": int(path)
+            }
+            for departure, (_, key), minutes, miles, path in zip(
+                departures, slices, sweep['minutes'], sweep['miles'], sweep['path'])
+        ],
+        "best_departure": departures[best].isoformat(timespec='minutes'),
+        "route": ROUTER.route_summary(sweep['best_path']),
+        "search": {
+            "paths": sweep['paths'],
+            "full_searches": sweep['searches'],
+            "time_ms": round((time.time() - t_start) * 1000, 1)
+        }
+    })
+
+@app.route('/api/incidents', methods=['POST'])
+def ingest_incidents():
+    """Traffic incident ingestion API endpoint
+
+    Body: {"incidents": [{"lat", "lng", "severity" (0-4), "id", "closed",
+    "radius" (meters), "duration" (minutes)}]}. Edges near each incident
+    are slowed until it expires and cached routes over them are dropped;
+    posting an active incident's id again replaces it.
+    """
+    t_start = time.time()
+    if INCIDENTS is None:
+        return jsonify({"success": False, "error": "Incident store is not running."})
+    data = request.json or {}
+    incidents = data.get('incidents')
+    if not isinstance(incidents, list) or not incidents:
+        return jsonify({"success": False, "error": "A non-empty 'incidents' list is required."})
+
+    results = []
+    for incident in incidents:
+        try:
+            results.append(INCIDENTS.add(
+                float(incident['lat']), float(incident['lng']),
+                severity=int(incident.get('severity', 0)),
+                radius_m=float(incident.get('radius', INCIDENT_RADIUS_M)),
+                ttl=float(incident['duration']) * 60 if incident.get('duration') is not None else INCIDENT_DEFAULT_TTL,
+                incident_id=incident.get('id'),
+                closed=bool(incident.get('closed', False))
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            results.append({"success": False, "error": f"Invalid incident {incident!r}: {e}"})
+    print(f"Ingested {len(incidents)} incidents in {(time.time() - t_start) * 1000:.1f}ms")
+    return jsonify({"success": True, "incidents": results, "status": INCIDENTS.status()})
+
+@app.route('/api/incidents', methods=['GET'])
+def list_incidents():
+    """Active traffic incidents"""
+    if INCIDENTS is None:
+        return jsonify({"success": False, "error": "Incident store is not running."})
+    return jsonify({"success": True, "incidents": INCIDENTS.incidents(), "status": INCIDENTS.status()})
+
+@app.route('/api/incidents/<incident_id>', methods=['DELETE'])
+def remove_incident(incident_id):
+    """Lift a traffic incident before it expires"""
+    if INCIDENTS is None or not INCIDENTS.remove(incident_id):
+        return jsonify({"success": False, "error": f"No active incident '{incident_id}'."})
+    return jsonify({"success": True, "status": INCIDENTS.status()})
+
+@app.route('/api/congestion-tiles', methods=['GET'])
+def congestion_tiles_info():
+    """Current weight slice and tile URL template of the congestion overlay"""
+    try:
+        _, key = current_congestion_slice()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+    return jsonify({
+        "success": True,
+        "slice": key,
+        "tiles": f"/api/congestion-tiles/{quote(key, safe='')}/{{z}}/{{x}}/{{y}}",
+        "min_zoom": CONGESTION_TILE_MIN_ZOOM,
+        "max_zoom": CONGESTION_TILE_MAX_ZOOM,
+        "extent": CONGESTION_TILE_EXTENT,
+        "classes": CONGESTION_CLASSES
+    })
+
+@app.route('/api/congestion-tiles/<slice_key>/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_congestion_tile(slice_key, z, x, y):
+    """One congestion tile: per-class [x0, y0, x1, y1, ...] segment lists in tile coordinates
+
+    Only the current weight slice is served; a stale slice gets an error
+    naming the current one, for the map to reload its tile URLs.
+    """
+    if not CONGESTION_TILE_MIN_ZOOM <= z <= CONGESTION_TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"success": False, "error": f"Tiles cover zooms {CONGESTION_TILE_MIN_ZOOM}-"
+                                                   f"{CONGESTION_TILE_MAX_ZOOM} and x, y within 0-2^z."})
+    try:
+        weights, key = current_congestion_slice()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+    if slice_key != key:
+        return jsonify({"success": False, "error": f"Weight slice '{slice_key}' is no longer current.", "slice": key})
+
+    body, etag = CONGESTION_TILES.get(key, ROUTER.prepare(weights, key), z, x, y)
+    if etag_matches(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    return set_cache_headers(response, etag, CONGESTION_TILE_MAX_AGE)
+
+@app.route('/api/forecast-status', methods=['GET'])
+def forecast_status():
+    """Forecast weight precompute queue and per-hour readiness"""
+    return jsonify({"success": True, "weather": WEATHER_PROVIDER.status(), "scheduler": FORECAST_SCHEDULER.status()})
+
 @app.route('/api/cache-status', methods=['GET'])
 def cache_status():
     """Cache status API endpoint"""
@@ -638,21 +1400,10 @@ def cache_status():
     X_columns_path = 'static/models/x_columns.json'
     graph_path = 'static/models/nyc_graph.pkl'
     edge_weights_path = 'static/models/edge_weights.pkl'
-    node_cache_path = 'static/models/node_cache.pkl'
-    route_cache_path = 'static/models/route_cache.pkl'
     
     date_specific_caches = len([f for f in os.listdir('static/models') 
                                if f.startswith('edge_weights_') and f.endswith('.pkl')])
     
-    route_cache_size = 0
-    if os.path.exists(route_cache_path):
-        try:
-            with open(route_cache_path, 'rb') as f:
-                route_cache = pickle.load(f)
-                route_cache_size = len(route_cache)
-        except:
-            pass
-    
     avg_edge_calc_time = 0
     if PERF_STATS['edge_weight_calculation_time']:
         avg_edge_calc_time = sum(PERF_STATS['edge_weight_calculation_time']) / len(PERF_STATS['edge_weight_calculation_time'])
@@ -667,11 +1418,18 @@ def cache_status():
         "X_columns_cached": os.path.exists(X_columns_path),
         "graph_cached": os.path.exists(graph_path),
         "graph_size_mb": round(os.path.getsize(graph_path) / (1024 * 1024), 2) if os.path.exists(graph_path) else 0,
+        "graph_store": GRAPH.status() if GRAPH is not None else None,
         "edge_weights_cached": os.path.exists(edge_weights_path),
         "edge_weights_size_mb": round(os.path.getsize(edge_weights_path) / (1024 * 1024), 2) if os.path.exists(edge_weights_path) else 0,
-        "node_cache_size": len(NODE_CACHE) if os.path.exists(node_cache_path) else 0,
+        "node_cache_size": len(NODE_STORE) if NODE_STORE is not None else 0,
+        "node_store": NODE_STORE.status() if NODE_STORE is not None else None,
         "date_specific_caches": date_specific_caches,
-        "route_cache_size": route_cache_size,
+        "weight_table": WEIGHT_TABLE.status() if WEIGHT_TABLE is not None else None,
+        "route_cache_size": len(ROUTE_CACHE) if ROUTE_CACHE is not None else 0,
+        "route_cache": ROUTE_CACHE.status() if ROUTE_CACHE is not None else None,
+        "weather": WEATHER_PROVIDER.status() if WEATHER_PROVIDER is not None else None,
+        "incidents": INCIDENTS.status() if INCIDENTS is not None else None,
+        "congestion_tiles": CONGESTION_TILES.status() if CONGESTION_TILES is not None else None,
         "performance": {
             "cache_hits": PERF_STATS['cache_hits'],
             "cache_misses": PERF_STATS['cache_misses'],
@@ -690,22 +1448,12 @@ if __name__ == '__main__':
     print("NYC TRAFFIC PREDICTION APP - STARTUP")
     print("="*50)
     
-    print("Initializing application components...")
-    initialize()
-    
-    model_path = 'static/models/traffic_model.txt'
-    graph_path = 'static/models/nyc_graph.pkl'
-    edge_weights_path = 'static/models/edge_weights.pkl'
-    node_cache_path = 'static/models/node_cache.pkl'
-    route_cache_path = 'static/models/route_cache.pkl'
-    
-    print("\nCache Status:")
-    print(f"- Model cached: {'Yes' if os.path.exists(model_path) else 'No'}")
-    print(f"- Graph cached: {'Yes' if os.path.exists(graph_path) else 'No'}")
-    print(f"- Edge weights cached: {'Yes' if os.path.exists(edge_weights_path) else 'No'}")
-    print(f"- Node mappings cached: {len(NODE_CACHE) if os.path.exists(node_cache_path) else 0} addresses")
-    print(f"- Route cache: {'Yes' if os.path.exists(route_cache_path) else 'No'}")
-    print("="*50)
+    # FLASK_RELOADER=0 runs a single process; otherwise the reloader's parent only watches
+    # files and the child it spawns (WERKZEUG_RUN_MAIN) serves requests
+    use_reloader = os.environ.get('FLASK_RELOADER', '1') != '0'
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        print("Initializing application components in the background...")
+        initialize()
     
     import socket
     hostname = socket.gethostname()
@@ -717,4 +1465,4 @@ if __name__ == '__main__':
     print("="*50)
     
     print("Starting Flask application via app.py...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, use_reloader=use_reloader, host='0.0.0.0', port=5000)
@@ -0,0 +1,77 @@
+"""Latency, stretch and overlap of penalty-method alternative routes
+
+Compares with networkx's Yen-style k-shortest simple paths on a few pairs,
+whose paths are neither fast to enumerate nor meaningfully different.
+
+Usage: python benchmarks/bench_alternatives.py [--rows 230] [--cols 230] [--queries 30] [--k 3] [--yen-queries 3]
+"""
+import argparse
+import time
+from itertools import islice
+
+import numpy as np
+import networkx as nx
+
+from synthetic import grid_graph
+from routing import RoutingGraph
+
+def arc_digraph(router, prepared):
+    """Collapsed arcs as a networkx DiGraph (shortest_simple_paths needs a simple graph)"""
+    D = nx.DiGraph()
+    D.add_weighted_edges_from(zip(router.arc_source.tolist(), router.arc_target.tolist(), prepared.arc_weight.tolist()))
+    return D
+
+def overlap(nodes, other):
+    """Share of a path's hops that also appear in another path"""
+    hops = set(zip(other[:-1], other[1:]))
+    return sum((u, v) in hops for u, v in zip(nodes[:-1], nodes[1:])) / max(len(nodes) - 1, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=230)
+    parser.add_argument('--cols', type=int, default=230)
+    parser.add_argument('--queries', type=int, default=30)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--yen-queries', type=int, default=3)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    router = RoutingGraph.from_graph(G)
+    print(f"Synthetic graph: {router.num_nodes} nodes, {router.num_arcs} arcs")
+    rng = np.random.default_rng(11)
+    pairs = rng.integers(0, router.num_nodes, (args.queries, 2)).tolist()
+
+    search_ms = [[] for _ in range(args.k)]
+    stretch, overlaps, found = [], [], []
+    for s, t in pairs:
+        paths = router.alternative_paths(router.node_id(s), router.node_id(t), k=args.k)
+        found.append(len(paths))
+        for i, path in enumerate(paths):
+            search_ms[i].append(path['search_ms'])
+            if i:
+                stretch.append(path['stretch'])
+                overlaps.append(path['overlap'])
+
+    print(f"\nPenalty method, k={args.k}, {len(pairs)} queries "
+          f"({np.mean(found):.2f} routes found on average):")
+    for i, times in enumerate(search_ms):
+        label = 'best route' if i == 0 else f"alternative {i}"
+        if times:
+            print(f"  {label:<14} {np.mean(times):6.1f}ms mean, {np.percentile(times, 95):6.1f}ms p95 ({len(times)} found)")
+    if stretch:
+        print(f"  alternatives: stretch {np.mean(stretch):.3f} mean / {max(stretch):.3f} max, "
+              f"overlap {np.mean(overlaps):.2f} mean / {max(overlaps):.2f} max")
+
+    print(f"\nnetworkx shortest_simple_paths (Yen), k={args.k}, {args.yen_queries} queries:")
+    D = arc_digraph(router, router.base)
+    for s, t in pairs[:args.yen_queries]:
+        t_start = time.perf_counter()
+        yen = list(islice(nx.shortest_simple_paths(D, s, t, weight='weight'), args.k))
+        elapsed = time.perf_counter() - t_start
+        penalty = [p['node_index'].tolist() for p in router.alternative_paths(router.node_id(s), router.node_id(t), k=args.k)]
+        print(f"  {elapsed * 1000:8.0f}ms; overlap with best: Yen "
+              f"{[round(overlap(p, yen[0]), 2) for p in yen[1:]]}, penalty "
+              f"{[round(overlap(p, penalty[0]), 2) for p in penalty[1:]]}")
+
+if __name__ == '__main__':
+    main()
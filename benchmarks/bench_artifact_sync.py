@@ -0,0 +1,142 @@
+"""Artifact sync: sequential whole-file copies vs parallel ranged, verified, resumable sync
+
+Uses a local directory as the artifact source, throttled to mimic a remote
+object store (per-request latency plus a per-connection bandwidth cap).
+
+Usage: python benchmarks/bench_artifact_sync.py [--latency-ms 40] [--mbps 200]
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import synthetic  # noqa: F401 -- puts the repo root on sys.path
+import s3download
+from s3download import LocalSource, sync_artifacts, MANIFEST_KEY, LOCAL_ARTIFACTS
+
+FILES = {'nyc_graph.pkl': 48, 'edge_weights.pkl': 24, 'traffic_model.txt': 6, 'x_columns.json': 0.01}
+
+class ThrottledSource(LocalSource):
+    """LocalSource with request latency, a bandwidth cap and injectable range failures"""
+
+    def __init__(self, directory, latency, bytes_per_s):
+        super().__init__(directory)
+        self.latency = latency
+        self.bytes_per_s = bytes_per_s
+        self.fail = {}
+        self.broken = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def head(self, key):
+        time.sleep(self.latency)
+        return super().head(key)
+
+    def read_range(self, key, start, end):
+        with self._lock:
+            self.requests += 1
+            failures = self.fail.get(key, 0)
+            if failures:
+                self.fail[key] = failures - 1
+        time.sleep(self.latency + (end - start + 1) / self.bytes_per_s)
+        if failures or self.broken.get(key) == start:
+            raise ConnectionError(f"injected failure reading {key}")
+        return super().read_range(key, start, end)
+
+def sequential_copy(source, keys, target):
+    """The previous behaviour: one whole-object read per file, one file at a time"""
+    for key in keys:
+        size, _ = LocalSource.head(source, key)
+        with open(os.path.join(target, key), 'wb') as f:
+            f.write(source.read_range(key, 0, size - 1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, default=40)
+    parser.add_argument('--mbps', type=float, default=200, help='per-connection bandwidth in megabits/s')
+    args = parser.parse_args()
+    s3download.RETRY_BACKOFF = 0.01
+
+    with tempfile.TemporaryDirectory() as tmp:
+        remote = os.path.join(tmp, 'remote')
+        os.makedirs(remote)
+        rng = random.Random(1)
+        manifest = {}
+        for key, mb in FILES.items():
+            data = rng.randbytes(int(mb * 1024 * 1024))
+            with open(os.path.join(remote, key), 'wb') as f:
+                f.write(data)
+            manifest[key] = {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+        with open(os.path.join(remote, MANIFEST_KEY), 'w') as f:
+            json.dump(manifest, f)
+        source = ThrottledSource(remote, args.latency_ms / 1000, args.mbps * 1e6 / 8)
+        total_mb = sum(FILES.values())
+
+        baseline_dir = os.path.join(tmp, 'baseline')
+        os.makedirs(baseline_dir)
+        t_start = time.perf_counter()
+        sequential_copy(source, list(FILES), baseline_dir)
+        baseline = time.perf_counter() - t_start
+
+        local = os.path.join(tmp, 'local')
+        groups = {local: list(FILES)}
+        t_start = time.perf_counter()
+        results = sync_artifacts(groups, source)
+        fresh = time.perf_counter() - t_start
+        assert all(r['status'] == 'downloaded' for r in results.values()), results
+
+        t_start = time.perf_counter()
+        results = sync_artifacts(groups, source)
+        noop = time.perf_counter() - t_start
+        assert all(r['status'] == ('local' if key in LOCAL_ARTIFACTS else 'up-to-date')
+                   for key, r in results.items()), results
+
+        # Edge weights the app recalculated are kept, not replaced by the source's copy
+        with open(os.path.join(local, 'edge_weights.pkl'), 'wb') as f:
+            f.write(b'recalculated')
+        results = sync_artifacts(groups, source, verify=True)
+        assert results['edge_weights.pkl']['status'] == 'local', results
+        with open(os.path.join(local, 'edge_weights.pkl'), 'rb') as f:
+            assert f.read() == b'recalculated'
+
+        # A truncated file is detected and downloaded again
+        with open(os.path.join(local, 'nyc_graph.pkl'), 'r+b') as f:
+            f.truncate(1000)
+        results = sync_artifacts(groups, source, verify=True)
+        assert results['nyc_graph.pkl']['status'] == 'downloaded', results
+
+        # Transient failures are retried per range without affecting other files
+        os.remove(os.path.join(local, 'edge_weights.pkl'))
+        source.fail = {'edge_weights.pkl': 2}
+        results = sync_artifacts(groups, source)
+        assert results['edge_weights.pkl']['status'] == 'downloaded' and results['edge_weights.pkl']['retries'] == 2
+
+        # A file with a range that keeps failing is left as a resumable .part file
+        os.remove(os.path.join(local, 'nyc_graph.pkl'))
+        os.remove(os.path.join(local, 'traffic_model.txt'))
+        source.broken = {'nyc_graph.pkl': 0}
+        results = sync_artifacts(groups, source)
+        assert results['nyc_graph.pkl']['status'] == 'failed', results
+        assert results['traffic_model.txt']['status'] == 'downloaded', results
+        partial = results['nyc_graph.pkl']['fetched']
+        source.broken = {}
+        results = sync_artifacts(groups, source)
+        resumed = results['nyc_graph.pkl']
+        assert resumed['status'] == 'downloaded' and resumed['resumed'] == partial, resumed
+        for key, expected in manifest.items():
+            with open(os.path.join(local, key), 'rb') as f:
+                assert hashlib.sha256(f.read()).hexdigest() == expected['sha256']
+
+    print(f"{total_mb:.0f}MB over {len(FILES)} files, {args.latency_ms:.0f}ms latency, {args.mbps:.0f}Mbit/s per connection")
+    print(f"sequential whole-file copy: {baseline:6.2f}s")
+    print(f"parallel ranged sync:       {fresh:6.2f}s ({baseline / fresh:.1f}x)")
+    print(f"re-sync with nothing to do: {noop:6.2f}s")
+    print(f"recalculated edge weights kept; truncated file repaired; 2 transient range failures retried; "
+          f"interrupted download resumed with {partial / 2**20:.0f}/{resumed['size'] / 2**20:.0f}MB kept")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Compare /api/routes/batch throughput with one /api/route request per pair
+
+Runs the app offline against a synthetic grid and model in a temporary
+directory. Routes are dispatch-shaped: a few depots, many destinations and
+a few departure hours. The route cache is disabled for the timed runs so
+both endpoints search every route; addresses are resolved once beforehand so
+both runs start with the same warm node store.
+
+Usage: python benchmarks/bench_batch_routing.py [--rows 100] [--cols 100] [--routes 300] [--depots 10] [--departures 3]
+"""
+import os
+import json
+import time
+import pickle
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from synthetic import grid_graph, traffic_model, forecast_document, ordinal, X_COLUMNS
+
+def intersection(rng, rows, cols):
+    return f"{ordinal(int(rng.integers(1, cols + 1)))} ave & {ordinal(int(rng.integers(1, rows + 1)))} st"
+
+def route_cost(app, entry, route):
+    """Sum of the routing weights along a route's nodes, in the weight slice of its departure"""
+    departure = app.parse_route_datetime(entry['date'], entry['time']) if entry.get('date') else None
+    prepared = app.ROUTER.prepare(*(app.select_weight_slice(departure) if departure else (None, None)))
+    router, nodes = app.ROUTER, [app.ROUTER.node_index[n] for n in route['route_nodes']]
+    return sum(min(prepared.cost[a] for a in range(router.offsets[u], router.offsets[u + 1]) if router.arc_target[a] == v)
+               for u, v in zip(nodes[:-1], nodes[1:]))
+
+def start_app(rows, cols):
+    """Initialize the app in the current directory against a synthetic graph and model"""
+    os.makedirs('static/models', exist_ok=True)
+    with open('forecast.json', 'w') as f:
+        json.dump(forecast_document(), f)
+    os.environ['WEATHER_SOURCE'] = 'forecast.json'
+    G = grid_graph(rows, cols)
+    for _, _, data in G.edges(data=True):
+        data.pop('weight')
+    with open('static/models/nyc_graph.pkl', 'wb') as f:
+        pickle.dump(G, f)
+    model = traffic_model()
+
+    import app
+    app.download_from_s3 = lambda **kw: None
+    app.load_or_train_model = lambda: (model, X_COLUMNS)
+    t_start = time.perf_counter()
+    app.initialize(wait=True)
+    assert app.INITIALIZATION_COMPLETE, app.INITIALIZATION_ERROR
+    print(f"Synthetic app: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges, "
+          f"initialized in {time.perf_counter() - t_start:.1f}s")
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--cols', type=int, default=100)
+    parser.add_argument('--routes', type=int, default=300)
+    parser.add_argument('--depots', type=int, default=10)
+    parser.add_argument('--departures', type=int, default=3, help='Distinct departure hours (0 for current weights)')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_batch_'))
+    app = start_app(args.rows, args.cols)
+
+    rng = np.random.default_rng(7)
+    depots = [intersection(rng, args.rows, args.cols) for _ in range(args.depots)]
+    base = datetime.now().replace(minute=0, second=0, microsecond=0)
+    hours = [base + timedelta(hours=h + 1) for h in range(args.departures)]
+    entries = []
+    for n in range(args.routes):
+        entry = {'id': n, 'start': depots[int(rng.integers(len(depots)))], 'end': intersection(rng, args.rows, args.cols)}
+        if hours:
+            departure = hours[int(rng.integers(len(hours)))]
+            entry.update(date=departure.strftime('%Y-%m-%d'), time=departure.strftime('%H:%M'))
+        entries.append(entry)
+
+    # Same starting point for both runs: forecast slices ready, addresses resolved, no route cache
+    deadline = time.time() + 300
+    while any(app.FORECAST_SCHEDULER.lookup(h) is None for h in hours) and time.time() < deadline:
+        time.sleep(0.5)
+    for address in set(e['start'] for e in entries) | set(e['end'] for e in entries):
+        app.find_nearest_node(app.GRAPH, address)
+    app.NODE_STORE.flush()
+    app.ROUTE_CACHE = None
+    client = app.app.test_client()
+
+    t_start = time.perf_counter()
+    single = [client.post('/api/route', json=e).get_json() for e in entries]
+    single_time = time.perf_counter() - t_start
+
+    t_start = time.perf_counter()
+    first_line = None
+    lines = []
+    response = client.post('/api/routes/batch', json={'routes': entries}, buffered=False)
+    for raw in response.response:
+        for line in raw.decode().splitlines():
+            if first_line is None:
+                first_line = time.perf_counter() - t_start
+            lines.append(json.loads(line))
+    batch_time = time.perf_counter() - t_start
+
+    summary = lines.pop()['summary']
+    batch = {line['index']: line for line in lines}
+    assert len(batch) == len(entries)
+    for i, result in enumerate(single):
+        assert result['success'] == batch[i]['success'], (entries[i], result, batch[i])
+        assert batch[i]['id'] == entries[i]['id']
+        # Predicted weights tie often, so the two searches may pick different routes of equal cost
+        if result['success']:
+            assert abs(route_cost(app, entries[i], batch[i]['route'])
+                       - route_cost(app, entries[i], result['route'])) < 1e-6, entries[i]
+
+    print(f"{len(entries)} routes from {args.depots} depots over {max(args.departures, 1)} weight slices")
+    print(f"/api/route        {single_time:.2f}s  {len(entries) / single_time:7.1f} routes/s")
+    print(f"/api/routes/batch {batch_time:.2f}s  {len(entries) / batch_time:7.1f} routes/s "
+          f"({single_time / batch_time:.1f}x), first line after {first_line * 1000:.0f}ms, "
+          f"{summary['searches']} searches")
+    print(f"All {summary['succeeded']} routes cost the same as the single-route endpoint's")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Congestion overlay tiles: generation and cache-hit cost per zoom, and bytes vs shipping the whole graph
+
+A 1280x800 viewport of 256px tiles is requested at each zoom over the
+middle of a synthetic street grid, cold (generated) and warm (cached).
+The baseline is every street segment with its congestion level as one
+JSON document, what a browser-side overlay would need without tiles.
+
+Usage: python benchmarks/bench_congestion_tiles.py [--size 230] [--zooms 12,13,14,15,16,17]
+"""
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+
+from synthetic import grid_graph
+from routing import RoutingGraph, CONGESTION_LEVEL_MAX
+from congestion_tiles import CongestionTiles, mercator_xy, CONGESTION_TILE_BUFFER, CONGESTION_TILE_EXTENT
+
+VIEWPORT_TILES = (5, 4)  # 1280x800 pixels of 256px tiles
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=230, help='Grid side length')
+    parser.add_argument('--zooms', default='12,13,14,15,16,17')
+    args = parser.parse_args()
+
+    G = grid_graph(args.size, args.size)
+    router = RoutingGraph.from_graph(G)
+    weights = np.random.default_rng(7).gamma(1.5, 0.8, router.num_edges)
+    prepared = router.prepare(weights, 'bench')
+    t_start = time.perf_counter()
+    tiles = CongestionTiles(router)
+    index_ms = (time.perf_counter() - t_start) * 1000
+
+    seg = np.arange(tiles.num_segments)
+    level = np.minimum(1.0, prepared.arc_weight[tiles.seg_arcs].max(axis=1) / CONGESTION_LEVEL_MAX)
+    whole = json.dumps(np.column_stack((router.node_y[tiles.seg_u[seg]], router.node_x[tiles.seg_u[seg]],
+                                        router.node_y[tiles.seg_v[seg]], router.node_x[tiles.seg_v[seg]],
+                                        level)).round(6).tolist(), separators=(',', ':')).encode()
+    whole_gz = len(gzip.compress(whole, 6))
+    print(f"{router.num_nodes} nodes, {tiles.num_segments} street segments; tile index built in {index_ms:.0f}ms")
+    print(f"Baseline: the whole network with congestion levels is {len(whole) / 1e6:.1f}MB "
+          f"({whole_gz / 1e6:.2f}MB gzip)")
+
+    mx, my = mercator_xy(router.node_y.mean(), router.node_x.mean())
+    print(f"\n{'zoom':>4} {'tiles':>6} {'segments':>9} {'bytes':>9} {'gzip':>8} {'vs whole':>9} "
+          f"{'cold ms/tile':>13} {'warm ms/tile':>13}")
+    for zoom in [int(z) for z in args.zooms.split(',')]:
+        cx, cy = int(mx * 2 ** zoom), int(my * 2 ** zoom)
+        keys = [(x, y) for x in range(cx - VIEWPORT_TILES[0] // 2, cx + (VIEWPORT_TILES[0] + 1) // 2)
+                for y in range(cy - VIEWPORT_TILES[1] // 2, cy + (VIEWPORT_TILES[1] + 1) // 2)]
+        cold, warm, raw, packed, segments = [], [], 0, 0, 0
+        for x, y in keys:
+            t_start = time.perf_counter()
+            body, _ = tiles.get('bench', prepared, zoom, x, y)
+            cold.append((time.perf_counter() - t_start) * 1000)
+            t_start = time.perf_counter()
+            tiles.get('bench', prepared, zoom, x, y)
+            warm.append((time.perf_counter() - t_start) * 1000)
+            raw += len(body)
+            packed += len(gzip.compress(body, 6))
+            segments += sum(len(coords) for coords in json.loads(body)['levels']) // 4
+        print(f"{zoom:>4} {len(keys):>6} {segments:>9} {raw:>9} {packed:>8} {packed / whole_gz:>9.1%} "
+              f"{np.mean(cold):>13.2f} {np.mean(warm):>13.3f}")
+    print(f"\nTile cache: {tiles.status()}")
+
+    # Incidents at two opposite corners of the viewport drop the tiles around each, not everything between
+    center = args.size // 2
+    nodes = [router.node_index[(center + dr) * args.size + center + dc] for dr, dc in ((-5, -10), (5, 10))]
+    arcs = np.concatenate([np.arange(router.offsets[n], router.offsets[n + 1]) for n in nodes])
+    cached = list(tiles._tiles)
+    xs, ys = mercator_xy(router.node_y[router.arc_source[arcs]], router.node_x[router.arc_source[arcs]])
+    pad = CONGESTION_TILE_BUFFER / CONGESTION_TILE_EXTENT
+    one_box = sum(1 for _, z, x, y in cached
+                  if xs.max() >= (x - pad) / 2 ** z and xs.min() <= (x + 1 + pad) / 2 ** z
+                  and ys.max() >= (y - pad) / 2 ** z and ys.min() <= (y + 1 + pad) / 2 ** z)
+    t_start = time.perf_counter()
+    dropped = tiles.invalidate_arcs(arcs)
+    invalidate_ms = (time.perf_counter() - t_start) * 1000
+    zoom = max(z for _, z, _, _ in cached)
+    holding = {('bench', zoom, int(x * 2 ** zoom), int(y * 2 ** zoom)) for x, y in zip(xs, ys)}
+    assert dropped <= one_box and not holding & set(tiles._tiles), (dropped, one_box)
+    print(f"Invalidating {len(arcs)} arcs at two corners dropped {dropped} of {len(cached)} cached tiles "
+          f"in {invalidate_ms:.1f}ms (one box around both would drop {one_box})")
+
+if __name__ == '__main__':
+    main()
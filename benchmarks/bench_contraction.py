@@ -0,0 +1,56 @@
+"""Contraction hierarchy preprocessing cost and query latency
+
+Usage: python benchmarks/bench_contraction.py [--rows 80] [--cols 80] [--queries 200]
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import grid_graph
+from routing import RoutingGraph
+from contraction import ContractionHierarchy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=80)
+    parser.add_argument('--cols', type=int, default=80)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    router = RoutingGraph.from_graph(G)
+    print(f"Synthetic graph: {router.num_nodes} nodes, {router.num_arcs} arcs")
+
+    hierarchy = ContractionHierarchy.build(router, router.base)
+    print(f"Preprocessing: {hierarchy.build_time:.1f}s, {hierarchy.num_shortcuts} shortcuts "
+          f"({hierarchy.num_shortcuts / router.num_arcs:.2f} per arc)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'nyc_graph.ch.npz')
+        hierarchy.save(path)
+        t_start = time.perf_counter()
+        router.attach_hierarchy(ContractionHierarchy.load(path))
+        print(f"Saved {os.path.getsize(path) / 1024:.0f}KB, loaded in {(time.perf_counter() - t_start) * 1000:.0f}ms")
+
+    rng = np.random.default_rng(5)
+    pairs = [tuple(rng.choice(router.num_nodes, 2, replace=False).tolist()) for _ in range(args.queries)]
+    for algorithm in ('dijkstra', 'bidirectional', 'ch'):
+        settled = []
+        t_start = time.perf_counter()
+        paths = [router.shortest_path(s, t, algorithm=algorithm) for s, t in pairs]
+        elapsed = (time.perf_counter() - t_start) / len(pairs)
+        settled = [p['settled'] for p in paths]
+        if algorithm == 'dijkstra':
+            reference = paths
+        for path, expected in zip(paths, reference):
+            assert math.isclose(path['cost'], expected['cost'], rel_tol=1e-9)
+            assert math.isclose(float(router.base.edge_weight[path['edges']].sum()), expected['cost'], rel_tol=1e-9)
+            assert path['algorithm'] == algorithm
+        print(f"  {algorithm:<14} mean settled {np.mean(settled):7.0f}  mean latency {elapsed * 1000:6.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Best-departure sweep: fixed path set pricing vs a full search per departure hour
+
+Hourly weight slices come from the synthetic model over a synthetic
+forecast, optionally with extra per-edge, per-hour noise so the best path
+changes between hours. Predicting the slices one hour at a time is also
+timed against one batched pass for the whole window.
+
+Usage: python benchmarks/bench_departures.py [--rows 230] [--cols 230] [--hours 12] [--queries 10] [--noise 0.1]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from synthetic import grid_graph, traffic_model, forecast_document, X_COLUMNS
+from weather import parse_forecast
+from weights import edge_features, compute_weight_slice, compute_weight_slices
+from routing import RoutingGraph
+from departures import sweep_departures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=230)
+    parser.add_argument('--cols', type=int, default=230)
+    parser.add_argument('--hours', type=int, default=12)
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('--noise', type=float, default=0.1, help='Per-edge, per-hour multiplicative noise on the model weights')
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    router = RoutingGraph.from_graph(G)
+    columns = edge_features([d for _, _, d in G.edges(data=True)])
+    model = traffic_model()
+    rng = np.random.default_rng(13)
+
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    periods = parse_forecast(forecast_document(args.hours, start=start))
+    departures = [(weather, start + timedelta(hours=h)) for h, (_, _, weather) in enumerate(periods[:args.hours])]
+    t_start = time.perf_counter()
+    predicted = [compute_weight_slice(columns, model, weather, X_COLUMNS, now) for weather, now in departures]
+    per_hour_ms = (time.perf_counter() - t_start) * 1000
+    t_start = time.perf_counter()
+    batched = compute_weight_slices(columns, model, departures, X_COLUMNS)
+    batched_ms = (time.perf_counter() - t_start) * 1000
+    assert np.allclose(batched, predicted, rtol=1e-6)
+    print(f"Predicting {len(departures)} slices: {per_hour_ms:.0f}ms one hour at a time, {batched_ms:.0f}ms batched")
+
+    slices = []
+    for h, weights in enumerate(predicted):
+        if args.noise:
+            weights = (weights * rng.lognormal(0, args.noise, len(weights))).astype(np.float32)
+        slices.append((weights, f"bench:{h}"))
+    print(f"Synthetic graph: {router.num_nodes} nodes, {router.num_arcs} arcs; {len(slices)} hourly slices")
+
+    sweep_ms, exact_ms, naive_ms, gaps = [], [], [], []
+    for s, t in rng.integers(0, router.num_nodes, (args.queries, 2)).tolist():
+        source, target = router.node_id(s), router.node_id(t)
+        # Slices are prepared once per process in the app too (cached by key)
+        for weights, key in slices:
+            router.prepare(weights, key)
+
+        t_start = time.perf_counter()
+        sweep = sweep_departures(router, source, target, slices)
+        sweep_ms.append((time.perf_counter() - t_start) * 1000)
+
+        t_start = time.perf_counter()
+        exact = sweep_departures(router, source, target, slices, search_every=1, alternatives=1)
+        exact_ms.append((time.perf_counter() - t_start) * 1000)
+
+        t_start = time.perf_counter()
+        naive = []
+        for w, k in slices:
+            path = router.shortest_path(source, target, weights=w, key=k, algorithm='bidirectional')
+            router.route_summary(path)
+            naive.append(path['cost'])
+        naive_ms.append((time.perf_counter() - t_start) * 1000)
+
+        # Equal-cost paths can differ in travel time, so compare search costs
+        assert np.allclose(exact['cost'], naive, rtol=1e-6)
+        assert np.all(sweep['cost'] >= exact['cost'] * (1 - 1e-6))
+        gaps.extend((sweep['cost'] / exact['cost'] - 1).tolist())
+
+    print(f"\n{args.queries} queries, {args.hours}-hour window:")
+    print(f"  path set sweep    {np.mean(sweep_ms):6.0f}ms mean, {max(sweep_ms):6.0f}ms max")
+    print(f"  exact sweep       {np.mean(exact_ms):6.0f}ms mean, {max(exact_ms):6.0f}ms max")
+    print(f"  search per hour   {np.mean(naive_ms):6.0f}ms mean, {max(naive_ms):6.0f}ms max")
+    print(f"  path set route cost vs exact: {np.mean(gaps) * 100:+.2f}% mean, {max(gaps) * 100:+.2f}% max")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Compare per-edge and batched edge-weight inference on a synthetic graph
+
+Usage: python benchmarks/bench_edge_weights.py [--rows 150] [--cols 150] [--legacy-edges 3000]
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from synthetic import grid_graph, traffic_model, X_COLUMNS, WEATHER
+from weights import edge_features, constant_features, build_feature_matrix, predict_edge_weights
+
+def legacy_edge_weights(edges, model, current_weather, X_columns, now):
+    """Original one-DataFrame-per-edge inference loop"""
+    weights = []
+    for u, v, key, data in edges:
+        edge_features = {
+            'Severity': 2,
+            'Start_Lat': data.get('y', 40.7128),
+            'Start_Lng': data.get('x', -74.0060),
+            'Distance(mi)': data.get('length', 100)/1609.34,
+            'Temperature(F)': current_weather['Temperature(F)'],
+            'Humidity(%)': current_weather['Humidity(%)'],
+            'Visibility(mi)': current_weather['Visibility(mi)'],
+            'WindSpeed(mph)': current_weather['WindSpeed(mph)'],
+            'Precipitation(in)': current_weather['Precipitation(in)'],
+            'Start_Hour': now.hour,
+            'Start_Minute': now.minute,
+            'Start_Day': now.day,
+            'Start_Month': now.month,
+            'Start_DayOfWeek': now.weekday(),
+            'Duration_min': 10,
+            'DelayFromFreeFlowSpeed(mins)': 0
+        }
+        current_condition = current_weather['Weather_Conditions']
+        for col in X_columns[X_columns.str.startswith('Weather_Conditions_')]:
+            condition_name = col.split('_')[-1]
+            edge_features[col] = int(condition_name in current_condition)
+        features_df = pd.DataFrame([edge_features])[X_columns]
+        weights.append(max(model.predict(features_df)[0], 0.1))
+    return np.array(weights)
+
+def batched_edge_weights(edges, model, current_weather, X_columns, now):
+    """Batched inference path used by app.calculate_edge_weights"""
+    edge_columns = edge_features([data for _, _, _, data in edges])
+    X = build_feature_matrix(edge_columns, constant_features(current_weather, now, X_columns), X_columns)
+    return predict_edge_weights(model, X)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=150)
+    parser.add_argument('--cols', type=int, default=150)
+    parser.add_argument('--legacy-edges', type=int, default=3000,
+                        help='edges scored by the slow per-edge loop (it is extrapolated to the full graph)')
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    model = traffic_model()
+    now = datetime(2022, 3, 14, 8, 0)
+    edges = list(G.edges(keys=True, data=True))
+    print(f"Synthetic graph: {G.number_of_nodes()} nodes, {len(edges)} edges")
+
+    sample = edges[:args.legacy_edges]
+    t_start = time.perf_counter()
+    legacy = legacy_edge_weights(sample, model, WEATHER, X_COLUMNS, now)
+    legacy_time = time.perf_counter() - t_start
+    legacy_rate = len(sample) / legacy_time
+
+    t_start = time.perf_counter()
+    batched = batched_edge_weights(edges, model, WEATHER, X_COLUMNS, now)
+    batched_time = time.perf_counter() - t_start
+    batched_rate = len(edges) / batched_time
+
+    max_diff = float(np.max(np.abs(batched[:len(sample)] - legacy)))
+    print(f"Per-edge loop: {len(sample)} edges in {legacy_time:.2f}s ({legacy_rate:,.0f} edges/s, "
+          f"~{len(edges) / legacy_rate:.1f}s extrapolated for the full graph)")
+    print(f"Batched:       {len(edges)} edges in {batched_time:.2f}s ({batched_rate:,.0f} edges/s)")
+    print(f"Speedup: {batched_rate / legacy_rate:.0f}x, max abs difference: {max_diff:.2e}")
+
+if __name__ == '__main__':
+    main()
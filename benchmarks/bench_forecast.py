@@ -0,0 +1,66 @@
+"""Time-specific route weights: forecast-hour precompute vs on-demand inference
+
+Usage: python benchmarks/bench_forecast.py [--rows 150] [--cols 150] [--hours 48]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from synthetic import grid_graph, traffic_model, forecast_document, X_COLUMNS
+from weights import edge_features, compute_weight_slice
+from weather import WeatherProvider, FileSource
+from forecast_scheduler import ForecastScheduler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=150)
+    parser.add_argument('--cols', type=int, default=150)
+    parser.add_argument('--hours', type=int, default=48)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    columns = edge_features([d for _, _, d in G.edges(data=True)])
+    model = traffic_model()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture = os.path.join(tmp, 'forecast.json')
+        with open(fixture, 'w') as f:
+            json.dump(forecast_document(args.hours), f)
+        provider = WeatherProvider(FileSource(fixture))
+        scheduler = ForecastScheduler(provider, model, columns, X_COLUMNS, horizon_hours=args.hours)
+
+        t_start = time.perf_counter()
+        provider.refresh()
+        computed = scheduler.run_once()
+        precompute = time.perf_counter() - t_start
+        status = scheduler.status()
+
+        periods, _ = provider.periods()
+        tomorrow_8am = (periods[0][0] + timedelta(days=1)).replace(hour=8, tzinfo=None)
+        t_start = time.perf_counter()
+        for _ in range(1000):
+            weights, key = scheduler.lookup(tomorrow_8am)
+        lookup = (time.perf_counter() - t_start) / 1000
+
+        weather = provider.forecast_for(tomorrow_8am)
+        t_start = time.perf_counter()
+        expected = compute_weight_slice(columns, model, weather, X_COLUMNS, tomorrow_8am)
+        on_demand = time.perf_counter() - t_start
+        assert np.array_equal(weights, expected)
+
+        # A re-plan with an unchanged forecast has nothing left to compute
+        assert scheduler.run_once() == 0
+
+    print(f"Synthetic graph: {G.number_of_edges()} edges; {len(status['hours'])} forecast hours")
+    print(f"Signature columns: {len(status['signature_columns'])}/{len(X_COLUMNS)} model columns")
+    print(f"Background precompute: {computed} slices ({status['deduplicated']} hours shared a slice) "
+          f"in {precompute:.2f}s, {status['slices_mb']}MB")
+    print(f"Route for tomorrow 8am ({key}): ready slice {lookup * 1e6:.1f}us vs on-demand {on_demand * 1000:.1f}ms")
+
+if __name__ == '__main__':
+    main()
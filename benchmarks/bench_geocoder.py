@@ -0,0 +1,66 @@
+"""Intersection lookup latency: local street-name geocoder vs a fuzzy scan of every name
+
+Usage: python benchmarks/bench_geocoder.py [--rows 150] [--cols 150]
+"""
+import argparse
+import difflib
+import time
+
+from synthetic import grid_graph, ordinal
+from geocoder import LocalGeocoder, canonical_street
+
+QUERIES = [
+    ('5th ave & 42nd st', 41, 4),
+    ('Fifth Avenue and 42nd Street, New York, NY', 41, 4),
+    ('42 st @ 5 av', 41, 4),
+    ('7th Avenue / West 34th Street', 33, 6),
+    ('12th ave at 100th st, Manhattan', 99, 11),
+    ('3rd Avenu & 18th Street', 17, 2),
+]
+
+def timed(fn, repeat=1):
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - t_start) / repeat
+
+def fuzzy_resolve(geocoder, address):
+    """Baseline: best fuzzy match of each street against every indexed name"""
+    parts = [p.strip() for p in address.lower().split('&')]
+    streets = [difflib.get_close_matches(canonical_street(p), geocoder.names, n=1, cutoff=0.0)[0] for p in parts]
+    return next(iter(geocoder.street_nodes[streets[0]] & geocoder.street_nodes[streets[1]]), None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=150)
+    parser.add_argument('--cols', type=int, default=150)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    geocoder, build_time = timed(lambda: LocalGeocoder.from_graph(G))
+    print(f"Synthetic graph: {G.number_of_nodes()} nodes; {len(geocoder)} street names indexed in {build_time * 1000:.0f}ms")
+
+    for query, row, col in QUERIES:
+        match, elapsed = timed(lambda: geocoder.resolve(query), repeat=200)
+        assert match is not None and match['node'] == row * args.cols + col, (query, match)
+        print(f"{query:45s} -> {' & '.join(match['streets']):22s} {elapsed * 1e6:8.1f}us")
+
+    assert geocoder.resolve('350 5th Avenue') is None
+    assert geocoder.resolve('Nonexistent Rd & Imaginary Ln') is None
+
+    # The same two street names crossing in Manhattan (a divided avenue: two nodes) and in Brooklyn
+    twins = LocalGeocoder({'1st ave': {1, 2, 3}, '1st st': {1, 2, 3}},
+                          {1: (40.7231, -73.9845), 2: (40.7232, -73.9843), 3: (40.6745, -73.9955)})
+    assert twins.resolve('1st ave & 1st st') is None
+    assert twins.resolve('1st Avenue & 1st Street, Manhattan, NY')['node'] in (1, 2)
+    assert twins.resolve('1st ave and 1st st, brooklyn')['node'] == 3
+    assert twins.resolve('1st ave & 1st st, the bronx') is None
+
+    baseline = f"{ordinal(5)} avenue & {ordinal(42)} street"
+    _, local_time = timed(lambda: geocoder.resolve(baseline), repeat=200)
+    _, fuzzy_time = timed(lambda: fuzzy_resolve(geocoder, baseline), repeat=5)
+    print(f"Exact-name lookup {local_time * 1e6:.1f}us vs fuzzy scan {fuzzy_time * 1e3:.2f}ms "
+          f"({fuzzy_time / local_time:.0f}x); single streets and unknown names fall back to remote geocoding")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Graph load time and RSS: pickled osmnx MultiDiGraph vs the columnar graph store
+
+Each format is loaded in a fresh interpreter so RSS reflects only that load.
+
+Usage: python benchmarks/bench_graph_store.py [--rows 250] [--cols 250]
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from shapely.geometry import LineString
+
+from synthetic import grid_graph
+from rss import current_rss_mb
+
+def osm_like(G):
+    """Decorate synthetic edges with the geometry and tags osmnx keeps"""
+    for u, v, data in G.edges(data=True):
+        a, b = G.nodes[u], G.nodes[v]
+        mid = ((a['x'] + b['x']) / 2 + 1e-5, (a['y'] + b['y']) / 2)
+        data.update(geometry=LineString([(a['x'], a['y']), mid, (b['x'], b['y'])]),
+                    highway='residential', oneway=False, reversed=False, lanes='2',
+                    maxspeed='25 mph', osmid=[data['osmid'], data['osmid'] + 1])
+    for node, data in G.nodes(data=True):
+        data.update(highway='traffic_signals' if node % 7 == 0 else None, osmid=node)
+    return G
+
+def load_in_child(kind, path):
+    """Load one format in this process and print timing/RSS as JSON"""
+    before = current_rss_mb()
+    t_start = time.perf_counter()
+    if kind == 'pickle':
+        import networkx  # noqa: F401 -- import cost is not part of the load
+        t_start = time.perf_counter()
+        with open(path, 'rb') as f:
+            G = pickle.load(f)
+        from routing import RoutingGraph
+        ready = time.perf_counter() - t_start
+        router = RoutingGraph.from_graph(G)
+    else:
+        from graph_store import GraphStore
+        from routing import RoutingGraph
+        t_start = time.perf_counter()
+        store = GraphStore(path)
+        ready = time.perf_counter() - t_start
+        router = RoutingGraph.from_store(store)
+    serving = time.perf_counter() - t_start
+    print(json.dumps({'load_s': ready, 'serving_s': serving, 'rss_mb': current_rss_mb() - before,
+                      'arcs': router.num_arcs}))
+
+def child(kind, path):
+    output = subprocess.run([sys.executable, __file__, '--child', kind, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=250)
+    parser.add_argument('--cols', type=int, default=250)
+    parser.add_argument('--child', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return load_in_child(*args.child)
+
+    from graph_store import convert_graph, GraphStore
+    from geocoder import LocalGeocoder
+    from routing import RoutingGraph
+    from weights import edge_features
+
+    G = osm_like(grid_graph(args.rows, args.cols))
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, 'nyc_graph.pkl')
+        store_path = os.path.join(tmp, 'nyc_graph.store')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(G, f)
+        t_start = time.perf_counter()
+        convert_graph(G, store_path, pickle_path)
+        convert = time.perf_counter() - t_start
+
+        store = GraphStore(store_path)
+        a, b = RoutingGraph.from_graph(G), RoutingGraph.from_store(store)
+        assert np.array_equal(a.node_ids, b.node_ids) and np.array_equal(a.edge_u, b.edge_u)
+        assert np.array_equal(a.edge_v, b.edge_v) and np.array_equal(a.base.edge_weight, b.base.edge_weight)
+        assert store.edge_list() == list(G.edges(keys=True))
+        expected = edge_features([d for _, _, d in G.edges(data=True)])
+        assert all(np.array_equal(expected[k], v) for k, v in store.edge_columns().items())
+        assert LocalGeocoder.from_graph(G).street_nodes == LocalGeocoder.from_store(store).street_nodes
+        t_start = time.perf_counter()
+        H = store.graph()
+        materialize = time.perf_counter() - t_start
+        assert list(H.edges(keys=True)) == list(G.edges(keys=True))
+
+        pickled = child('pickle', pickle_path)
+        columnar = child('store', store_path)
+        sizes = (os.path.getsize(pickle_path),
+                 sum(os.path.getsize(os.path.join(store_path, f)) for f in os.listdir(store_path)))
+
+    print(f"Synthetic graph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges with osmnx-style geometry/tags")
+    print(f"{'format':8s} {'on disk':>9s} {'load':>9s} {'to router':>10s} {'RSS':>9s}")
+    for name, result, size in (('pickle', pickled, sizes[0]), ('store', columnar, sizes[1])):
+        print(f"{name:8s} {size / 2**20:7.1f}MB {result['load_s'] * 1000:7.1f}ms "
+              f"{result['serving_s'] * 1000:8.1f}ms {result['rss_mb']:7.1f}MB")
+    print(f"Conversion {convert:.2f}s; lazy networkx materialization {materialize:.2f}s when a code path needs it")
+
+if __name__ == '__main__':
+    main()
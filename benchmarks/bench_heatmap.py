@@ -0,0 +1,88 @@
+"""Heatmap bins: viewport payloads and query latency vs shipping the whole location counts CSV
+
+A synthetic filtered_location_counts.csv is written to a temporary
+directory, aggregated and persisted; viewports of a 1280x800 map are then
+answered tile by tile, as static/utils.js requests them, at several zooms.
+
+Usage: python benchmarks/bench_heatmap.py [--rows 500000] [--zooms 4,7,10,13] [--viewports 20]
+"""
+import os
+import argparse
+import json
+import math
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import location_counts
+from heatmap import load_or_build_heatmap, mercator_cells
+
+VIEWPORT_TILES = (5, 4)  # 1280x800 pixels of 256px tiles
+
+def tile_bbox(x, y, z, inset=1 / 64):
+    """(south, west, north, east) just inside a tile, as the page requests it"""
+    n = 2 ** z
+    lng = lambda t: t / n * 360 - 180
+    lat = lambda t: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * t / n))))
+    return lat(y + 1 - inset), lng(x + inset), lat(y + inset), lng(x + 1 - inset)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--zooms', default='4,7,10,13')
+    parser.add_argument('--viewports', type=int, default=20)
+    args = parser.parse_args()
+
+    frame = location_counts(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'filtered_location_counts.csv')
+        index_path = os.path.join(tmp, 'heatmap_bins.npz')
+        frame.to_csv(csv_path, index=False)
+        csv_bytes = os.path.getsize(csv_path)
+
+        t_start = time.perf_counter()
+        load_or_build_heatmap(csv_path, index_path)
+        build_s = time.perf_counter() - t_start
+        t_start = time.perf_counter()
+        bins = load_or_build_heatmap(csv_path, index_path)
+        load_s = time.perf_counter() - t_start
+        index_bytes = os.path.getsize(index_path)
+
+    year = bins.years[-1]
+    year_rows = frame[frame['Start_Year'] == year]
+    year_csv_bytes = csv_bytes * len(year_rows) / len(frame)
+    print(f"{len(frame)} rows, CSV {csv_bytes / 1e6:.1f}MB; bins built in {build_s:.1f}s "
+          f"({index_bytes / 1e6:.1f}MB on disk), loaded in {load_s * 1000:.0f}ms")
+    print(f"Before: every page load downloads {csv_bytes / 1e6:.1f}MB and parses {len(frame)} rows in the browser, "
+          f"keeping {len(year_rows)} for {year}")
+
+    centers = year_rows.sample(args.viewports, random_state=1)[['Start_Lat', 'Start_Lng']].to_numpy()
+    print(f"\n{'zoom':>4} {'tiles':>6} {'bins':>8} {'JSON bytes':>11} {'vs CSV':>7} {'query ms/tile':>14}")
+    for zoom in [int(z) for z in args.zooms.split(',')]:
+        tiles, bins_sent, payload, query_ms = 0, 0, 0, []
+        for lat, lng in centers:
+            cx, cy = mercator_cells(lat, lng, zoom)
+            for x in range(int(cx) - VIEWPORT_TILES[0] // 2, int(cx) + (VIEWPORT_TILES[0] + 1) // 2):
+                for y in range(int(cy) - VIEWPORT_TILES[1] // 2, int(cy) + (VIEWPORT_TILES[1] + 1) // 2):
+                    if not 0 <= y < 2 ** zoom:
+                        continue
+                    south, west, north, east = tile_bbox(x % 2 ** zoom, y, zoom)
+                    t_start = time.perf_counter()
+                    level, lat_, lng_, count, year_max = bins.query(south, west, north, east, zoom, year)
+                    body = json.dumps({"success": True, "zoom": level, "year": year, "max": year_max,
+                                       "bins": np.column_stack((lat_.astype(np.float64).round(5),
+                                                                lng_.astype(np.float64).round(5),
+                                                                count.astype(np.float64))).tolist()})
+                    query_ms.append((time.perf_counter() - t_start) * 1000)
+                    tiles += 1
+                    bins_sent += len(count)
+                    payload += len(body)
+        viewports = len(centers)
+        print(f"{zoom:>4} {tiles / viewports:>6.0f} {bins_sent / viewports:>8.0f} {payload / viewports:>11.0f} "
+              f"{payload / viewports / csv_bytes:>7.2%} {np.mean(query_ms):>14.2f}")
+    print(f"\n(per viewport, mean over {len(centers)} viewports centred on {year} locations; "
+          f"the year's share of the CSV alone is {year_csv_bytes / 1e6:.1f}MB)")
+
+if __name__ == '__main__':
+    main()
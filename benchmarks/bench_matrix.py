@@ -0,0 +1,65 @@
+"""Scaling of the origin-destination travel time matrix against per-pair route searches
+
+Usage: python benchmarks/bench_matrix.py [--rows 230] [--cols 230] [--sizes 10,100,500] [--pair-samples 50]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import grid_graph
+from routing import RoutingGraph
+from matrix import TravelTimeMatrix
+from rss import PeakRSS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=230)
+    parser.add_argument('--cols', type=int, default=230)
+    parser.add_argument('--sizes', default='10,100,500')
+    parser.add_argument('--pair-samples', type=int, default=50, help='Route searches timed to estimate the per-pair cost')
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    router = RoutingGraph.from_graph(G)
+    rng = np.random.default_rng(5)
+    weights = rng.uniform(0.1, 3.0, router.num_edges)
+    prepared = router.prepare(weights, 'bench')
+    print(f"Synthetic graph: {router.num_nodes} nodes, {router.num_arcs} arcs")
+
+    # Per-pair baseline: one bidirectional search plus route_summary per cell
+    samples = rng.integers(0, router.num_nodes, (args.pair_samples, 2))
+    t_start = time.perf_counter()
+    for s, t in samples.tolist():
+        router.route_summary(router.shortest_path(router.node_id(s), router.node_id(t), weights=weights,
+                                                  key='bench', algorithm='bidirectional'))
+    per_pair = (time.perf_counter() - t_start) / len(samples)
+
+    t_start = time.perf_counter()
+    matrix = TravelTimeMatrix(router, prepared)
+    print(f"Matrix graph prepared in {(time.perf_counter() - t_start) * 1000:.1f}ms; "
+          f"per-pair search {per_pair * 1000:.1f}ms")
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        origins = rng.integers(0, router.num_nodes, size)
+        destinations = rng.integers(0, router.num_nodes, size)
+        with PeakRSS() as rss:
+            t_start = time.perf_counter()
+            minutes, miles = matrix.compute(origins, destinations)
+            elapsed = time.perf_counter() - t_start
+
+        # Spot-check cells against full route searches
+        for i, j in rng.integers(0, size, (10, 2)).tolist():
+            path = router.shortest_path(router.node_id(int(origins[i])), router.node_id(int(destinations[j])),
+                                        weights=weights, key='bench')
+            summary = router.route_summary(path)
+            assert abs(summary['estimated_travel_time'] - minutes[i, j]) <= 0.051, (summary, minutes[i, j])
+            assert abs(summary['distance_miles'] - miles[i, j]) <= 0.051, (summary, miles[i, j])
+
+        cells = size * size
+        print(f"{size}x{size}: {elapsed:.2f}s ({cells / elapsed:,.0f} cells/s), "
+              f"peak RSS +{rss.peak - rss.start:.0f}MB, "
+              f"per-pair searches ~{per_pair * cells:.1f}s ({per_pair * cells / elapsed:.0f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Address -> node lookups: SQLite node store vs loading the legacy pickled dict
+
+Usage: python benchmarks/bench_node_store.py [--entries 100000] [--writers 4]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import synthetic  # noqa: F401 -- puts the repo root on sys.path
+from node_store import NodeStore
+
+def timed(fn, repeat=1):
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - t_start) / repeat
+
+def address(i):
+    return f"{i} broadway, new york, ny"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--writers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'node_cache.pkl')
+        with open(legacy_path, 'wb') as f:
+            pickle.dump({address(i): i for i in range(args.entries)}, f)
+        legacy, pickle_load = timed(lambda: pickle.load(open(legacy_path, 'rb')))
+
+        path = os.path.join(tmp, 'node_cache.sqlite')
+        store = NodeStore(path, max_entries=args.entries * 2)
+        _, import_time = timed(lambda: store.import_pickle(legacy_path))
+        _, open_time = timed(lambda: NodeStore(path, max_entries=args.entries * 2))
+        print(f"{args.entries} addresses: pickle load {pickle_load * 1000:.0f}ms at every startup; "
+              f"store open {open_time * 1000:.1f}ms after a one-time {import_time * 1000:.0f}ms import")
+
+        rng = np.random.default_rng(7)
+        keys = [address(i) for i in rng.integers(0, args.entries, 10000).tolist()]
+        _, dict_lookup = timed(lambda: [legacy.get(key) for key in keys])
+        nodes, store_lookup = timed(lambda: [store.get(key) for key in keys])
+        assert nodes == [legacy[key] for key in keys]
+        store.flush()
+        print(f"lookup: dict {dict_lookup / len(keys) * 1e6:.2f}us, store {store_lookup / len(keys) * 1e6:.1f}us "
+              f"(hit timestamps committed in the background)")
+
+        # Concurrent writers, each adding its own addresses; none may be lost
+        per_writer = 5000
+        def write(w):
+            for i in range(per_writer):
+                store.put(f"{w} writer {i} st", args.entries + w * per_writer + i, 40.7, -74.0)
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(args.writers)]
+        t_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.flush()
+        write_time = time.perf_counter() - t_start
+        assert len(store) == args.entries + args.writers * per_writer
+        assert store.stats['write_errors'] == 0
+        assert store.get(f"{args.writers - 1} writer {per_writer - 1} st") == args.entries + args.writers * per_writer - 1
+        print(f"{args.writers} writers x {per_writer} puts: {write_time * 1000:.0f}ms, "
+              f"{args.writers * per_writer / write_time:.0f} puts/s, none lost")
+
+        # Least recently used rows are trimmed against the tracked count
+        small = NodeStore(os.path.join(tmp, 'small.sqlite'), max_entries=1000)
+        for i in range(3000):
+            small.put(address(i), i)
+        small.flush()
+        # Replacing the addresses still stored must not count as growth
+        for i in range(2000, 3000):
+            small.put(address(i), i + 1)
+        small.flush()
+        assert len(small) == 1000 and small._count == 1000, (len(small), small._count)
+        assert small.stats['evictions'] == 2000, small.stats
+        assert small.get(address(2999)) == 3000 and small.get(address(0)) is None
+        print(f"max_entries=1000 after 3000 addresses and 1000 replacements: {len(small)} rows, "
+              f"{small.stats['evictions']} evicted")
+
+if __name__ == '__main__':
+    main()
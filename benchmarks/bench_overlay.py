@@ -0,0 +1,68 @@
+"""Compare deep-copied request graphs with weight overlays under concurrent time-specific requests
+
+Usage: python benchmarks/bench_overlay.py [--rows 120] [--cols 120] [--concurrency 8]
+"""
+import argparse
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import networkx as nx
+
+from rss import PeakRSS
+from synthetic import grid_graph, index_edges, overlay_weight
+
+def deepcopy_route(G, weight_slice, source, target):
+    """Previous behaviour: copy the graph, write the slice onto it, then search"""
+    request_graph = copy.deepcopy(G)
+    for (_, _, data), weight in zip(request_graph.edges(data=True), weight_slice.tolist()):
+        data['weight'] = weight
+    return nx.dijkstra_path(request_graph, source, target, weight='weight')
+
+def overlay_route(G, weight_slice, source, target):
+    """Overlay the slice on the shared graph by edge index"""
+    return nx.dijkstra_path(G, source, target, weight=overlay_weight(weight_slice))
+
+def run(label, fn, G, slices, pairs, concurrency):
+    """Run all requests with a thread pool and report latency and peak RSS"""
+    latencies = []
+
+    def request(i):
+        t_start = time.perf_counter()
+        path = fn(G, slices[i % len(slices)], *pairs[i])
+        latencies.append(time.perf_counter() - t_start)
+        return path
+
+    with PeakRSS() as rss:
+        t_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            paths = list(pool.map(request, range(len(pairs))))
+        wall = time.perf_counter() - t_start
+    print(f"{label:<10} {len(pairs)} requests x{concurrency}: wall {wall:.2f}s, "
+          f"mean latency {np.mean(latencies) * 1000:.0f}ms, "
+          f"RSS {rss.start:.0f}MB -> peak {rss.peak:.0f}MB (+{rss.peak - rss.start:.0f}MB)")
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=120)
+    parser.add_argument('--cols', type=int, default=120)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=16)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    edges = index_edges(G)
+    rng = np.random.default_rng(0)
+    slices = [rng.uniform(0.1, 3.0, len(edges)).astype(np.float32) for _ in range(4)]
+    nodes = list(G.nodes)
+    pairs = [tuple(rng.choice(nodes, 2, replace=False).tolist()) for _ in range(args.requests)]
+    print(f"Synthetic graph: {G.number_of_nodes()} nodes, {len(edges)} edges")
+
+    overlay = run('overlay', overlay_route, G, slices, pairs, args.concurrency)
+    deep = run('deepcopy', deepcopy_route, G, slices, pairs, args.concurrency)
+    print(f"Identical paths: {overlay == deep}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Route response size and serialization time: full vs compact format, uncompressed, gzip and brotli
+
+Routes of increasing length are summarized exactly as /api/route does; the
+compact form is checked to decode back to the same geometry and totals.
+
+Usage: python benchmarks/bench_route_format.py [--rows 230] [--cols 230] [--routes 20] [--repeat 20]
+"""
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+
+from synthetic import grid_graph
+from routing import RoutingGraph
+from route_format import compact_route, decode_polyline, compress, brotli, GZIP_LEVEL
+
+def timed(fn, repeat):
+    """(result, mean ms) over repeat calls"""
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - t_start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=230)
+    parser.add_argument('--cols', type=int, default=230)
+    parser.add_argument('--routes', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    router = RoutingGraph.from_graph(G)
+    rng = np.random.default_rng(5)
+    routes = []
+    for s, t in rng.integers(0, router.num_nodes, (args.routes, 2)).tolist():
+        routes.append(router.route_summary(router.shortest_path(router.node_id(s), router.node_id(t), algorithm='bidirectional')))
+    routes.sort(key=lambda route: len(route['edges']))
+    print(f"Synthetic graph: {router.num_nodes} nodes; {len(routes)} routes of "
+          f"{len(routes[0]['edges'])}-{len(routes[-1]['edges'])} edges")
+
+    encodings = {'gzip': 'gzip', 'brotli': 'br'} if brotli is not None else {'gzip': 'gzip'}
+    sizes = {}
+    times = {}
+    for route in routes:
+        full, full_ms = timed(lambda: json.dumps({"success": True, "route": route}).encode(), args.repeat)
+        compact, compact_ms = timed(lambda: json.dumps({"success": True, "route": compact_route(route)}).encode(), args.repeat)
+
+        decoded = json.loads(compact)['route']
+        coords = decode_polyline(decoded['polyline'], decoded['precision'])
+        assert len(coords) == len(route['route_coords'])
+        assert np.abs(np.subtract(coords, route['route_coords'])).max() < 1e-5
+        assert np.allclose(decoded['edges']['actual_time'], [e['actual_time'] for e in route['edges']], atol=1e-3)
+        assert decoded['estimated_travel_time'] == route['estimated_travel_time']
+
+        rows = {'full': (full, full_ms), 'compact': (compact, compact_ms)}
+        for label, (body, ms) in list(rows.items()):
+            for name, encoding in encodings.items():
+                packed, packed_ms = timed(lambda: compress(body, encoding), args.repeat)
+                rows[f"{label} + {name}"] = packed, ms + packed_ms
+        for label, (body, ms) in rows.items():
+            sizes.setdefault(label, []).append(len(body))
+            times.setdefault(label, []).append(ms)
+        sizes.setdefault('route cache pickle', []).append(len(pickle.dumps(route, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    full_bytes = np.mean(sizes['full'])
+    print(f"\n{'format':<20} {'mean bytes':>11} {'longest':>9} {'vs full':>8} {'encode ms':>10}")
+    for label, values in sizes.items():
+        encode = f"{np.mean(times[label]):10.2f}" if label in times else f"{'':>10}"
+        print(f"{label:<20} {np.mean(values):11.0f} {values[-1]:9d} {np.mean(values) / full_bytes:7.1%} {encode}")
+    if brotli is None:
+        print(f"\nbrotli is not installed; responses fall back to gzip (level {GZIP_LEVEL}).")
+
+if __name__ == '__main__':
+    main()
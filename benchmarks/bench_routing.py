@@ -0,0 +1,87 @@
+"""Check the CSR routing engine against networkx and compare query latency
+
+Usage: python benchmarks/bench_routing.py [--rows 150] [--cols 150] [--queries 50]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import networkx as nx
+
+from synthetic import grid_graph, index_edges, overlay_weight
+from routing import RoutingGraph
+
+def networkx_summary(G, route, edge_weight):
+    """Summary figures computed the way find_optimal_route did before the CSR engine"""
+    total_distance = total_base_time = total_congestion_effect = 0
+    for u, v in zip(route[:-1], route[1:]):
+        edge_data = min(G[u][v].values(), key=edge_weight)
+        distance_mi = edge_data.get('length', 0) / 1609.34
+        base_time = distance_mi * (60 / 25)
+        actual_time = base_time * (1.0 + edge_weight(edge_data) * 0.5)
+        total_distance += distance_mi
+        total_base_time += base_time
+        total_congestion_effect += actual_time - base_time
+    return total_distance, total_base_time, total_congestion_effect
+
+def path_cost(G, route, edge_weight):
+    return sum(min(edge_weight(d) for d in G[u][v].values()) for u, v in zip(route[:-1], route[1:]))
+
+def check(G, router, pairs, weights=None):
+    """Assert equal path costs and summaries; return (networkx, CSR) seconds"""
+    if weights is None:
+        edge_weight = lambda d: d['weight']
+        nx_weight = 'weight'
+    else:
+        values = weights.tolist()
+        edge_weight = lambda d: values[d['eid']]
+        nx_weight = overlay_weight(weights)
+    nx_time = csr_time = 0.0
+    for source, target in pairs:
+        t_start = time.perf_counter()
+        nx_route = nx.dijkstra_path(G, source, target, weight=nx_weight)
+        nx_time += time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        path = router.shortest_path(source, target, weights=weights)
+        summary = router.route_summary(path)
+        csr_time += time.perf_counter() - t_start
+
+        assert path['nodes'][0] == source and path['nodes'][-1] == target
+        assert math.isclose(path_cost(G, path['nodes'], edge_weight), path_cost(G, nx_route, edge_weight), rel_tol=1e-9)
+        assert math.isclose(path['cost'], path_cost(G, nx_route, edge_weight), rel_tol=1e-9)
+        if path['nodes'] == nx_route:
+            distance, base_time, delay = networkx_summary(G, nx_route, edge_weight)
+            assert summary['distance_miles'] == round(distance, 1)
+            assert summary['base_travel_time'] == round(base_time, 1)
+            assert summary['congestion_delay'] == round(delay, 1)
+    return nx_time, csr_time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=150)
+    parser.add_argument('--cols', type=int, default=150)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    index_edges(G)
+    t_start = time.perf_counter()
+    router = RoutingGraph.from_graph(G)
+    print(f"Synthetic graph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges, "
+          f"{router.num_arcs} arcs; CSR build {time.perf_counter() - t_start:.2f}s")
+
+    rng = np.random.default_rng(1)
+    nodes = list(G.nodes)
+    pairs = [tuple(rng.choice(nodes, 2, replace=False).tolist()) for _ in range(args.queries)]
+    overlay = rng.uniform(0.1, 3.0, G.number_of_edges())
+
+    for label, weights in (('graph weights', None), ('overlay weights', overlay)):
+        nx_time, csr_time = check(G, router, pairs, weights)
+        print(f"{label:<16} networkx {nx_time / len(pairs) * 1000:.1f}ms/query, "
+              f"CSR {csr_time / len(pairs) * 1000:.1f}ms/query "
+              f"({nx_time / csr_time:.1f}x), all {len(pairs)} routes equivalent")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Settled nodes and latency for dijkstra, A* and bidirectional search
+
+Usage: python benchmarks/bench_search.py [--rows 150] [--cols 150] [--queries 40]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from synthetic import grid_graph
+from routing import RoutingGraph, ALGORITHMS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=150)
+    parser.add_argument('--cols', type=int, default=150)
+    parser.add_argument('--queries', type=int, default=40)
+    args = parser.parse_args()
+
+    G = grid_graph(args.rows, args.cols)
+    router = RoutingGraph.from_graph(G)
+    print(f"Synthetic graph: {router.num_nodes} nodes, {router.num_arcs} arcs")
+
+    rng = np.random.default_rng(3)
+    trips = {}
+    for label, max_blocks in (('short (<=10 blocks)', 10), ('long (any)', max(args.rows, args.cols))):
+        pairs = []
+        while len(pairs) < args.queries:
+            r, c = rng.integers(0, args.rows), rng.integers(0, args.cols)
+            dr, dc = rng.integers(-max_blocks, max_blocks + 1, 2)
+            if 0 <= r + dr < args.rows and 0 <= c + dc < args.cols and (dr or dc):
+                pairs.append((int(r * args.cols + c), int((r + dr) * args.cols + c + dc)))
+        trips[label] = pairs
+
+    for label, pairs in trips.items():
+        print(f"\n{label}:")
+        reference = [router.shortest_path(s, t)['cost'] for s, t in pairs]
+        for algorithm in ALGORITHMS:
+            settled = []
+            t_start = time.perf_counter()
+            for (s, t), expected in zip(pairs, reference):
+                path = router.shortest_path(s, t, algorithm=algorithm)
+                assert math.isclose(path['cost'], expected, rel_tol=1e-9)
+                settled.append(path['settled'])
+            elapsed = (time.perf_counter() - t_start) / len(pairs)
+            print(f"  {algorithm:<14} mean settled {np.mean(settled):8.0f}  "
+                  f"mean latency {elapsed * 1000:6.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""State choropleth: bytes per page load and per year switch, before and after /api/state-stats
+
+Before, every year switch reloaded the page, which downloaded and parsed the
+whole state_year_data.csv and us-states.json to keep one year. After, the
+first load fetches one year's stats and the simplified boundaries; a year
+switch fetches only that year's stats.
+
+Usage: python benchmarks/bench_state_stats.py [--states 50] [--points 5000] [--tolerance 0.01]
+"""
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+
+from synthetic import us_states, state_year_data
+from state_stats import StateStats, StateShapes, STATE_COORD_DECIMALS
+
+def rings(geometry):
+    """Every ring of a Polygon or MultiPolygon"""
+    polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+    return [ring for polygon in polygons for ring in polygon]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--states', type=int, default=50)
+    parser.add_argument('--points', type=int, default=5000, help='Boundary points per state')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Simplification tolerance in degrees')
+    args = parser.parse_args()
+
+    geojson = us_states(args.states, args.points)
+    geojson_raw = json.dumps(geojson).encode()
+    csv_raw = state_year_data(args.states).to_csv(index=False).encode()
+
+    t_start = time.perf_counter()
+    shapes = StateShapes.from_geojson(geojson, args.tolerance, STATE_COORD_DECIMALS, source_bytes=len(geojson_raw))
+    simplify_s = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    stats = StateStats.from_frame(state_year_data(args.states), 'bench')
+    index_ms = (time.perf_counter() - t_start) * 1000
+
+    points_before = sum(len(ring) for f in geojson['features'] for ring in rings(f['geometry']))
+    points_after = sum(len(ring) for f in json.loads(shapes.body)['features'] for ring in rings(f['geometry']))
+    print(f"{args.states} states: boundaries simplified in {simplify_s:.2f}s "
+          f"({points_before} -> {points_after} points); {len(stats.years)} years indexed in {index_ms:.1f}ms")
+
+    lookups = []
+    for year in stats.years * 100:
+        t_start = time.perf_counter()
+        body = json.dumps(dict(stats.year_stats(year), success=True, shapes='/api/state-shapes?v=' + shapes.version)).encode()
+        lookups.append((time.perf_counter() - t_start) * 1000)
+    year_body = body
+
+    rows = [
+        ('state_year_data.csv', csv_raw),
+        ('us-states.json', geojson_raw),
+        ('simplified boundaries', shapes.body),
+        ('one year of stats', year_body),
+    ]
+    print(f"\n{'payload':<24} {'bytes':>10} {'gzip':>10}")
+    sizes = {}
+    for label, body in rows:
+        sizes[label] = len(body), len(gzip.compress(body, 6))
+        print(f"{label:<24} {sizes[label][0]:>10} {sizes[label][1]:>10}")
+
+    before = sizes['state_year_data.csv'][1] + sizes['us-states.json'][1]
+    first = sizes['simplified boundaries'][1] + sizes['one year of stats'][1]
+    switch = sizes['one year of stats'][1]
+    print(f"\n{'gzip bytes':<24} {'before':>10} {'after':>10} {'ratio':>7}")
+    print(f"{'first page load':<24} {before:>10} {first:>10} {first / before:>7.1%}")
+    print(f"{'each year switch':<24} {before:>10} {switch:>10} {switch / before:>7.2%}")
+    print(f"\n/api/state-stats serialization: {np.mean(lookups):.3f}ms per request (precomputed per year)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Weather lookup latency on the route path: direct weather.gov calls vs the cached provider
+
+Runs against a local stub of the weather.gov points/forecast endpoints that
+adds --delay-ms of latency per response, so no network access is needed.
+
+Usage: python benchmarks/bench_weather.py [--delay-ms 150] [--lookups 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from synthetic import forecast_document
+from weather import WeatherGovSource, WeatherProvider, FileSource, parse_period
+
+def stub_server(delay):
+    """weather.gov stand-in on an ephemeral localhost port"""
+    document = json.dumps(forecast_document()).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(delay)
+            if self.path.startswith('/points/'):
+                body = json.dumps({'properties': {'forecastHourly': f'http://127.0.0.1:{self.server.server_port}/forecast/hourly'}}).encode()
+            else:
+                body = document
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def direct_fetch(base_url):
+    """The previous per-request behaviour: two un-pooled requests"""
+    response = requests.get(f'{base_url}/points/40.7128,-74.006')
+    forecast = requests.get(response.json()['properties']['forecastHourly']).json()
+    return parse_period(forecast['properties']['periods'][0])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--delay-ms', type=float, default=150)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    server = stub_server(args.delay_ms / 1000)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    t_start = time.perf_counter()
+    for _ in range(5):
+        expected = direct_fetch(base_url)
+    direct = (time.perf_counter() - t_start) / 5
+
+    provider = WeatherProvider(WeatherGovSource(base_url=base_url), refresh_interval=0.5)
+    t_start = time.perf_counter()
+    provider.start()
+    warmup = time.perf_counter() - t_start
+
+    route_time = datetime.now() + timedelta(hours=3)
+    t_start = time.perf_counter()
+    for _ in range(args.lookups):
+        current = provider.current()
+        provider.forecast_for(route_time)
+    cached = (time.perf_counter() - t_start) / args.lookups
+    assert current == expected
+
+    # Lookups stay in memory while the refresher fetches in the background
+    time.sleep(1.2)
+    status = provider.status()
+    assert status['fetches'] >= 2 and not status['stale'], status
+    provider.stop()
+
+    print(f"Stub latency {args.delay_ms:.0f}ms per response")
+    print(f"direct weather.gov calls: {direct * 1000:8.1f}ms per route request")
+    print(f"cached provider:          {cached * 1e6:8.1f}us per route request (startup fetch {warmup * 1000:.0f}ms)")
+    print(f"background refreshes: {status['fetches']}, last fetch {status['last_fetch_ms']}ms over the pooled session")
+
+    server.shutdown()
+    failing = WeatherProvider(WeatherGovSource(base_url='http://127.0.0.1:9', timeout=0.5))
+    assert failing.current() is None and failing.status()['fetches'] == 0
+    failing.refresh()
+    assert failing.current() is None
+    print(f"Unreachable source fails fast: {failing.status()['last_error'][:60]}...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture = os.path.join(tmp, 'forecast.json')
+        with open(fixture, 'w') as f:
+            json.dump(forecast_document(), f)
+        from_file = WeatherProvider(FileSource(fixture))
+        from_file.refresh()
+        assert from_file.current() == expected
+    print("Fixture-file source returns the same forecast (set WEATHER_SOURCE=<path> to use one in the app)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Resident-set-size sampling helpers for benchmarks"""
+import os
+import threading
+import time
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+def current_rss_mb():
+    """Current RSS of this process in MB (Linux)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+
+class PeakRSS:
+    """Context manager sampling peak RSS in a background thread"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss_mb())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.start = current_rss_mb()
+        self.peak = self.start
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
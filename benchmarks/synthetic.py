@@ -0,0 +1,156 @@
+"""Synthetic NYC-like graph and traffic model for benchmarks"""
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+import lightgbm as lgb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ORIGIN_LAT = 40.70
+ORIGIN_LNG = -74.02
+BLOCK_M = 80.0
+
+WEATHER_CONDITIONS = ['Clear', 'Cloudy', 'Fair', 'Fog', 'Haze', 'Light Rain', 'Light Snow', 'Mostly Cloudy', 'Overcast', 'Rain']
+
+X_COLUMNS = pd.Index([
+    'Severity', 'Start_Lat', 'Start_Lng', 'Distance(mi)', 'Temperature(F)', 'Humidity(%)',
+    'Visibility(mi)', 'WindSpeed(mph)', 'Precipitation(in)', 'Start_Hour', 'Start_Minute',
+    'Start_Day', 'Start_Month', 'Start_DayOfWeek', 'Duration_min', 'DelayFromFreeFlowSpeed(mins)'
+] + [f'Weather_Conditions_{c}' for c in WEATHER_CONDITIONS])
+
+WEATHER = {
+    'Temperature(F)': 61,
+    'WindSpeed(mph)': 8,
+    'Weather_Conditions': 'Light Rain',
+    'Humidity(%)': 50,
+    'Visibility(mi)': 10,
+    'Precipitation(in)': 0
+}
+
+def ordinal(n):
+    """Ordinal street number, e.g. 1st, 42nd"""
+    if 10 <= n % 100 <= 20:
+        return f"{n}th"
+    return f"{n}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th') }"
+
+def grid_graph(rows=100, cols=100, parallel_every=17, seed=42):
+    """Grid-shaped MultiDiGraph with osmnx-style node/edge attributes and random weights"""
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph(crs='epsg:4326')
+    lat_step = BLOCK_M / 111320.0
+    lng_step = BLOCK_M / (111320.0 * math.cos(math.radians(ORIGIN_LAT)))
+    for r in range(rows):
+        for c in range(cols):
+            G.add_node(r * cols + c, y=ORIGIN_LAT + r * lat_step, x=ORIGIN_LNG + c * lng_step, street_count=4)
+
+    count = 0
+    for r in range(rows):
+        for c in range(cols):
+            u = r * cols + c
+            neighbors = []
+            if c + 1 < cols:
+                neighbors.append((u + 1, f"{ordinal(r + 1)} Street"))
+            if r + 1 < rows:
+                neighbors.append((u + cols, f"{ordinal(c + 1)} Avenue"))
+            for v, name in neighbors:
+                length = BLOCK_M * rng.uniform(0.9, 1.1)
+                for a, b in ((u, v), (v, u)):
+                    G.add_edge(a, b, osmid=count, name=name, length=length,
+                               weight=float(rng.uniform(0.1, 3.0)))
+                    count += 1
+                    if count % parallel_every == 0:
+                        G.add_edge(a, b, osmid=count, name=name, length=length * 1.05,
+                                   weight=float(rng.uniform(0.1, 3.0)))
+                        count += 1
+    return G
+
+def index_edges(G):
+    """Tag every edge with its position in the stable edge index, for the networkx baselines"""
+    edges = []
+    for i, (u, v, key, data) in enumerate(G.edges(keys=True, data=True)):
+        data['eid'] = i
+        edges.append((u, v, key))
+    return edges
+
+def overlay_weight(weights):
+    """networkx weight function reading a weight array or callable by the 'eid' edge attribute"""
+    lookup = weights if callable(weights) else np.asarray(weights).tolist().__getitem__
+    return lambda u, v, d: min(lookup(attr['eid']) for attr in d.values())
+
+def traffic_model(num_rows=5000, seed=42):
+    """Small LightGBM regressor trained on random rows with the app's feature layout"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(0, 1, size=(num_rows, len(X_COLUMNS))), columns=X_COLUMNS)
+    X['Start_Hour'] = rng.integers(0, 24, num_rows)
+    X['Temperature(F)'] = rng.uniform(10, 95, num_rows)
+    y = X['Distance(mi)'] * 3 + (X['Start_Hour'].between(7, 9)) * 2 + rng.normal(0, 0.3, num_rows)
+    params = {'objective': 'regression', 'num_leaves': 31, 'verbosity': -1, 'seed': seed}
+    return lgb.train(params, lgb.Dataset(X, label=y), num_boost_round=100)
+
+def forecast_document(hours=48, start=None, conditions=('Mostly Cloudy', 'Light Rain', 'Clear')):
+    """weather.gov-shaped hourly forecast starting at the current hour (New York standard time)"""
+    from datetime import datetime, timedelta, timezone
+    tz = timezone(timedelta(hours=-5))
+    start = start or datetime.now(tz).replace(minute=0, second=0, microsecond=0)
+    periods = []
+    for i in range(hours):
+        begin = start + timedelta(hours=i)
+        periods.append({
+            'number': i + 1,
+            'startTime': begin.isoformat(),
+            'endTime': (begin + timedelta(hours=1)).isoformat(),
+            'temperature': 50 + i % 12,
+            'windSpeed': f"{5 + i % 10} mph",
+            'shortForecast': conditions[i % len(conditions)]
+        })
+    return {'properties': {'periods': periods}}
+
+def location_counts(rows=500000, years=range(2016, 2023), seed=42):
+    """filtered_location_counts.csv-shaped frame: accident counts clustered around US cities"""
+    rng = np.random.default_rng(seed)
+    cities = np.column_stack((rng.uniform(26, 48, 200), rng.uniform(-123, -71, 200)))
+    city = rng.choice(len(cities), rows, p=rng.dirichlet(np.full(len(cities), 0.3)))
+    spread = rng.exponential(0.15, rows)[:, None]
+    points = cities[city] + rng.normal(0, 1, (rows, 2)) * spread
+    return pd.DataFrame({
+        'Start_Lat': points[:, 0].round(5),
+        'Start_Lng': points[:, 1].round(5),
+        'Count': rng.geometric(0.4, rows),
+        'Start_Year': rng.choice(list(years), rows)
+    })
+
+def us_states(states=50, points=5000, seed=42):
+    """us-states.json-shaped FeatureCollection: jagged state outlines at survey-grade density"""
+    rng = np.random.default_rng(seed)
+    features = []
+    for i in range(states):
+        lat, lng = rng.uniform(28, 47), rng.uniform(-120, -72)
+        angle = np.linspace(0, 2 * np.pi, points, endpoint=False)
+        radius = 2 * np.exp(np.cumsum(rng.normal(0, 0.01, points)) * np.sin(angle / 2))
+        ring = np.column_stack((lng + radius * np.cos(angle) * 1.3, lat + radius * np.sin(angle))).round(6)
+        ring = np.vstack((ring, ring[:1]))
+        geometry = {'type': 'Polygon', 'coordinates': [ring.tolist()]}
+        if i % 10 == 0:
+            # Coastal states: a few islands, some too small to survive simplification
+            islands = []
+            for dx, size in ((0, 0.1), (0.6, 0.001), (1.2, 0.05)):
+                island = np.array([lng + dx, lat - 2.5]) + rng.normal(0, size, (8, 2))
+                islands.append([np.vstack((island, island[:1])).round(6).tolist()])
+            geometry = {'type': 'MultiPolygon', 'coordinates': [geometry['coordinates']] + islands}
+        features.append({'type': 'Feature', 'properties': {
+            'GEO_ID': f"0400000US{i + 1:02d}", 'STATE': f"{i + 1:02d}", 'NAME': f"State {i + 1}",
+            'LSAD': '', 'CENSUSAREA': round(float(rng.uniform(1000, 200000)), 3)
+        }, 'geometry': geometry})
+    return {'type': 'FeatureCollection', 'features': features}
+
+def state_year_data(states=50, years=range(2016, 2023), seed=42):
+    """state_year_data.csv-shaped frame: accident counts per state code and year"""
+    rng = np.random.default_rng(seed)
+    base = rng.lognormal(9, 1.2, states)
+    rows = [(f"{s + 1:02d}", year, int(base[s] * rng.uniform(0.7, 1.4)))
+            for year in years for s in range(states) if rng.random() > 0.02]
+    return pd.DataFrame(rows, columns=['code', 'Start_Year', 'Count'])
@@ -0,0 +1,205 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from routing import CONGESTION_LEVEL_MAX
+
+# Tile coordinates run from 0 to this many units a side (one unit per pixel of a 256px tile)
+CONGESTION_TILE_EXTENT = 256
+# Units drawn past each tile edge so lines meet cleanly across tiles
+CONGESTION_TILE_BUFFER = 4
+# Zooms served; the map scales the deepest tiles past CONGESTION_TILE_MAX_ZOOM
+CONGESTION_TILE_MIN_ZOOM = 12
+CONGESTION_TILE_MAX_ZOOM = 17
+# Congestion levels are quantized into this many classes (the route colors' quartiles)
+CONGESTION_CLASSES = 4
+# Generated tiles kept across all weight slices
+CONGESTION_TILE_CACHE_SIZE = 4096
+# Segments are bucketed by the tile they touch at this zoom
+TILE_INDEX_ZOOM = 13
+# Arcs tested against the cached tiles at a time when invalidating
+INVALIDATE_CHUNK = 1024
+
+def mercator_xy(lat, lng):
+    """Web Mercator coordinates on the unit square (x east, y south)"""
+    lat = np.radians(np.clip(lat, -85.05112878, 85.05112878))
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return x, y
+
+def clip_segments(x0, y0, x1, y1, xmin, ymin, xmax, ymax):
+    """Liang-Barsky clip of segments to a box: (kept mask, clipped x0, y0, x1, y1)"""
+    dx, dy = x1 - x0, y1 - y0
+    t0 = np.zeros(len(x0))
+    t1 = np.ones(len(x0))
+    kept = np.ones(len(x0), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+            r = q / p
+            kept &= ~((p == 0) & (q < 0))
+            t0 = np.where(p < 0, np.maximum(t0, r), t0)
+            t1 = np.where(p > 0, np.minimum(t1, r), t1)
+    kept &= t0 <= t1
+    return kept, x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy
+
+class CongestionTiles:
+    """Per-zoom congestion tiles of a RoutingGraph, generated on demand and kept in an LRU cache
+
+    Each street is one segment whatever its directions and parallel edges,
+    colored by its most congested arc. A tile holds the segments crossing
+    it, clipped to its bounds, with endpoints snapped to the tile's
+    integer grid: segments that collapse to a point at a zoom are dropped
+    and duplicates merged, which simplifies the network as zoom falls.
+    Congestion levels are quantized to CONGESTION_CLASSES classes.
+    """
+
+    def __init__(self, router, max_entries=CONGESTION_TILE_CACHE_SIZE, index_zoom=TILE_INDEX_ZOOM):
+        self.router = router
+        self.max_entries = max_entries
+        self.index_zoom = index_zoom
+        self._node_x, self._node_y = mercator_xy(router.node_y, router.node_x)
+
+        # One segment per node pair: its arc in each direction (the same arc twice for one-way streets)
+        low = np.minimum(router.arc_source, router.arc_target)
+        high = np.maximum(router.arc_source, router.arc_target)
+        pairs, first, segment = np.unique(low * router.num_nodes + high, return_index=True, return_inverse=True)
+        self.seg_arcs = np.repeat(first[:, None], 2, axis=1)
+        self.seg_arcs[segment, (router.arc_source > router.arc_target).astype(np.int64)] = np.arange(router.num_arcs)
+        self.seg_u, self.seg_v = pairs // router.num_nodes, pairs % router.num_nodes
+        self.num_segments = len(pairs)
+
+        # Segments bucketed by every index-zoom tile their bounding box touches
+        size = 1 << index_zoom
+        xs = np.column_stack((self._node_x[self.seg_u], self._node_x[self.seg_v]))
+        ys = np.column_stack((self._node_y[self.seg_u], self._node_y[self.seg_v]))
+        bx0, bx1 = (np.clip(xs.min(axis=1) * size, 0, size - 1).astype(np.int64),
+                    np.clip(xs.max(axis=1) * size, 0, size - 1).astype(np.int64))
+        by0, by1 = (np.clip(ys.min(axis=1) * size, 0, size - 1).astype(np.int64),
+                    np.clip(ys.max(axis=1) * size, 0, size - 1).astype(np.int64))
+        width, height = bx1 - bx0 + 1, by1 - by0 + 1
+        seg = np.repeat(np.arange(self.num_segments), width * height)
+        offset = np.arange(len(seg)) - np.repeat(np.cumsum(width * height) - width * height, width * height)
+        keys = (by0[seg] + offset // width[seg]) * size + bx0[seg] + offset % width[seg]
+        order = np.argsort(keys, kind='stable')
+        self._bucket_keys = keys[order]
+        self._bucket_segments = seg[order]
+
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _candidates(self, z, x, y, pad):
+        """Segments bucketed under the index-zoom tiles a tile covers, with pad tiles of margin"""
+        size = 1 << self.index_zoom
+        scale = size / (1 << z)
+        bx0, bx1 = (min(max(int(np.floor(v * scale)), 0), size - 1) for v in (x - pad, x + 1 + pad))
+        by0, by1 = (min(max(int(np.floor(v * scale)), 0), size - 1) for v in (y - pad, y + 1 + pad))
+        rows = np.arange(by0, by1 + 1, dtype=np.int64) * size
+        start = np.searchsorted(self._bucket_keys, rows + bx0)
+        stop = np.searchsorted(self._bucket_keys, rows + bx1, side='right')
+        found = [self._bucket_segments[a:b] for a, b in zip(start.tolist(), stop.tolist()) if b > a]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        # A segment is bucketed under every index tile it touches, so drop repeats
+        return np.unique(np.concatenate(found))
+
+    def render(self, prepared, z, x, y, extent=CONGESTION_TILE_EXTENT, buffer=CONGESTION_TILE_BUFFER):
+        """Per-class flat [x0, y0, x1, y1, ...] tile-coordinate lists for one tile of a prepared weight slice"""
+        levels = [[] for _ in range(CONGESTION_CLASSES)]
+        seg = self._candidates(z, x, y, buffer / extent)
+        if len(seg) == 0:
+            return levels
+        scale = (1 << z) * extent
+        # Segment endpoints in this tile's coordinates
+        x0 = self._node_x[self.seg_u[seg]] * scale - x * extent
+        y0 = self._node_y[self.seg_u[seg]] * scale - y * extent
+        x1 = self._node_x[self.seg_v[seg]] * scale - x * extent
+        y1 = self._node_y[self.seg_v[seg]] * scale - y * extent
+        kept, x0, y0, x1, y1 = clip_segments(x0, y0, x1, y1, -buffer, -buffer, extent + buffer, extent + buffer)
+        coords = np.rint(np.column_stack((x0, y0, x1, y1))[kept]).astype(np.int64)
+        congestion = prepared.arc_weight[self.seg_arcs[seg[kept]]].max(axis=1)
+        level = np.minimum((np.minimum(1.0, congestion / CONGESTION_LEVEL_MAX) * CONGESTION_CLASSES).astype(np.int64),
+                           CONGESTION_CLASSES - 1)
+
+        # Drop segments shorter than a unit, then merge duplicates keeping the most congested
+        moved = (coords[:, 0] != coords[:, 2]) | (coords[:, 1] != coords[:, 3])
+        coords, level = coords[moved], level[moved]
+        flip = (coords[:, 0] > coords[:, 2]) | ((coords[:, 0] == coords[:, 2]) & (coords[:, 1] > coords[:, 3]))
+        coords[flip] = coords[flip][:, [2, 3, 0, 1]]
+        order = np.lexsort((-level, coords[:, 3], coords[:, 2], coords[:, 1], coords[:, 0]))
+        coords, level = coords[order], level[order]
+        first = np.r_[True, np.any(coords[1:] != coords[:-1], axis=1)] if len(coords) else np.empty(0, dtype=bool)
+        coords, level = coords[first], level[first]
+        for c in range(CONGESTION_CLASSES):
+            levels[c] = coords[level == c].ravel().tolist()
+        return levels
+
+    def get(self, key, prepared, z, x, y):
+        """(JSON body, ETag) of a tile for the weight slice named key, generating it on a cache miss"""
+        cache_key = (key, z, x, y)
+        with self._lock:
+            if cache_key in self._tiles:
+                self._tiles.move_to_end(cache_key)
+                self.stats['hits'] += 1
+                return self._tiles[cache_key]
+            self.stats['misses'] += 1
+        body = json.dumps({
+            'success': True,
+            'z': z, 'x': x, 'y': y,
+            'slice': key,
+            'extent': CONGESTION_TILE_EXTENT,
+            'levels': self.render(prepared, z, x, y)
+        }, separators=(',', ':')).encode()
+        tile = body, hashlib.sha1(body).hexdigest()[:16]
+        with self._lock:
+            self._tiles[cache_key] = tile
+            while len(self._tiles) > self.max_entries:
+                self._tiles.popitem(last=False)
+                self.stats['evictions'] += 1
+        return tile
+
+    def invalidate_arcs(self, arcs):
+        """Drop cached tiles of any slice that one of these arcs' bounding boxes overlaps; returns how many"""
+        arcs = np.asarray(arcs, dtype=np.int64)
+        if len(arcs) == 0:
+            return 0
+        ux, vx = self._node_x[self.router.arc_source[arcs]], self._node_x[self.router.arc_target[arcs]]
+        uy, vy = self._node_y[self.router.arc_source[arcs]], self._node_y[self.router.arc_target[arcs]]
+        ax0, ax1 = np.minimum(ux, vx), np.maximum(ux, vx)
+        ay0, ay1 = np.minimum(uy, vy), np.maximum(uy, vy)
+        pad = CONGESTION_TILE_BUFFER / CONGESTION_TILE_EXTENT
+        with self._lock:
+            keys = list(self._tiles)
+            if not keys:
+                return 0
+            # Tile bounds with the buffer, on the unit square
+            z, x, y = (np.array([k[i] for k in keys], dtype=np.float64) for i in (1, 2, 3))
+            size = np.exp2(z)[:, None]
+            tx0, tx1 = (x[:, None] - pad) / size, (x[:, None] + 1 + pad) / size
+            ty0, ty1 = (y[:, None] - pad) / size, (y[:, None] + 1 + pad) / size
+            hit = np.zeros(len(keys), dtype=bool)
+            for start in range(0, len(arcs), INVALIDATE_CHUNK):
+                chunk = slice(start, start + INVALIDATE_CHUNK)
+                hit |= ((ax1[chunk] >= tx0) & (ax0[chunk] <= tx1)
+                        & (ay1[chunk] >= ty0) & (ay0[chunk] <= ty1)).any(axis=1)
+            stale = [keys[i] for i in np.flatnonzero(hit).tolist()]
+            for cache_key in stale:
+                del self._tiles[cache_key]
+            self.stats['invalidations'] += len(stale)
+        return len(stale)
+
+    def status(self):
+        """Cache size and hit/miss/eviction counters"""
+        with self._lock:
+            size = len(self._tiles)
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(
+            self.stats,
+            size=size,
+            max_entries=self.max_entries,
+            segments=self.num_segments,
+            hit_rate=round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0
+        )
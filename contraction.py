@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Contraction hierarchy preprocessing and queries over a RoutingGraph
+
+Usage: python contraction.py [--hour 32 --weather Rain]
+"""
+import os
+import glob
+import math
+import time
+import hashlib
+from heapq import heappush, heappop, heapify
+
+import numpy as np
+
+CH_DIR = 'static/models'
+CH_PREFIX = 'nyc_graph.ch'
+
+# Nodes settled per witness search before a shortcut is added anyway
+WITNESS_SETTLE_LIMIT = 60
+
+def weights_fingerprint(prepared):
+    """Checksum identifying the arc weights a hierarchy was built for"""
+    return hashlib.sha1(np.ascontiguousarray(prepared.arc_weight).tobytes()).hexdigest()
+
+def hierarchy_path(key=None, directory=CH_DIR):
+    """File a hierarchy for a weight slice key is persisted to"""
+    suffix = '' if key is None else '.' + str(key).replace(':', '-')
+    return os.path.join(directory, f"{CH_PREFIX}{suffix}.npz")
+
+class ContractionHierarchy:
+    """Node ranks plus upward/downward arcs (original arcs and shortcuts)"""
+
+    def __init__(self, num_arcs, rank, arc_tail, arc_head, arc_cost, shortcut_children, key=None, fingerprint=None):
+        self.num_base_arcs = num_arcs
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.arc_tail = np.asarray(arc_tail, dtype=np.int64)
+        self.arc_head = np.asarray(arc_head, dtype=np.int64)
+        self.arc_cost = np.asarray(arc_cost, dtype=np.float64)
+        self.shortcut_children = np.asarray(shortcut_children, dtype=np.int64).reshape(-1, 2)
+        self.key = key
+        self.fingerprint = fingerprint
+        self.num_shortcuts = len(self.shortcut_children)
+        num_nodes = len(self.rank)
+
+        upward = self.rank[self.arc_tail] < self.rank[self.arc_head]
+        downward = self.rank[self.arc_tail] > self.rank[self.arc_head]
+        # Forward search climbs arcs tail -> head; backward search climbs arcs head -> tail
+        self._up = self._adjacency(np.flatnonzero(upward), self.arc_tail, self.arc_head, num_nodes)
+        self._down = self._adjacency(np.flatnonzero(downward), self.arc_head, self.arc_tail, num_nodes)
+        self._children = self.shortcut_children.tolist()
+
+    def _adjacency(self, arcs, frm, to, num_nodes):
+        order = arcs[np.argsort(frm[arcs], kind='stable')]
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(frm[order], minlength=num_nodes), out=offsets[1:])
+        return offsets.tolist(), to[order].tolist(), self.arc_cost[order].tolist(), order.tolist()
+
+    @classmethod
+    def build(cls, router, prepared, key=None, settle_limit=WITNESS_SETTLE_LIMIT):
+        """Contract every node of the routing graph in edge-difference order"""
+        t_start = time.time()
+        n = router.num_nodes
+        out = [dict() for _ in range(n)]
+        inn = [dict() for _ in range(n)]
+        for a, (u, v, c) in enumerate(zip(router._sources, router._targets, prepared.cost)):
+            if u != v:
+                out[u][v] = (c, a)
+                inn[v][u] = (c, a)
+
+        arc_tail = list(router._sources)
+        arc_head = list(router._targets)
+        arc_cost = list(prepared.cost)
+        children = []
+        contracted = bytearray(n)
+        deleted_neighbors = [0] * n
+        rank = np.empty(n, dtype=np.int64)
+
+        def witness_dists(source, excluded, max_cost, targets):
+            dist = {source: 0.0}
+            heap = [(0.0, source)]
+            remaining = set(targets)
+            settled = 0
+            while heap and settled < settle_limit:
+                d, u = heappop(heap)
+                if d > dist[u]:
+                    continue
+                if d > max_cost:
+                    break
+                settled += 1
+                remaining.discard(u)
+                if not remaining:
+                    break
+                for w, (c, _) in out[u].items():
+                    if w == excluded:
+                        continue
+                    nd = d + c
+                    if nd < dist.get(w, math.inf):
+                        dist[w] = nd
+                        heappush(heap, (nd, w))
+            return dist
+
+        def needed_shortcuts(v):
+            shortcuts = []
+            outs = list(out[v].items())
+            for u, (cu, au) in inn[v].items():
+                candidates = {w: (cu + cw, au, aw) for w, (cw, aw) in outs if w != u}
+                if not candidates:
+                    continue
+                dist = witness_dists(u, v, max(c for c, _, _ in candidates.values()), candidates)
+                for w, (c, au_, aw) in candidates.items():
+                    if dist.get(w, math.inf) > c:
+                        shortcuts.append((u, w, c, au_, aw))
+            return shortcuts
+
+        def priority(v):
+            return len(needed_shortcuts(v)) - len(inn[v]) - len(out[v]) + deleted_neighbors[v]
+
+        heap = [(priority(v), v) for v in range(n)]
+        heapify(heap)
+        order = 0
+        while heap:
+            _, v = heappop(heap)
+            if contracted[v]:
+                continue
+            # Lazy update: re-evaluate and defer if no longer the cheapest node
+            p = priority(v)
+            if heap and p > heap[0][0]:
+                heappush(heap, (p, v))
+                continue
+
+            for u, w, c, au, aw in needed_shortcuts(v):
+                existing = out[u].get(w)
+                if existing is not None and existing[0] <= c:
+                    continue
+                a = len(arc_tail)
+                arc_tail.append(u)
+                arc_head.append(w)
+                arc_cost.append(c)
+                children.append((au, aw))
+                out[u][w] = (c, a)
+                inn[w][u] = (c, a)
+
+            for u in inn[v]:
+                del out[u][v]
+                deleted_neighbors[u] += 1
+            for w in out[v]:
+                del inn[w][v]
+                deleted_neighbors[w] += 1
+            inn[v] = {}
+            out[v] = {}
+            contracted[v] = 1
+            rank[v] = order
+            order += 1
+
+        hierarchy = cls(router.num_arcs, rank, arc_tail, arc_head, arc_cost, children,
+                        key=key, fingerprint=weights_fingerprint(prepared))
+        hierarchy.build_time = time.time() - t_start
+        return hierarchy
+
+    def save(self, path):
+        """Persist the hierarchy as a compressed .npz archive"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(
+            path, rank=self.rank, arc_tail=self.arc_tail, arc_head=self.arc_head,
+            arc_cost=self.arc_cost, shortcut_children=self.shortcut_children,
+            num_base_arcs=self.num_base_arcs, key=np.array('' if self.key is None else self.key),
+            fingerprint=np.array(self.fingerprint or '')
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a hierarchy saved with save()"""
+        with np.load(path) as data:
+            key = str(data['key']) or None
+            return cls(int(data['num_base_arcs']), data['rank'], data['arc_tail'], data['arc_head'],
+                       data['arc_cost'], data['shortcut_children'], key=key,
+                       fingerprint=str(data['fingerprint']) or None)
+
+    def matches(self, router, prepared):
+        """Check the hierarchy was built for this routing graph and weight slice"""
+        return (self.num_base_arcs == router.num_arcs and len(self.rank) == router.num_nodes
+                and self.fingerprint == weights_fingerprint(prepared))
+
+    def query(self, source, target):
+        """Bidirectional upward search; returns (cost, routing-graph arc path, settled count)"""
+        if source == target:
+            return 0.0, [], 1
+        searches = (
+            (self._up, {source: 0.0}, {}, [(0.0, source)]),
+            (self._down, {target: 0.0}, {}, [(0.0, target)])
+        )
+        best = math.inf
+        meet = -1
+        settled = 0
+        while True:
+            progressed = False
+            for side, (adjacency, dist, pred, heap) in enumerate(searches):
+                if not heap or heap[0][0] >= best:
+                    continue
+                progressed = True
+                offsets, heads, costs, arcs = adjacency
+                stall_offsets, stall_heads, stall_costs, _ = searches[1 - side][0]
+                other = searches[1 - side][1]
+                d, u = heappop(heap)
+                if d > dist[u]:
+                    continue
+                settled += 1
+                if u in other and d + other[u] < best:
+                    best = d + other[u]
+                    meet = u
+                # Stall-on-demand: skip u if a higher-ranked node already reaches it more cheaply
+                stalled = False
+                for i in range(stall_offsets[u], stall_offsets[u + 1]):
+                    w = stall_heads[i]
+                    if w in dist and dist[w] + stall_costs[i] < d:
+                        stalled = True
+                        break
+                if stalled:
+                    continue
+                for i in range(offsets[u], offsets[u + 1]):
+                    v = heads[i]
+                    nd = d + costs[i]
+                    if nd < dist.get(v, math.inf):
+                        dist[v] = nd
+                        pred[v] = arcs[i]
+                        heappush(heap, (nd, v))
+                        if v in other and nd + other[v] < best:
+                            best = nd + other[v]
+                            meet = v
+            if not progressed:
+                break
+        if meet < 0:
+            return math.inf, None, settled
+
+        tail, head = self.arc_tail, self.arc_head
+        forward = []
+        node = meet
+        while node != source:
+            a = searches[0][2][node]
+            forward.append(a)
+            node = int(tail[a])
+        forward.reverse()
+        node = meet
+        while node != target:
+            a = searches[1][2][node]
+            forward.append(a)
+            node = int(head[a])
+        return best, self.unpack(forward), settled
+
+    def unpack(self, arcs):
+        """Expand shortcuts into the routing-graph arcs they stand for"""
+        result = []
+        stack = list(reversed(arcs))
+        base = self.num_base_arcs
+        children = self._children
+        while stack:
+            a = stack.pop()
+            if a < base:
+                result.append(a)
+            else:
+                first, second = children[a - base]
+                stack.append(second)
+                stack.append(first)
+        return result
+
+def load_hierarchies(router, directory=CH_DIR):
+    """Attach every persisted hierarchy; the router checks weights on first use"""
+    loaded = 0
+    for path in sorted(glob.glob(os.path.join(directory, f"{CH_PREFIX}*.npz"))):
+        try:
+            router.attach_hierarchy(ContractionHierarchy.load(path))
+            loaded += 1
+        except Exception as e:
+            print(f"Error loading contraction hierarchy {path}: {e}")
+    return loaded
+
+def main():
+    import argparse
+    from app import get_nyc_graph
+    from graph_store import load_graph_store
+    from routing import RoutingGraph
+    from weights import WeightTable
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hour', type=int, default=None, help='hour-of-week of a weight table slice')
+    parser.add_argument('--weather', default=None, help='weather class of a weight table slice')
+    args = parser.parse_args()
+
+    store = load_graph_store(get_nyc_graph)
+    if not store.weights_current():
+        raise SystemExit("Graph store has no current edge weights; start the app once to store them.")
+    router = RoutingGraph.from_store(store)
+
+    key = None
+    prepared = router.base
+    if args.hour is not None:
+        table = WeightTable.load()
+        weather_class = table.classes.index(args.weather or table.classes[0])
+        weight_slice = table.get_slice(args.hour, weather_class)
+        if weight_slice is None:
+            raise SystemExit(f"Weight table slice {args.hour}/{table.classes[weather_class]} has not been precomputed.")
+        key = f"table:{args.hour}:{weather_class}"
+        prepared = router.prepare(weight_slice, key)
+
+    print(f"Contracting {router.num_nodes} nodes...")
+    hierarchy = ContractionHierarchy.build(router, prepared, key=key)
+    path = hierarchy_path(key)
+    hierarchy.save(path)
+    print(f"Built hierarchy with {hierarchy.num_shortcuts} shortcuts in {hierarchy.build_time:.1f}s, saved to {path}.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from routing import METERS_PER_MILE, BASE_SPEED_MPH, CONGESTION_SCALE, ALTERNATIVE_PENALTY
+
+# Departure buckets are whole hours, like the weight slices
+SWEEP_MAX_HOURS = 24
+SWEEP_DEFAULT_HOURS = 12
+# Full searches run on every n-th bucket (and the last); the rest reuse their paths
+SWEEP_SEARCH_EVERY = 3
+# Penalty-method alternatives added to the path set from the first bucket
+SWEEP_ALTERNATIVES = 3
+
+def _tree_path(router, arc_weight, source, target):
+    """Arcs of the cheapest source -> target path, from a full shortest path tree"""
+    graph = csr_matrix((arc_weight, router.arc_target, router.offsets), shape=(router.num_nodes, router.num_nodes))
+    _, pred = dijkstra(graph, indices=source, return_predecessors=True)
+    if source != target and pred[target] < 0:
+        raise nx.NetworkXNoPath(f"No path between {router.node_id(source)} and {router.node_id(target)}.")
+    offsets, targets = router._offsets, router._targets
+    arcs = []
+    node = target
+    while node != source:
+        parent = int(pred[node])
+        arcs.append(next(a for a in range(offsets[parent], offsets[parent + 1]) if targets[a] == node))
+        node = parent
+    arcs.reverse()
+    return np.asarray(arcs, dtype=np.int64)
+
+def sweep_departures(router, source_node, target_node, slices, search_every=SWEEP_SEARCH_EVERY,
+                     alternatives=SWEEP_ALTERNATIVES):
+    """Cheapest path of a fixed path set for every departure bucket
+
+    slices holds one (weights, key) pair per bucket, weights None meaning
+    the router's default weights. The path set comes from full searches on
+    every search_every-th bucket and the last one (scipy shortest path
+    trees over each bucket's cheapest parallel edges), plus penalty-method
+    alternatives on the first; each bucket then prices every path in one
+    vectorized pass over its weights. With search_every=1 every bucket's
+    choice is its exact shortest path. The router's incident delays apply
+    to every bucket.
+
+    Returns per-bucket 'cost', 'minutes', 'miles' and 'path' (index into
+    the path set) arrays, the 'best' bucket index, a route_summary-ready
+    'best_path' and the number of 'searches' run.
+    """
+    source = router.node_index[source_node]
+    target = router.node_index[target_node]
+
+    def source_weight(weights):
+        """A bucket's weights before incident delays"""
+        return np.asarray(router.base.source_weight if weights is None else weights, dtype=np.float64)
+
+    searched = sorted(set(range(0, len(slices), search_every)) | {len(slices) - 1})
+    searches = 0
+    paths = {}
+    for b in searched:
+        weights = router.delayed_weights(source_weight(slices[b][0]))
+        arc_weight = np.minimum.reduceat(weights[router.edge_order], router.arc_start)
+        for _ in range(alternatives if b == 0 else 1):
+            arcs = _tree_path(router, arc_weight, source, target)
+            searches += 1
+            paths.setdefault(arcs.tobytes(), arcs)
+            arc_weight[arcs] *= ALTERNATIVE_PENALTY
+    paths = list(paths.values())
+
+    # Parallel edges of every arc used by any path, padded to the widest arc
+    arcs = np.unique(np.concatenate(paths))
+    parallel, padding = router.parallel_edges(arcs)
+
+    # Cheapest parallel edge per arc and bucket, as prepare() picks it
+    edge_weight = np.stack([
+        router.delayed_weights(source_weight(weights)[parallel], parallel)
+        for weights, _ in slices
+    ])
+    edge_weight[:, padding] = np.inf
+    choice = edge_weight.argmin(axis=2)
+    arc_weight = np.take_along_axis(edge_weight, choice[:, :, None], axis=2)[:, :, 0]
+    arc_eid = parallel[np.arange(len(arcs)), choice]
+    arc_miles = router.edge_length[arc_eid] / METERS_PER_MILE
+    arc_minutes = arc_miles * (60 / BASE_SPEED_MPH) * (1.0 + arc_weight * CONGESTION_SCALE)
+
+    # Arc-by-path incidence turns per-path sums into matrix products
+    incidence = np.zeros((len(arcs), len(paths)))
+    for p, path_arcs in enumerate(paths):
+        np.add.at(incidence[:, p], np.searchsorted(arcs, path_arcs), 1)
+    cost = arc_weight @ incidence
+    chosen = cost.argmin(axis=1)
+    buckets = np.arange(len(slices))
+    minutes = (arc_minutes @ incidence)[buckets, chosen]
+    best = int(minutes.argmin())
+
+    best_arcs = paths[chosen[best]]
+    weights, key = slices[best]
+    node_index = np.concatenate(([source], router.arc_target[best_arcs])).astype(np.int64)
+    best_path = {
+        'nodes': [router.node_id(i) for i in node_index.tolist()],
+        'node_index': node_index,
+        'edges': arc_eid[best, np.searchsorted(arcs, best_arcs)],
+        'cost': float(cost[best, chosen[best]]),
+        'weights': router.prepare(weights, key)
+    }
+    return {
+        'cost': cost[buckets, chosen],
+        'minutes': minutes,
+        'miles': (arc_miles @ incidence)[buckets, chosen],
+        'path': chosen,
+        'paths': len(paths),
+        'best': best,
+        'best_path': best_path,
+        'searches': searches
+    }
@@ -0,0 +1,167 @@
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from weights import constant_features, build_feature_matrix, predict_edge_weights
+
+# Upcoming forecast hours kept precomputed
+FORECAST_HORIZON_HOURS = 48
+# Seconds between checks for a refreshed forecast
+FORECAST_POLL_INTERVAL = 60
+
+def used_features(model, X_columns):
+    """Model columns the booster actually splits on (all columns if unknown)"""
+    try:
+        importance = model.feature_importance('split')
+    except Exception:
+        return list(X_columns)
+    return [col for col, splits in zip(X_columns, importance) if splits > 0]
+
+class ForecastScheduler:
+    """Background precompute of edge weights for each upcoming forecast hour
+
+    Each hour's constant feature values (forecast weather plus the hour's
+    date/time features) are reduced to the columns the model splits on and
+    hashed; hours with the same signature share one weight slice. Slices
+    for hours that have passed or dropped out of the forecast are released.
+    """
+
+    def __init__(self, provider, model, edge_columns, X_columns,
+                 horizon_hours=FORECAST_HORIZON_HOURS, poll_interval=FORECAST_POLL_INTERVAL):
+        self.provider = provider
+        self.model = model
+        self.edge_columns = edge_columns
+        self.X_columns = X_columns
+        self.horizon_hours = horizon_hours
+        self.poll_interval = poll_interval
+        self.signature_columns = used_features(model, X_columns)
+        self._hours = []
+        self._slices = {}
+        self._pending = []
+        self._computing = None
+        self._planned_at = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'computed': 0, 'deduplicated': 0, 'lookups': 0, 'ready_hits': 0, 'last_slice_ms': None}
+
+    def signature(self, constants):
+        """Hash of the constant feature values the model's predictions depend on"""
+        values = ','.join(f"{col}={float(constants[col])!r}" for col in self.signature_columns if col in constants)
+        return hashlib.sha1(values.encode()).hexdigest()[:16]
+
+    def plan(self):
+        """Rebuild the per-hour plan from the cached forecast; returns slices still to compute"""
+        periods, fetched_at = self.provider.periods()
+        now = datetime.now(timezone.utc)
+        horizon = now + timedelta(hours=self.horizon_hours)
+        hours = []
+        features = {}
+        for start, end, weather in periods:
+            if end <= now or start >= horizon:
+                continue
+            # Feature dates use the forecast's own local time, as route requests do
+            constants = constant_features(weather, start.replace(tzinfo=None), self.X_columns)
+            signature = self.signature(constants)
+            hours.append((start, end, signature, weather['Weather_Conditions']))
+            features.setdefault(signature, constants)
+        with self._lock:
+            self._hours = hours
+            self._slices = {s: w for s, w in self._slices.items() if s in features}
+            self._pending = [(s, c) for s, c in features.items() if s not in self._slices]
+            self._planned_at = fetched_at
+            self.stats['deduplicated'] = len(hours) - len(features)
+            return len(self._pending)
+
+    def run_once(self):
+        """Plan, then compute every pending slice; returns the number computed"""
+        self.plan()
+        computed = 0
+        while not self._stop.is_set():
+            with self._lock:
+                if not self._pending:
+                    break
+                signature, constants = self._pending.pop(0)
+                self._computing = signature
+            t_start = time.time()
+            X = build_feature_matrix(self.edge_columns, constants, self.X_columns)
+            weights = predict_edge_weights(self.model, X).astype(np.float32)
+            with self._lock:
+                self._slices[signature] = weights
+                self._computing = None
+            computed += 1
+            self.stats['computed'] += 1
+            self.stats['last_slice_ms'] = round((time.time() - t_start) * 1000, 1)
+        return computed
+
+    def start(self):
+        """Start the background precompute thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='forecast-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                computed = self.run_once()
+                if computed:
+                    print(f"Precomputed {computed} forecast weight slices.")
+            except Exception as e:
+                print(f"Error precomputing forecast weights: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def lookup(self, dt):
+        """(weights, weight key) precomputed for the forecast hour containing dt, or None"""
+        self.stats['lookups'] += 1
+        with self._lock:
+            hours = self._hours
+            slices = self._slices
+        if not hours:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=hours[0][0].tzinfo)
+        for start, end, signature, _ in hours:
+            if start <= dt < end:
+                weights = slices.get(signature)
+                if weights is None:
+                    return None
+                self.stats['ready_hits'] += 1
+                return weights, f"forecast:{signature}"
+        return None
+
+    def status(self):
+        """Queue state and per-hour readiness"""
+        with self._lock:
+            hours = list(self._hours)
+            ready = set(self._slices)
+            pending = [s for s, _ in self._pending]
+            computing = self._computing
+            slices_bytes = sum(w.nbytes for w in self._slices.values())
+        return dict(
+            self.stats,
+            horizon_hours=self.horizon_hours,
+            signature_columns=self.signature_columns,
+            forecast_fetched_at=datetime.fromtimestamp(self._planned_at).isoformat() if self._planned_at else None,
+            slices_ready=len(ready),
+            queue_length=len(pending),
+            computing=computing,
+            slices_mb=round(slices_bytes / (1024 * 1024), 1),
+            hours=[{
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'conditions': conditions,
+                'slice': signature,
+                'ready': signature in ready,
+                'queued': signature in pending
+            } for start, end, signature, conditions in hours]
+        )
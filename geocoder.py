@@ -0,0 +1,245 @@
+import re
+import difflib
+from bisect import bisect_left
+
+import numpy as np
+
+# Separators accepted between the two streets of an intersection
+INTERSECTION_PATTERN = re.compile(r'\s*(?:&|@|/|\band\b|\bat\b)\s*')
+
+# Trailing locality text ignored when matching street names (a borough is kept as a hint)
+LOCALITY_PATTERN = re.compile(
+    r',?\s*\b(new york city|new york|nyc|ny|manhattan|brooklyn|queens|bronx|the bronx|staten island|usa|us)\b\.?$')
+
+# Rough (lat, lng) outlines of the boroughs, to pick between same-named intersections
+BOROUGH_OUTLINES = {
+    'manhattan': [(40.700, -74.020), (40.754, -74.010), (40.880, -73.930), (40.872, -73.912), (40.835, -73.934),
+                  (40.800, -73.929), (40.776, -73.942), (40.745, -73.968), (40.710, -73.975), (40.700, -74.010)],
+    'brooklyn': [(40.739, -73.962), (40.730, -73.925), (40.707, -73.905), (40.695, -73.880), (40.680, -73.865),
+                 (40.650, -73.855), (40.583, -73.890), (40.570, -73.940), (40.571, -74.012), (40.610, -74.042),
+                 (40.650, -74.025), (40.690, -74.005), (40.700, -73.995), (40.704, -73.972)],
+    'queens': [(40.739, -73.962), (40.755, -73.955), (40.775, -73.935), (40.785, -73.912), (40.790, -73.870),
+               (40.800, -73.800), (40.790, -73.760), (40.770, -73.700), (40.650, -73.725), (40.595, -73.740),
+               (40.555, -73.940), (40.583, -73.890), (40.650, -73.855), (40.680, -73.865), (40.695, -73.880),
+               (40.707, -73.905), (40.730, -73.925)],
+    'bronx': [(40.800, -73.915), (40.835, -73.930), (40.865, -73.912), (40.878, -73.915), (40.912, -73.912), (40.917, -73.860),
+              (40.885, -73.785), (40.840, -73.780), (40.805, -73.790), (40.805, -73.870), (40.795, -73.905)],
+    'staten island': [(40.645, -74.075), (40.645, -74.180), (40.560, -74.250), (40.495, -74.255), (40.530, -74.150),
+                      (40.595, -74.060), (40.620, -74.060)],
+}
+
+# Nodes of one intersection (divided roads meet at several) lie within this distance of each other
+INTERSECTION_CLUSTER_METERS = 150
+
+DIRECTIONS = {'east': 'e', 'west': 'w', 'north': 'n', 'south': 's'}
+
+# Street-type spellings normalize_address leaves alone
+STREET_TYPES = {'av': 'ave', 'avenue': 'ave', 'str': 'st', 'street': 'st', 'pky': 'pkwy', 'parkway': 'pkwy'}
+
+WORD_ORDINALS = {
+    'first': '1st', 'second': '2nd', 'third': '3rd', 'fourth': '4th', 'fifth': '5th',
+    'sixth': '6th', 'seventh': '7th', 'eighth': '8th', 'ninth': '9th', 'tenth': '10th',
+    'eleventh': '11th', 'twelfth': '12th'
+}
+
+# Similarity required for a fuzzy street-name match
+FUZZY_CUTOFF = 0.85
+
+def normalize_address(address):
+    """Normalize address format for consistent lookup"""
+    if not address:
+        return ""
+    address = address.lower().strip()
+    address = ' '.join(address.split())
+    replacements = {
+        'street': 'st',
+        'avenue': 'ave',
+        'boulevard': 'blvd',
+        'drive': 'dr',
+        'road': 'rd',
+        'place': 'pl',
+        'lane': 'ln',
+        'court': 'ct',
+        'new york': 'ny',
+        'new york city': 'nyc'
+    }
+    for full, abbr in replacements.items():
+        address = address.replace(f" {full} ", f" {abbr} ")
+        address = address.replace(f" {full},", f" {abbr},")
+    return address
+
+def ordinal_suffix(number):
+    """Ordinal suffix for a street number, e.g. 'nd' for 42"""
+    if 10 <= number % 100 <= 20:
+        return 'th'
+    return {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+
+def canonical_street(name):
+    """Canonical street name: normalize_address abbreviations plus ordinals and directions"""
+    # The trailing comma lets normalize_address abbreviate a final street type
+    text = normalize_address(f"{name},").rstrip(',')
+    text = re.sub(r"[.']", '', text)
+    tokens = []
+    for token in text.split():
+        token = WORD_ORDINALS.get(token, DIRECTIONS.get(token, STREET_TYPES.get(token, token)))
+        if token.isdigit():
+            token += ordinal_suffix(int(token))
+        tokens.append(token)
+    return ' '.join(tokens)
+
+def street_aliases(name):
+    """Canonical name plus its variant without a directional prefix"""
+    canonical = canonical_street(name)
+    aliases = {canonical}
+    parts = canonical.split(' ', 1)
+    if len(parts) == 2 and parts[0] in DIRECTIONS.values():
+        aliases.add(parts[1])
+    return aliases
+
+def in_outline(point, outline):
+    """Whether a (lat, lng) point is inside a polygon of (lat, lng) vertices (ray casting)"""
+    y, x = point
+    inside = False
+    for (y0, x0), (y1, x1) in zip(outline, outline[1:] + outline[:1]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+class LocalGeocoder:
+    """Street-name index built from the graph's OSM 'name' edge attributes
+
+    Resolves intersections such as "5th ave & 42nd st" to graph nodes
+    without a network call. Single streets and house numbers are not
+    resolved, since a street alone does not pin down a location.
+    """
+
+    def __init__(self, street_nodes, node_coords):
+        self.street_nodes = {name: frozenset(nodes) for name, nodes in street_nodes.items()}
+        self.names = sorted(self.street_nodes)
+        self.node_coords = node_coords
+
+    @classmethod
+    def from_graph(cls, G):
+        """Index a networkx graph's named edges"""
+        node_coords = {node: (data['y'], data['x']) for node, data in G.nodes(data=True)}
+        return cls.from_edge_names(G.edges(data='name'), node_coords)
+
+    @classmethod
+    def from_store(cls, store):
+        """Index a GraphStore's named edges"""
+        node_coords = dict(zip(store.node_ids.tolist(), zip(store.node_y.tolist(), store.node_x.tolist())))
+        return cls.from_edge_names(store.edge_names(), node_coords)
+
+    @classmethod
+    def from_edge_names(cls, edge_names, node_coords):
+        """Index every named edge's endpoints under each alias of its name(s)"""
+        street_nodes = {}
+        aliases = {}
+        for u, v, name in edge_names:
+            if not name:
+                continue
+            for single in (name if isinstance(name, list) else [name]):
+                if single not in aliases:
+                    aliases[single] = street_aliases(single)
+                for alias in aliases[single]:
+                    nodes = street_nodes.setdefault(alias, set())
+                    nodes.add(u)
+                    nodes.add(v)
+        return cls(street_nodes, node_coords)
+
+    def __len__(self):
+        return len(self.names)
+
+    def match_street(self, text):
+        """Candidate canonical street names for free text: exact, then unique prefix, then fuzzy"""
+        name = canonical_street(text)
+        if name in self.street_nodes:
+            return [name]
+        parts = name.split(' ', 1)
+        if len(parts) == 2 and parts[0] in DIRECTIONS.values() and parts[1] in self.street_nodes:
+            return [parts[1]]
+        i = bisect_left(self.names, name)
+        prefixed = []
+        while i < len(self.names) and self.names[i].startswith(name) and len(prefixed) < 2:
+            prefixed.append(self.names[i])
+            i += 1
+        if len(prefixed) == 1:
+            return prefixed
+        return difflib.get_close_matches(name, self.names, n=3, cutoff=FUZZY_CUTOFF)
+
+    def resolve(self, address):
+        """Resolve an intersection to {'node', 'lat', 'lng', 'streets'}, or None if not confident
+
+        Streets that cross in several places (e.g. 1st Ave & 1st St in
+        Manhattan and in Brooklyn) resolve only when a trailing borough
+        picks out one of them; otherwise None leaves the address to the
+        remote geocoder.
+        """
+        text = address.lower().strip()
+        borough = None
+        match = LOCALITY_PATTERN.search(text)
+        while match:
+            locality = match.group(1).replace('the ', '')
+            if borough is None and locality in BOROUGH_OUTLINES:
+                borough = locality
+            text = text[:match.start()].strip()
+            match = LOCALITY_PATTERN.search(text)
+        parts = [p for p in INTERSECTION_PATTERN.split(text) if p]
+        if len(parts) != 2:
+            return None
+        for first in self.match_street(parts[0]):
+            for second in self.match_street(parts[1]):
+                nodes = self.street_nodes[first] & self.street_nodes[second]
+                if nodes:
+                    node = self._pick_node(nodes, borough)
+                    if node is None:
+                        return None
+                    lat, lng = self.node_coords[node]
+                    return {'node': node, 'lat': lat, 'lng': lng, 'streets': (first, second)}
+        return None
+
+    def _pick_node(self, nodes, borough):
+        """Central node of the one place these nodes meet, using the borough to choose among several"""
+        clusters = self._clusters(nodes)
+        if len(clusters) > 1 and borough is not None:
+            clusters = [cluster for cluster in clusters
+                        if in_outline(np.mean([self.node_coords[n] for n in cluster], axis=0),
+                                      BOROUGH_OUTLINES[borough])]
+        if len(clusters) != 1:
+            return None
+        return self._central_node(clusters[0])
+
+    def _clusters(self, nodes, radius=INTERSECTION_CLUSTER_METERS):
+        """Nodes grouped into places: chains of nodes within radius meters of each other"""
+        nodes = sorted(nodes)
+        if len(nodes) == 1:
+            return [nodes]
+        coords = np.radians(np.array([self.node_coords[n] for n in nodes]))
+        # Equirectangular distances, plenty accurate at intersection scale
+        y = coords[:, 0] * 6371000.0
+        x = coords[:, 1] * 6371000.0 * np.cos(coords[:, 0].mean())
+        near = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :]) <= radius
+        label = [-1] * len(nodes)
+        clusters = []
+        for i in range(len(nodes)):
+            if label[i] >= 0:
+                continue
+            label[i] = len(clusters)
+            stack, cluster = [i], []
+            while stack:
+                j = stack.pop()
+                cluster.append(nodes[j])
+                for k in np.flatnonzero(near[j]).tolist():
+                    if label[k] < 0:
+                        label[k] = label[i]
+                        stack.append(k)
+            clusters.append(cluster)
+        return clusters
+
+    def _central_node(self, nodes):
+        """Node closest to the centroid of one intersection's nodes"""
+        if len(nodes) == 1:
+            return next(iter(nodes))
+        nodes = sorted(nodes)
+        coords = np.array([self.node_coords[n] for n in nodes])
+        return nodes[int(np.argmin(((coords - coords.mean(axis=0)) ** 2).sum(axis=1)))]
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Columnar, memory-mappable on-disk graph format
+
+Usage: python graph_store.py [--graph static/models/nyc_graph.pkl] [--weights static/models/edge_weights.pkl]
+"""
+import os
+import json
+import time
+import hashlib
+import pickle
+from datetime import datetime
+
+import numpy as np
+import networkx as nx
+
+from weights import DEFAULT_LAT, DEFAULT_LNG, METERS_PER_MILE
+
+GRAPH_STORE_DIR = 'static/models/nyc_graph.store'
+GRAPH_PICKLE_PATH = 'static/models/nyc_graph.pkl'
+EDGE_WEIGHTS_PATH = 'static/models/edge_weights.pkl'
+
+NODE_COLUMNS = ('node_ids', 'node_x', 'node_y')
+EDGE_COLUMNS = ('edge_u', 'edge_v', 'edge_key', 'edge_length', 'edge_x', 'edge_y', 'edge_name')
+
+def convert_graph(G, path=GRAPH_STORE_DIR, source_path=None):
+    """Write a networkx MultiDiGraph as columnar .npy files in stable edge index order
+
+    Nodes keep their ids and coordinates; edges keep endpoints (as node
+    positions), key, length, name and any 'weight' attribute. Geometries
+    and other OSM tags are dropped.
+    """
+    node_ids = list(G.nodes)
+    node_index = {node: i for i, node in enumerate(node_ids)}
+    n = G.number_of_edges()
+    columns = {
+        'node_ids': np.asarray(node_ids, dtype=np.int64),
+        'node_x': np.fromiter((G.nodes[node]['x'] for node in node_ids), dtype=np.float64, count=len(node_ids)),
+        'node_y': np.fromiter((G.nodes[node]['y'] for node in node_ids), dtype=np.float64, count=len(node_ids)),
+        'edge_u': np.empty(n, dtype=np.int32),
+        'edge_v': np.empty(n, dtype=np.int32),
+        'edge_key': np.empty(n, dtype=np.int32),
+        'edge_length': np.empty(n, dtype=np.float64),
+        'edge_x': np.empty(n, dtype=np.float64),
+        'edge_y': np.empty(n, dtype=np.float64),
+        'edge_name': np.empty(n, dtype=np.int32)
+    }
+    edge_weight = np.empty(n, dtype=np.float64)
+    names = []
+    name_index = {}
+    has_weights = True
+    for i, (u, v, key, data) in enumerate(G.edges(keys=True, data=True)):
+        columns['edge_u'][i] = node_index[u]
+        columns['edge_v'][i] = node_index[v]
+        columns['edge_key'][i] = key
+        columns['edge_length'][i] = data.get('length', 0)
+        columns['edge_x'][i] = data.get('x', np.nan)
+        columns['edge_y'][i] = data.get('y', np.nan)
+        name = data.get('name')
+        if name:
+            # osmnx stores merged ways' names as lists
+            label = json.dumps(name) if isinstance(name, list) else name
+            if label not in name_index:
+                name_index[label] = len(names)
+                names.append(name)
+            columns['edge_name'][i] = name_index[label]
+        else:
+            columns['edge_name'][i] = -1
+        if 'weight' in data:
+            edge_weight[i] = data['weight']
+        else:
+            has_weights = False
+
+    os.makedirs(path, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f'{name}.npy'), values)
+    with open(os.path.join(path, 'names.json'), 'w') as f:
+        json.dump(names, f)
+    meta = {
+        'num_nodes': len(node_ids),
+        'num_edges': n,
+        'crs': str(G.graph.get('crs', 'epsg:4326')),
+        'source': source_path,
+        'source_mtime': os.path.getmtime(source_path) if source_path and os.path.exists(source_path) else None,
+        'weights_mtime': None,
+        'created': datetime.now().isoformat()
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    store = GraphStore(path)
+    if has_weights:
+        store.set_weights(edge_weight)
+    return store
+
+class GraphStore:
+    """Memory-mapped node and edge columns, with networkx built only on demand
+
+    Edge positions follow the stable edge index (G.edges(keys=True) order
+    of the graph it was converted from), so weight arrays, the weight table
+    and the routing engine all index edges the same way.
+    """
+
+    def __init__(self, path=GRAPH_STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        for name in NODE_COLUMNS + EDGE_COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+        self._names = None
+        self._graph = None
+        self.edge_weight = self._load_weights()
+        self.num_nodes = self.meta['num_nodes']
+        self.num_edges = self.meta['num_edges']
+
+    @classmethod
+    def load(cls, path=GRAPH_STORE_DIR):
+        """Load the store if it has been converted"""
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        return cls(path)
+
+    def _load_weights(self):
+        weights_path = os.path.join(self.path, 'edge_weight.npy')
+        return np.load(weights_path, mmap_mode='r') if os.path.exists(weights_path) else None
+
+    @property
+    def names(self):
+        """Street name table indexed by edge_name (loaded on first use)"""
+        if self._names is None:
+            with open(os.path.join(self.path, 'names.json')) as f:
+                self._names = json.load(f)
+        return self._names
+
+    def is_current(self, source_path=GRAPH_PICKLE_PATH):
+        """Check the store is not older than the pickle it was converted from"""
+        if not os.path.exists(source_path):
+            return True
+        return self.meta.get('source_mtime') is not None and os.path.getmtime(source_path) <= self.meta['source_mtime']
+
+    def weights_current(self, weights_path=EDGE_WEIGHTS_PATH):
+        """Check stored weights exist and are not older than the pickled edge weights"""
+        if self.edge_weight is None:
+            return False
+        if not os.path.exists(weights_path):
+            return True
+        return self.meta.get('weights_mtime') is not None and os.path.getmtime(weights_path) <= self.meta['weights_mtime']
+
+    def version(self):
+        """Stamp of this conversion and its stored weights; changes when either is rebuilt"""
+        digest = hashlib.sha1(f"{self.meta.get('created')}:{self.num_edges}".encode())
+        if self.edge_weight is not None:
+            digest.update(np.ascontiguousarray(self.edge_weight).tobytes())
+        return digest.hexdigest()[:16]
+
+    def set_weights(self, weights, weights_mtime=None):
+        """Persist a per-edge weight array"""
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(weights) != self.num_edges:
+            raise ValueError(f"Expected {self.num_edges} edge weights, got {len(weights)}")
+        weights_path = os.path.join(self.path, 'edge_weight.npy')
+        tmp_path = os.path.join(self.path, 'edge_weight.tmp.npy')
+        np.save(tmp_path, weights)
+        os.replace(tmp_path, weights_path)
+        self.meta['weights_mtime'] = weights_mtime
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+        self.edge_weight = self._load_weights()
+        if self._graph is not None:
+            for (_, _, data), weight in zip(self._graph.edges(data=True), self.edge_weight.tolist()):
+                data['weight'] = weight
+
+    def apply_edge_weights(self, edge_weights, weights_mtime=None):
+        """Store a list of (u, v, key, weight) tuples; edges not listed keep their weight"""
+        index = {edge: i for i, edge in enumerate(self.edge_list())}
+        weights = np.array(self.edge_weight) if self.edge_weight is not None else np.ones(self.num_edges)
+        count = 0
+        for u, v, key, weight in edge_weights:
+            i = index.get((u, v, key))
+            if i is not None:
+                weights[i] = weight
+                count += 1
+        self.set_weights(weights, weights_mtime)
+        return count
+
+    def edge_list(self):
+        """Stable edge index: (u, v, key) tuples"""
+        node_ids = self.node_ids.tolist()
+        return [(node_ids[u], node_ids[v], k) for u, v, k in zip(self.edge_u.tolist(), self.edge_v.tolist(), self.edge_key.tolist())]
+
+    def edge_array(self):
+        """Stable edge index as an (E, 3) array of node ids and keys"""
+        return np.column_stack((self.node_ids[self.edge_u], self.node_ids[self.edge_v], self.edge_key)).astype(np.int64)
+
+    def edge_columns(self):
+        """Per-edge model feature columns, as weights.edge_features computes them"""
+        return {
+            'Start_Lat': np.where(np.isnan(self.edge_y), DEFAULT_LAT, self.edge_y),
+            'Start_Lng': np.where(np.isnan(self.edge_x), DEFAULT_LNG, self.edge_x),
+            'Distance(mi)': self.edge_length / METERS_PER_MILE
+        }
+
+    def edge_names(self):
+        """(u id, v id, name or list of names) for every named edge"""
+        names = self.names
+        node_ids = self.node_ids.tolist()
+        named = np.flatnonzero(self.edge_name >= 0)
+        return [(node_ids[u], node_ids[v], names[n]) for u, v, n in zip(
+            self.edge_u[named].tolist(), self.edge_v[named].tolist(), self.edge_name[named].tolist())]
+
+    def graph(self):
+        """networkx MultiDiGraph with node coordinates and edge length/name/weight/eid (built once)"""
+        if self._graph is None:
+            t_start = time.time()
+            G = nx.MultiDiGraph(crs=self.meta['crs'])
+            node_ids = self.node_ids.tolist()
+            G.add_nodes_from((node, {'x': x, 'y': y}) for node, x, y in zip(node_ids, self.node_x.tolist(), self.node_y.tolist()))
+            names = self.names
+            weights = self.edge_weight.tolist() if self.edge_weight is not None else None
+            for i, (u, v, k, length, name) in enumerate(zip(self.edge_u.tolist(), self.edge_v.tolist(), self.edge_key.tolist(),
+                                                            self.edge_length.tolist(), self.edge_name.tolist())):
+                data = {'length': length, 'eid': i}
+                if name >= 0:
+                    data['name'] = names[name]
+                if weights is not None:
+                    data['weight'] = weights[i]
+                G.add_edge(node_ids[u], node_ids[v], key=k, **data)
+            self._graph = G
+            print(f"Materialized networkx graph from the graph store in {time.time() - t_start:.2f}s.")
+        return self._graph
+
+    def status(self):
+        """Store size on disk and whether networkx has been materialized"""
+        size = sum(os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path))
+        return {
+            'nodes': self.num_nodes,
+            'edges': self.num_edges,
+            'size_mb': round(size / (1024 * 1024), 2),
+            'has_weights': self.edge_weight is not None,
+            'networkx_materialized': self._graph is not None
+        }
+
+def load_graph_store(graph_loader=None, path=GRAPH_STORE_DIR, source_path=GRAPH_PICKLE_PATH):
+    """Load the graph store, converting from the pickled graph when missing or stale"""
+    try:
+        store = GraphStore.load(path)
+        if store is not None and store.is_current(source_path):
+            return store
+    except Exception as e:
+        print(f"Error loading graph store: {e}")
+    print("Converting graph to the columnar graph store...")
+    t_start = time.time()
+    if graph_loader is not None:
+        G = graph_loader()
+    else:
+        with open(source_path, 'rb') as f:
+            G = pickle.load(f)
+    store = convert_graph(G, path, source_path)
+    print(f"Graph store written to {path} in {time.time() - t_start:.2f}s.")
+    return store
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--graph', default=GRAPH_PICKLE_PATH)
+    parser.add_argument('--weights', default=EDGE_WEIGHTS_PATH)
+    parser.add_argument('--path', default=GRAPH_STORE_DIR)
+    args = parser.parse_args()
+
+    t_start = time.time()
+    with open(args.graph, 'rb') as f:
+        G = pickle.load(f)
+    print(f"Unpickled {G.number_of_nodes()} nodes and {G.number_of_edges()} edges in {time.time() - t_start:.2f}s.")
+    store = convert_graph(G, args.path, args.graph)
+    if os.path.exists(args.weights):
+        with open(args.weights, 'rb') as f:
+            count = store.apply_edge_weights(pickle.load(f), os.path.getmtime(args.weights))
+        print(f"Stored {count} edge weights.")
+    t_start = time.time()
+    store = GraphStore(args.path)
+    print(f"Graph store loads in {(time.time() - t_start) * 1000:.1f}ms: {store.status()}")
+
+if __name__ == '__main__':
+    main()
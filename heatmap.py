@@ -0,0 +1,176 @@
+import os
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+HEATMAP_CSV_PATH = 'static/data/filtered_location_counts.csv'
+HEATMAP_INDEX_PATH = 'static/models/heatmap_bins.npz'
+
+# Bins are squares of this many screen pixels at the zoom they are built for
+HEATMAP_CELL_PX = 8
+CELL_BITS = 5  # 256px tiles / HEATMAP_CELL_PX
+# Deepest zoom with its own bins; closer zooms reuse them
+HEATMAP_MAX_ZOOM = 14
+# Bins answered per request before falling back to a coarser level
+HEATMAP_MAX_BINS = 20000
+
+# Web Mercator latitude limit
+MAX_LATITUDE = 85.05112878
+
+def mercator_cells(lat, lng, bits):
+    """Integer Web Mercator cell coordinates on a 2^bits x 2^bits world grid"""
+    size = 1 << bits
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0 * size
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * size
+    return (np.clip(x, 0, size - 1).astype(np.int64),
+            np.clip(y, 0, size - 1).astype(np.int64))
+
+class HeatmapBins:
+    """Location counts aggregated into a quadtree of Web Mercator bins, one level per map zoom
+
+    Level z splits the world into 2^(z + CELL_BITS) cells a side, so a bin
+    is HEATMAP_CELL_PX screen pixels at zoom z; each level is derived from
+    the finest one by dropping low bits. Every level holds one bin per
+    (year, cell) with the count-weighted centroid and total count, sorted
+    by (year, row, column), so a bounding box is a handful of binary
+    searches per row. Year 0 aggregates all years.
+    """
+
+    def __init__(self, years, levels, version):
+        self.years = years
+        # Per zoom: (keys, lat, lng, count, per-year max count)
+        self.levels = levels
+        self.version = version
+
+    @classmethod
+    def from_frame(cls, frame, version, max_zoom=HEATMAP_MAX_ZOOM):
+        """Aggregate a Start_Lat / Start_Lng / Count / Start_Year frame"""
+        frame = frame.dropna(subset=['Start_Lat', 'Start_Lng'])
+        lat = frame['Start_Lat'].to_numpy(np.float64)
+        lng = frame['Start_Lng'].to_numpy(np.float64)
+        count = pd.to_numeric(frame['Count'], errors='coerce').fillna(1).to_numpy(np.float64)
+        year = frame['Start_Year'].to_numpy(np.int64)
+        years = np.unique(year)
+        year_idx = np.searchsorted(years, year) + 1
+
+        # Every point counts once for its own year and once for year 0 (all years)
+        lat, lng, count = np.tile(lat, 2), np.tile(lng, 2), np.tile(count, 2)
+        year_idx = np.concatenate((year_idx, np.zeros_like(year_idx)))
+        finest = max_zoom + CELL_BITS
+        fx, fy = mercator_cells(lat, lng, finest)
+
+        levels = []
+        for zoom in range(max_zoom + 1):
+            bits = zoom + CELL_BITS
+            shift = finest - bits
+            keys = ((year_idx << bits) + (fy >> shift) << bits) + (fx >> shift)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            weights = count[order]
+            total = np.add.reduceat(weights, starts)
+            bin_lat = np.add.reduceat(lat[order] * weights, starts) / total
+            bin_lng = np.add.reduceat(lng[order] * weights, starts) / total
+            bin_keys = sorted_keys[starts]
+            year_max = np.zeros(len(years) + 1)
+            np.maximum.at(year_max, bin_keys >> (2 * bits), total)
+            levels.append((bin_keys, bin_lat.astype(np.float32), bin_lng.astype(np.float32),
+                           total.astype(np.float32), year_max))
+        return cls(years.tolist(), levels, version)
+
+    @classmethod
+    def from_csv(cls, path=HEATMAP_CSV_PATH, max_zoom=HEATMAP_MAX_ZOOM):
+        """Build from the location counts CSV; the version is a hash of its bytes"""
+        with open(path, 'rb') as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:16]
+        frame = pd.read_csv(path, usecols=['Start_Lat', 'Start_Lng', 'Count', 'Start_Year'])
+        return cls.from_frame(frame, version, max_zoom)
+
+    @property
+    def max_zoom(self):
+        return len(self.levels) - 1
+
+    def year_index(self, year):
+        """Level key prefix for a year (None or 0 for all years); raises ValueError for unknown years"""
+        if not year:
+            return 0
+        if year not in self.years:
+            raise ValueError(f"No data for year {year}.")
+        return self.years.index(year) + 1
+
+    def _ranges(self, zoom, year_idx, south, west, north, east):
+        """(start, stop) index ranges of a level's bins inside a bounding box"""
+        bits = zoom + CELL_BITS
+        keys = self.levels[zoom][0]
+        x0, y1 = mercator_cells(south, west, bits)
+        x1, y0 = mercator_cells(north, east, bits)
+        rows = (year_idx << bits) + np.arange(int(y0), int(y1) + 1, dtype=np.int64) << bits
+        if east < west:
+            # Box across the antimeridian: two column spans per row
+            spans = [(0, int(x1)), (int(x0), (1 << bits) - 1)]
+        else:
+            spans = [(int(x0), int(x1))]
+        return [(np.searchsorted(keys, rows + lo), np.searchsorted(keys, rows + hi, side='right')) for lo, hi in spans]
+
+    def query(self, south, west, north, east, zoom, year=None, max_bins=HEATMAP_MAX_BINS):
+        """Bins of a bounding box at a map zoom: (zoom used, lat, lng, count, year max count)
+
+        Zooms past the deepest level use it; a box holding more than
+        max_bins bins is answered from coarser levels until it fits.
+        """
+        year_idx = self.year_index(year)
+        zoom = int(min(max(zoom, 0), self.max_zoom))
+        while True:
+            ranges = self._ranges(zoom, year_idx, south, west, north, east)
+            total = sum(int((stop - start).sum()) for start, stop in ranges)
+            if total <= max_bins or zoom == 0:
+                break
+            zoom -= 1
+        _, lat, lng, count, year_max = self.levels[zoom]
+        index = np.concatenate([np.arange(a, b) for start, stop in ranges
+                                for a, b in zip(start.tolist(), stop.tolist()) if b > a] + [np.empty(0, dtype=np.int64)])
+        return zoom, lat[index], lng[index], count[index], float(year_max[year_idx])
+
+    def save(self, path=HEATMAP_INDEX_PATH, source_size=None, source_mtime=None):
+        """Persist the levels with the source file's size and mtime"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {'years': np.asarray(self.years, dtype=np.int64), 'version': np.asarray(self.version),
+                  'source': np.asarray([source_size or 0, source_mtime or 0], dtype=np.float64)}
+        for zoom, (keys, lat, lng, count, year_max) in enumerate(self.levels):
+            arrays.update({f"keys_{zoom}": keys, f"lat_{zoom}": lat, f"lng_{zoom}": lng,
+                           f"count_{zoom}": count, f"max_{zoom}": year_max})
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=HEATMAP_INDEX_PATH):
+        """(bins, source size, source mtime) from a persisted index, or None"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            zooms = sum(1 for name in data.files if name.startswith('keys_'))
+            levels = [(data[f"keys_{z}"], data[f"lat_{z}"], data[f"lng_{z}"], data[f"count_{z}"], data[f"max_{z}"])
+                      for z in range(zooms)]
+            size, mtime = data['source'].tolist()
+            return HeatmapBins(data['years'].tolist(), levels, str(data['version'])), size, mtime
+
+def load_or_build_heatmap(csv_path=HEATMAP_CSV_PATH, path=HEATMAP_INDEX_PATH):
+    """Load the persisted bins if they were built from the current CSV, else build and save them"""
+    stat = os.stat(csv_path)
+    try:
+        loaded = HeatmapBins.load(path)
+        if loaded is not None:
+            bins, size, mtime = loaded
+            if size == stat.st_size and mtime == stat.st_mtime:
+                return bins
+    except Exception as e:
+        print(f"Error loading heatmap bins: {e}")
+    bins = HeatmapBins.from_csv(csv_path)
+    try:
+        bins.save(path, stat.st_size, stat.st_mtime)
+    except Exception as e:
+        print(f"Error saving heatmap bins: {e}")
+    return bins
@@ -0,0 +1,208 @@
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# Travel time multiplier by severity, on TomTom's magnitude of delay scale
+# (0 unknown, 1 minor, 2 moderate, 3 major, 4 undefined)
+SEVERITY_DELAYS = {0: 1.25, 1: 1.25, 2: 1.6, 3: 2.5, 4: 1.6}
+# Closed roads stay routable but are only used when there is no way around
+ROAD_CLOSED_DELAY = 20.0
+
+# Edges at nodes within this many meters of an incident are slowed
+INCIDENT_RADIUS_M = 75
+INCIDENT_MAX_RADIUS_M = 1000
+# Seconds an incident stays active unless it is re-posted
+INCIDENT_DEFAULT_TTL = 3600
+INCIDENT_MAX_TTL = 24 * 3600
+
+class IncidentStore:
+    """Active traffic incidents and the edge delays they put on a routing graph
+
+    An incident slows the edges at nodes within its radius, and the edge its
+    point lies on, by its delay factor until it expires; where incidents
+    overlap the largest delay applies. Adding, replacing or expiring an
+    incident only touches its own edges. on_change(arcs, lifted) is called
+    with the arcs whose weights changed (e.g. to drop cached routes over
+    them), lifted being True when delays may have gone down (an incident
+    was removed, replaced or expired), and may return a count to report.
+    A background thread expires incidents on time.
+    """
+
+    def __init__(self, router, spatial_index, on_change=None):
+        self.router = router
+        self.spatial_index = spatial_index
+        self.on_change = on_change
+        self._incidents = {}
+        # Edge id -> ids of the incidents covering it
+        self._edge_incidents = {}
+        self._expiry = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'added': 0, 'replaced': 0, 'removed': 0, 'expired': 0, 'edges_updated': 0, 'last_update_ms': None}
+
+    def __len__(self):
+        return len(self._incidents)
+
+    def affected_edges(self, lat, lng, radius_m):
+        """Edge ids of the arcs at nodes within radius_m of a point, plus the arc the point lies on"""
+        router = self.router
+        nodes = self.spatial_index.nodes_within(lat, lng, radius_m)
+        arcs = ([np.arange(router.offsets[n], router.offsets[n + 1]) for n in nodes]
+                + [router.rev_arc_order[router.rev_offsets[n]:router.rev_offsets[n + 1]] for n in nodes])
+        snap = self.spatial_index.nearest_arc(router, lat, lng)
+        if snap is not None and snap['distance'] <= radius_m:
+            arcs.append(np.array([snap['arc'], router.reverse_arc(snap['arc'])]))
+        arcs = np.unique(np.concatenate(arcs + [np.empty(0)]).astype(np.int64))
+        arcs = arcs[arcs >= 0]
+        parallel, padding = router.parallel_edges(arcs)
+        return parallel[~padding]
+
+    def add(self, lat, lng, severity=0, radius_m=INCIDENT_RADIUS_M, ttl=INCIDENT_DEFAULT_TTL,
+            incident_id=None, closed=False):
+        """Add an incident, replacing any active one with the same id; returns its record
+
+        The record also carries the number of 'edges_updated', the
+        'update_ms' it took and whatever on_change returned as 'routes_invalidated'.
+        """
+        if severity not in SEVERITY_DELAYS:
+            raise ValueError(f"Severity must be one of {sorted(SEVERITY_DELAYS)}.")
+        if not 0 < radius_m <= INCIDENT_MAX_RADIUS_M:
+            raise ValueError(f"Radius must be between 0 and {INCIDENT_MAX_RADIUS_M} meters.")
+        if not 0 < ttl <= INCIDENT_MAX_TTL:
+            raise ValueError(f"Duration must be between 0 and {INCIDENT_MAX_TTL} seconds.")
+        t_start = time.perf_counter()
+        edges = self.affected_edges(lat, lng, radius_m)
+        with self._lock:
+            incident_id = str(incident_id) if incident_id is not None else f"incident-{next(self._ids)}"
+            touched = set(edges.tolist())
+            replaced = self._incidents.pop(incident_id, None)
+            if replaced is not None:
+                touched.update(self._detach(incident_id, replaced))
+                self.stats['replaced'] += 1
+            incident = {
+                'lat': float(lat), 'lng': float(lng), 'severity': severity, 'closed': bool(closed),
+                'delay': ROAD_CLOSED_DELAY if closed else SEVERITY_DELAYS[severity],
+                'radius_m': float(radius_m), 'expires_at': time.time() + ttl, 'edges': edges
+            }
+            self._incidents[incident_id] = incident
+            for e in edges.tolist():
+                self._edge_incidents.setdefault(e, set()).add(incident_id)
+            heapq.heappush(self._expiry, (incident['expires_at'], incident_id))
+            arcs = self._apply(touched)
+            self.stats['added'] += 1
+        self._wake.set()
+        invalidated = self.on_change(arcs, replaced is not None) if self.on_change is not None else None
+        update_ms = round((time.perf_counter() - t_start) * 1000, 2)
+        self.stats['last_update_ms'] = update_ms
+        return dict(self._record(incident_id, incident), edges_updated=len(touched),
+                    update_ms=update_ms, routes_invalidated=invalidated)
+
+    def remove(self, incident_id):
+        """Lift an incident before it expires; returns whether it was active"""
+        with self._lock:
+            incident = self._incidents.pop(str(incident_id), None)
+            if incident is None:
+                return False
+            arcs = self._apply(self._detach(str(incident_id), incident))
+            self.stats['removed'] += 1
+        if self.on_change is not None:
+            self.on_change(arcs, True)
+        return True
+
+    def expire(self, now=None):
+        """Lift every incident past its expiry; returns how many"""
+        now = time.time() if now is None else now
+        touched = set()
+        expired = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, incident_id = heapq.heappop(self._expiry)
+                incident = self._incidents.get(incident_id)
+                # Entries left behind by replaced or removed incidents
+                if incident is None or incident['expires_at'] != expires_at:
+                    continue
+                del self._incidents[incident_id]
+                touched.update(self._detach(incident_id, incident))
+                expired += 1
+            if not touched:
+                return expired
+            arcs = self._apply(touched)
+            self.stats['expired'] += expired
+        if self.on_change is not None:
+            self.on_change(arcs, True)
+        return expired
+
+    def _detach(self, incident_id, incident):
+        """Unlink an incident from its edges; returns them"""
+        edges = incident['edges'].tolist()
+        for e in edges:
+            ids = self._edge_incidents.get(e)
+            if ids is not None:
+                ids.discard(incident_id)
+                if not ids:
+                    del self._edge_incidents[e]
+        return edges
+
+    def _apply(self, edges):
+        """Push the current delay of each edge (largest covering incident, else none) to the router"""
+        edges = np.fromiter(edges, dtype=np.int64, count=len(edges))
+        delays = [max((self._incidents[i]['delay'] for i in self._edge_incidents.get(e, ())), default=1.0)
+                  for e in edges.tolist()]
+        self.stats['edges_updated'] += len(edges)
+        return self.router.set_edge_delays(edges, delays)
+
+    def start(self):
+        """Start the background expiry thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='incident-expiry', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                expired = self.expire()
+                if expired:
+                    print(f"Expired {expired} traffic incidents.")
+            except Exception as e:
+                print(f"Error expiring traffic incidents: {e}")
+            with self._lock:
+                timeout = max(self._expiry[0][0] - time.time(), 0) if self._expiry else None
+            self._wake.wait(timeout)
+
+    def _record(self, incident_id, incident):
+        return {
+            'id': incident_id,
+            'lat': incident['lat'],
+            'lng': incident['lng'],
+            'severity': incident['severity'],
+            'closed': incident['closed'],
+            'delay': incident['delay'],
+            'radius_m': incident['radius_m'],
+            'edges': len(incident['edges']),
+            'expires_at': datetime.fromtimestamp(incident['expires_at']).isoformat(timespec='seconds')
+        }
+
+    def incidents(self):
+        """Records of the active incidents, soonest to expire first"""
+        with self._lock:
+            items = sorted(self._incidents.items(), key=lambda item: item[1]['expires_at'])
+        return [self._record(incident_id, incident) for incident_id, incident in items]
+
+    def status(self):
+        """Active incident and delayed edge counts plus update counters"""
+        with self._lock:
+            active = len(self._incidents)
+        return dict(self.stats, active=active, delayed_edges=self.router.delayed_edges)
@@ -0,0 +1,83 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from routing import METERS_PER_MILE, BASE_SPEED_MPH, CONGESTION_SCALE
+
+# Origins searched together; search memory is block size x graph nodes
+MATRIX_BLOCK_SIZE = 32
+# Largest origins x destinations matrix served in one request
+MATRIX_MAX_CELLS = 1000000
+
+class TravelTimeMatrix:
+    """Origin-destination travel times and distances over a routing graph's arcs
+
+    Paths minimize the prepared weights exactly as route searches do; each
+    cell then sums the same base time x congestion multiplier figures that
+    route_summary reports. Origins are searched a block at a time, so
+    memory grows with the block size rather than with the matrix.
+    """
+
+    def __init__(self, router, prepared):
+        self.router = router
+        self.prepared = prepared
+        n = router.num_nodes
+        eids = prepared.arc_eid
+        self.arc_miles = router.edge_length[eids] / METERS_PER_MILE
+        self.arc_minutes = (self.arc_miles * (60 / BASE_SPEED_MPH)
+                            * (1.0 + prepared.edge_weight[eids] * CONGESTION_SCALE))
+        self.graph = csr_matrix((prepared.arc_weight.astype(np.float64), router.arc_target, router.offsets), shape=(n, n))
+        # Arcs are ordered by (source, target), so this key is sorted
+        self.arc_key = router.arc_source * n + router.arc_target
+
+    def rows(self, origins, destinations, block_size=MATRIX_BLOCK_SIZE):
+        """Yield (minutes, miles) float32 arrays for consecutive blocks of origin rows
+
+        origins and destinations are routing-graph node indices; unreachable
+        cells are NaN.
+        """
+        n = self.router.num_nodes
+        destinations = np.asarray(destinations, dtype=np.int64)
+        m = len(destinations)
+        for start in range(0, len(origins), block_size):
+            unique, inverse = np.unique(np.asarray(origins[start:start + block_size], dtype=np.int64), return_inverse=True)
+            cost, pred = dijkstra(self.graph, indices=unique, return_predecessors=True)
+
+            # Flatten the block's trees: parent position and arc into every (origin, node)
+            pred = pred.ravel().astype(np.int64)
+            has_parent = pred >= 0
+            row_start = np.repeat(np.arange(len(unique)) * n, n)
+            parent = np.where(has_parent, pred + row_start, -1)
+            arc = np.zeros(len(pred), dtype=np.int64)
+            node = np.flatnonzero(has_parent) - row_start[has_parent]
+            arc[has_parent] = np.searchsorted(self.arc_key, pred[has_parent] * n + node)
+
+            # Walk every destination back up its origin's tree, all cells at once
+            position = (np.arange(len(unique))[:, None] * n + destinations).ravel()
+            minutes = np.zeros(len(position))
+            miles = np.zeros(len(position))
+            active = np.flatnonzero(parent[position] >= 0)
+            while len(active):
+                at = position[active]
+                minutes[active] += self.arc_minutes[arc[at]]
+                miles[active] += self.arc_miles[arc[at]]
+                at = parent[at]
+                position[active] = at
+                active = active[parent[at] >= 0]
+
+            unreachable = ~np.isfinite(cost[:, destinations]).ravel()
+            minutes[unreachable] = np.nan
+            miles[unreachable] = np.nan
+            yield (minutes.reshape(len(unique), m)[inverse].astype(np.float32),
+                   miles.reshape(len(unique), m)[inverse].astype(np.float32))
+
+    def compute(self, origins, destinations, block_size=MATRIX_BLOCK_SIZE):
+        """Full (minutes, miles) float32 matrices"""
+        minutes = np.empty((len(origins), len(destinations)), dtype=np.float32)
+        miles = np.empty_like(minutes)
+        start = 0
+        for block_minutes, block_miles in self.rows(origins, destinations, block_size):
+            minutes[start:start + len(block_minutes)] = block_minutes
+            miles[start:start + len(block_miles)] = block_miles
+            start += len(block_minutes)
+        return minutes, miles
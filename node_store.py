@@ -0,0 +1,165 @@
+import os
+import time
+import queue
+import pickle
+import sqlite3
+import threading
+from contextlib import closing
+
+NODE_STORE_PATH = 'static/models/node_cache.sqlite'
+LEGACY_NODE_CACHE_PATH = 'static/models/node_cache.pkl'
+NODE_STORE_MAX_ENTRIES = 100000
+
+# Pending writes committed together in one transaction
+WRITE_BATCH_SIZE = 256
+
+class NodeStore:
+    """Persistent address -> graph node mapping in SQLite (WAL mode)
+
+    Lookups read straight from the database on a per-thread connection, so
+    startup does not load the mapping into memory and concurrent requests do
+    not share a cursor. Inserts and hit timestamps are queued and committed
+    in batches by a single writer thread; once the store exceeds max_entries
+    the least recently used addresses are deleted. The row count is tracked
+    as rows are added rather than counted on every batch.
+    """
+
+    def __init__(self, path=NODE_STORE_PATH, max_entries=NODE_STORE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'write_errors': 0}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS nodes (
+                key TEXT PRIMARY KEY,
+                node INTEGER NOT NULL,
+                lat REAL,
+                lng REAL,
+                last_used REAL NOT NULL
+            )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS nodes_last_used ON nodes (last_used)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            self._count = conn.execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+        self._count_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='node-store-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def __len__(self):
+        return self._reader().execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+
+    def __contains__(self, key):
+        return self._reader().execute('SELECT 1 FROM nodes WHERE key = ?', (key,)).fetchone() is not None
+
+    def get(self, key):
+        """Cached node for an address key, or None"""
+        row = self._reader().execute('SELECT node FROM nodes WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self._queue.put(('touch', key, time.time()))
+        return row[0]
+
+    def put(self, key, node, lat=None, lng=None):
+        """Queue an address -> node mapping for the next batch commit"""
+        self._queue.put(('put', key, int(node), lat, lng, time.time()))
+
+    def flush(self):
+        """Block until queued writes are committed"""
+        self._queue.join()
+
+    def import_pickle(self, path=LEGACY_NODE_CACHE_PATH):
+        """One-time import of the legacy pickled NODE_CACHE dict; returns rows imported"""
+        if not os.path.exists(path):
+            return 0
+        with closing(self._connect()) as conn:
+            with conn:
+                if conn.execute("SELECT 1 FROM meta WHERE name = 'imported_pickle'").fetchone():
+                    return 0
+                with open(path, 'rb') as f:
+                    legacy = pickle.load(f)
+                now = time.time()
+                added = conn.executemany(
+                    'INSERT OR IGNORE INTO nodes (key, node, last_used) VALUES (?, ?, ?)',
+                    [(key, int(node), now) for key, node in legacy.items()]
+                ).rowcount
+                conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('imported_pickle', ?)", (path,))
+            self._trim(conn, added)
+        return len(legacy)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                puts = [r[1:] for r in batch if r[0] == 'put']
+                touches = [(r[2], r[1]) for r in batch if r[0] == 'touch']
+                added = 0
+                with conn:
+                    if puts:
+                        keys = list({put[0] for put in puts})
+                        # Replacing an existing address does not grow the store
+                        existing = conn.execute(f"SELECT COUNT(*) FROM nodes WHERE key IN ({','.join('?' * len(keys))})",
+                                                keys).fetchone()[0]
+                        added = len(keys) - existing
+                        conn.executemany(
+                            'INSERT OR REPLACE INTO nodes (key, node, lat, lng, last_used) VALUES (?, ?, ?, ?, ?)', puts)
+                    if touches:
+                        conn.executemany('UPDATE nodes SET last_used = ? WHERE key = ?', touches)
+                self.stats['writes'] += len(puts)
+                if added:
+                    self._trim(conn, added)
+            except Exception as e:
+                self.stats['write_errors'] += len(batch)
+                print(f"Error writing node store: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _trim(self, conn, added):
+        """Count added rows and delete least recently used rows beyond max_entries"""
+        with self._count_lock:
+            self._count += added
+            if self._count <= self.max_entries:
+                return
+            with conn:
+                # Recount before deleting, in case another process shares the database
+                self._count = conn.execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+                excess = self._count - self.max_entries
+                if excess > 0:
+                    conn.execute('DELETE FROM nodes WHERE key IN (SELECT key FROM nodes ORDER BY last_used LIMIT ?)',
+                                 (excess,))
+                    self._count -= excess
+                    self.stats['evictions'] += excess
+
+    def status(self):
+        """Store size and hit/miss counters"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(
+            self.stats,
+            size=len(self),
+            max_entries=self.max_entries,
+            pending_writes=self._queue.unfinished_tasks,
+            hit_rate=round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+            size_mb=round(os.path.getsize(self.path) / (1024 * 1024), 2) if os.path.exists(self.path) else 0
+        )
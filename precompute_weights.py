@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Offline precompute of the hour-of-week x weather-class edge weight table
+
+Usage: python precompute_weights.py [--hours 0-167] [--classes Clear,Rain] [--week-start 2025-01-06]
+"""
+import argparse
+from datetime import datetime
+
+from app import load_or_train_model, get_nyc_graph
+from graph_store import load_graph_store
+from weights import WEIGHT_TABLE_DIR, HOURS_PER_WEEK, precompute_weight_table
+
+def parse_hours(value):
+    """Parse an hour list such as '0-23,168' into hour-of-week buckets"""
+    hours = []
+    for part in value.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            hours.extend(range(int(start), int(end) + 1))
+        else:
+            hours.append(int(part))
+    return [h for h in hours if 0 <= h < HOURS_PER_WEEK]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=parse_hours, default=None,
+                        help='hour-of-week buckets to fill, e.g. 0-23 (default: all 168)')
+    parser.add_argument('--classes', type=lambda v: v.split(','), default=None,
+                        help='weather classes to fill (default: all classes known to the model)')
+    parser.add_argument('--week-start', type=datetime.fromisoformat, default=None,
+                        help='Monday whose dates feed the day/month features (default: this week)')
+    parser.add_argument('--path', default=WEIGHT_TABLE_DIR)
+    args = parser.parse_args()
+
+    model, X_columns = load_or_train_model()
+    G = load_graph_store(get_nyc_graph).graph()
+    precompute_weight_table(G, model, X_columns, path=args.path, week_start=args.week_start,
+                            hours=args.hours, classes=args.classes)
+
+if __name__ == '__main__':
+    main()
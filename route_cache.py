@@ -0,0 +1,271 @@
+import os
+import time
+import queue
+import pickle
+import threading
+from collections import OrderedDict
+
+ROUTE_CACHE_LOG_PATH = 'static/models/route_cache.log'
+ROUTE_CACHE_MAX_ENTRIES = 5000
+
+# Seconds a cached route stays valid, by weight slice kind
+DEFAULT_WEIGHTS_TTL = 24 * 3600
+TABLE_WEIGHTS_TTL = 7 * 24 * 3600
+
+def ttl_for_weight_key(weight_key):
+    """Cache lifetime for routes computed with a weight slice
+
+    Precomputed table slices never change, the default weights change only
+    when they are recalculated, and slices predicted from the current
+    forecast are only good until the forecast hour rolls over.
+    """
+    if weight_key is None or weight_key == 'default':
+        return DEFAULT_WEIGHTS_TTL
+    if weight_key.startswith('table:'):
+        return TABLE_WEIGHTS_TTL
+    now = time.time()
+    return 3600 - now % 3600
+
+def route_segments(key, result):
+    """Road segments a cached route drives
+
+    Consecutive route node id pairs of the route and its alternatives, plus
+    ('arc', arc) for the arcs that snapped start and end points lie on.
+    """
+    segments = set()
+    for route in [result] + result.get('alternatives', []):
+        nodes = route.get('route_nodes', [])
+        segments.update(zip(nodes[:-1], nodes[1:]))
+    for end in key[:2]:
+        if isinstance(end, tuple) and end[0] == 'arc':
+            segments.add(('arc', end[1]))
+    return segments
+
+def cacheable_route(result):
+    """Copy of a route to cache, without the search stats that describe only the search that found it"""
+    route = {key: value for key, value in result.items() if key != 'search'}
+    if 'alternatives' in route:
+        route['alternatives'] = [{key: value for key, value in alternative.items() if key != 'search'}
+                                 for alternative in route['alternatives']]
+    return route
+
+def cached_route(route):
+    """Copy of a cached route for a response, marked as served from the cache"""
+    route = dict(route, search={'cached': True})
+    if 'alternatives' in route:
+        route['alternatives'] = [dict(alternative) for alternative in route['alternatives']]
+    return route
+
+class RouteCache:
+    """In-process LRU route cache with per-entry TTL, backed by an append-only log
+
+    Keys are (start node, end node, weight slice key) tuples. Writes to the
+    log happen on a background thread; the log is compacted once it holds
+    twice as many records as the cache. Entries are indexed by the road
+    segments they drive, so a change to some edges drops only the routes
+    over them. Transient entries (routes found while incident delays were
+    active) are never logged and are dropped together once a delay lifts.
+    The log starts with a version record (the graph and default weights it
+    was written for), and a log of another version is discarded on load.
+    """
+
+    def __init__(self, path=ROUTE_CACHE_LOG_PATH, max_entries=ROUTE_CACHE_MAX_ENTRIES, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version
+        self._entries = OrderedDict()
+        # Road segment -> keys of the cached routes that drive it
+        self._segments = {}
+        # Keys of the transient entries
+        self._transient = set()
+        self._lock = threading.Lock()
+        self._log_records = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+                      'writes': 0, 'write_errors': 0}
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='route-cache-writer', daemon=True)
+        self._writer.start()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _index(self, key, result):
+        for segment in route_segments(key, result):
+            self._segments.setdefault(segment, set()).add(key)
+
+    def _unindex(self, key, result):
+        self._transient.discard(key)
+        for segment in route_segments(key, result):
+            keys = self._segments.get(segment)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._segments[segment]
+
+    def load(self):
+        """Replay the persistent log, keeping the newest unexpired record per key"""
+        if not os.path.exists(self.path):
+            return 0
+        now = time.time()
+        records = 0
+        with self._lock, open(self.path, 'rb') as f:
+            try:
+                header = pickle.load(f)
+            except Exception:
+                header = None
+            if header != {'version': self.version}:
+                print("Route cache log was written for other graph weights. Discarding it.")
+                f.close()
+                os.remove(self.path)
+                return 0
+            while True:
+                try:
+                    key, expires_at, result = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception as e:
+                    print(f"Route cache log truncated after {records} records: {e}")
+                    break
+                records += 1
+                if result is None or expires_at <= now:
+                    self._entries.pop(key, None)
+                    continue
+                self._entries[key] = (expires_at, result)
+                self._entries.move_to_end(key)
+            self._log_records = records
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._segments = {}
+            self._transient = set()
+            for key, (_, result) in self._entries.items():
+                self._index(key, result)
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached route for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._unindex(key, result)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return result
+
+    def put(self, key, result, ttl, transient=False):
+        """Store a route and queue it for the persistent log, unless it is transient"""
+        expires_at = time.time() + ttl
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._unindex(key, previous[1])
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            self._index(key, result)
+            if transient:
+                self._transient.add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, (_, evicted_result) = self._entries.popitem(last=False)
+                self._unindex(evicted, evicted_result)
+                self.stats['evictions'] += 1
+        if not transient:
+            self._queue.put((key, expires_at, result))
+
+    def invalidate(self, keys):
+        """Drop entries and record the removal in the log"""
+        removed = 0
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._unindex(key, entry[1])
+                    removed += 1
+                    self._queue.put((key, 0, None))
+        return removed
+
+    def invalidate_segments(self, segments):
+        """Drop every cached route that drives one of the road segments (see route_segments)"""
+        with self._lock:
+            keys = set()
+            for segment in segments:
+                keys.update(self._segments.get(segment, ()))
+        removed = self.invalidate(keys)
+        self.stats['invalidations'] += removed
+        return removed
+
+    def invalidate_transient(self):
+        """Drop every transient entry; returns how many"""
+        with self._lock:
+            keys = list(self._transient)
+        removed = self.invalidate(keys)
+        self.stats['invalidations'] += removed
+        return removed
+
+    def flush(self):
+        """Block until queued writes have reached the log"""
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                batch = [record]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    new_log = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                    with open(self.path, 'ab') as f:
+                        if new_log:
+                            pickle.dump({'version': self.version}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                        for item in batch:
+                            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    self._log_records += len(batch)
+                    self.stats['writes'] += len(batch)
+                    if self._log_records > 2 * max(self.max_entries, len(self._entries)):
+                        self._compact()
+                except Exception as e:
+                    self.stats['write_errors'] += len(batch)
+                    print(f"Error writing route cache log: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _compact(self):
+        """Rewrite the log with only the live entries"""
+        with self._lock:
+            entries = [(key, entry) for key, entry in self._entries.items() if key not in self._transient]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': self.version}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for key, (expires_at, result) in entries:
+                pickle.dump((key, expires_at, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self._log_records = len(entries)
+        print(f"Compacted route cache log to {len(entries)} records.")
+
+    def status(self):
+        """Cache size and hit/miss/eviction counters"""
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(
+            self.stats,
+            size=size,
+            indexed_segments=len(self._segments),
+            transient=len(self._transient),
+            max_entries=self.max_entries,
+            hit_rate=round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+            log_records=self._log_records,
+            log_size_mb=round(os.path.getsize(self.path) / (1024 * 1024), 2) if os.path.exists(self.path) else 0
+        )
@@ -0,0 +1,93 @@
+import gzip
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Decimal places kept by the encoded polyline (5 is ~1m, the Google format's default)
+POLYLINE_PRECISION = 5
+# Decimal places kept per column in compact edge arrays
+EDGE_COLUMN_DECIMALS = {'distance': 4, 'base_time': 3, 'actual_time': 3, 'congestion_level': 3}
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def encode_polyline(coords, precision=POLYLINE_PRECISION):
+    """Encoded polyline (Google's algorithm) for a sequence of (lat, lng) pairs
+
+    Coordinates are rounded to `precision` decimals, delta-encoded, zigzagged
+    and written as 5-bit chunks, every value at once.
+    """
+    if len(coords) == 0:
+        return ''
+    points = np.round(np.asarray(coords, dtype=np.float64) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # One row of 5-bit chunks per value, low bits first; all but the last chunk flag a continuation
+    width = max(1, (int(values.max()).bit_length() + 4) // 5)
+    shifts = 5 * np.arange(width)
+    chunks = (values[:, None] >> shifts) & 0x1f
+    more = (values[:, None] >> (shifts + 5)) > 0
+    used = np.ones_like(more)
+    used[:, 1:] = more[:, :-1]
+    chars = (chunks | np.where(more, 0x20, 0)) + 63
+    return chars[used].astype(np.uint8).tobytes().decode('ascii')
+
+def decode_polyline(polyline, precision=POLYLINE_PRECISION):
+    """(lat, lng) pairs from an encoded polyline"""
+    values = []
+    value = shift = 0
+    for byte in polyline.encode('ascii'):
+        byte -= 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    points = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return [tuple(point) for point in points.tolist()]
+
+def compact_route(route, precision=POLYLINE_PRECISION):
+    """Compact form of a route_summary() result
+
+    Geometry becomes one encoded polyline and the per-edge dicts become
+    rounded column arrays (edge i runs from point i to point i + 1 of the
+    polyline; congestion impact is actual minus base time). Route node ids
+    are dropped; the totals, search info and alternatives are kept.
+    """
+    edges = route['edges']
+    compact = {
+        'format': 'compact',
+        'polyline': encode_polyline(route['route_coords'], precision),
+        'precision': precision,
+        'edges': {
+            column: np.round([edge[column] for edge in edges], decimals).tolist()
+            for column, decimals in EDGE_COLUMN_DECIMALS.items()
+        }
+    }
+    for field, value in route.items():
+        if field not in ('route_nodes', 'route_coords', 'edges', 'alternatives'):
+            compact[field] = value
+    if 'alternatives' in route:
+        compact['alternatives'] = [compact_route(alternative, precision) for alternative in route['alternatives']]
+    return compact
+
+def negotiate_encoding(accept_encodings):
+    """Best response encoding a client accepts: 'br' (if brotli is installed), 'gzip' or None"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress(body, encoding):
+    """Compress a response body with a negotiated encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
@@ -0,0 +1,847 @@
+import math
+import time
+import threading
+from heapq import heappush, heappop
+from collections import OrderedDict
+
+import numpy as np
+import networkx as nx
+
+METERS_PER_MILE = 1609.34
+BASE_SPEED_MPH = 25
+CONGESTION_SCALE = 0.5
+CONGESTION_LEVEL_MAX = 3.0
+
+# Prepared weight slices kept per routing graph
+PREPARED_WEIGHTS_CACHE_SIZE = 8
+
+# Penalty method for alternative routes: arcs on a found path cost this much
+# more in later searches; an alternative may cost at most max stretch times
+# the best path and share at most max overlap of its length with earlier ones
+ALTERNATIVE_PENALTY = 1.5
+ALTERNATIVE_MAX_STRETCH = 1.4
+ALTERNATIVE_MAX_OVERLAP = 0.6
+ALTERNATIVE_SEARCHES_PER_ROUTE = 3
+
+# Hours of weight slices a time-dependent search may use; later arrivals keep the last
+TIME_DEPENDENT_MAX_HOURS = 6
+
+EARTH_RADIUS_M = 6371009
+ALGORITHMS = ('dijkstra', 'astar', 'bidirectional', 'ch')
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters (vectorized)"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class PreparedWeights:
+    """Per-edge weights collapsed onto the routing graph's (u, v) arcs
+
+    edge_weight includes incident delays; source_weight is the weight
+    source as given, kept to recompute edges when delays change.
+    """
+
+    def __init__(self, source_weight, edge_weight, arc_weight, arc_eid, min_cost_per_meter):
+        self.source_weight = source_weight
+        self.edge_weight = edge_weight
+        self.arc_weight = arc_weight
+        self.arc_eid = arc_eid
+        self.cost = arc_weight.tolist()
+        # Lower bound on cost per great-circle meter, for the A* heuristic
+        self.min_cost_per_meter = min_cost_per_meter
+
+class RoutingGraph:
+    """Compact CSR routing graph built from the stable edge index
+
+    Parallel edges are collapsed into one arc per (u, v) pair; each weight
+    source is collapsed to the minimum parallel edge when it is prepared, so
+    the search itself only ever sees one arc per pair.
+    """
+
+    def __init__(self, node_ids, node_x, node_y, edge_u, edge_v, edge_length, edge_weight):
+        self.node_ids = np.asarray(node_ids)
+        self.node_x = np.asarray(node_x, dtype=np.float64)
+        self.node_y = np.asarray(node_y, dtype=np.float64)
+        self.edge_u = np.asarray(edge_u, dtype=np.int64)
+        self.edge_v = np.asarray(edge_v, dtype=np.int64)
+        self.edge_length = np.asarray(edge_length, dtype=np.float64)
+        self.num_nodes = len(self.node_ids)
+        self.num_edges = len(self.edge_u)
+        self.node_index = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        self._node_id_list = self.node_ids.tolist()
+
+        # Group parallel edges: edges sorted by (u, v), one arc per distinct pair
+        self.edge_order = np.lexsort((self.edge_v, self.edge_u))
+        sorted_u = self.edge_u[self.edge_order]
+        sorted_v = self.edge_v[self.edge_order]
+        new_pair = np.ones(self.num_edges, dtype=bool)
+        new_pair[1:] = (sorted_u[1:] != sorted_u[:-1]) | (sorted_v[1:] != sorted_v[:-1])
+        self.arc_start = np.flatnonzero(new_pair)
+        self.arc_end = np.append(self.arc_start[1:], self.num_edges)
+        self.edge_arc = np.empty(self.num_edges, dtype=np.int64)
+        self.edge_arc[self.edge_order] = np.cumsum(new_pair) - 1
+        self.arc_source = sorted_u[self.arc_start]
+        self.arc_target = sorted_v[self.arc_start]
+        self.num_arcs = len(self.arc_start)
+
+        self.offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.arc_source, minlength=self.num_nodes), out=self.offsets[1:])
+        self._offsets = self.offsets.tolist()
+        self._targets = self.arc_target.tolist()
+        self._sources = self.arc_source.tolist()
+
+        # Reverse adjacency (arcs grouped by target) for backward searches
+        self.rev_offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.arc_target, minlength=self.num_nodes), out=self.rev_offsets[1:])
+        self._rev_offsets = self.rev_offsets.tolist()
+        self.rev_arc_order = np.argsort(self.arc_target, kind='stable')
+        self._rev_arcs = self.rev_arc_order.tolist()
+
+        self._lat_rad = np.radians(self.node_y).tolist()
+        self._lng_rad = np.radians(self.node_x).tolist()
+        self.arc_distance = haversine_m(self.node_y[self.arc_source], self.node_x[self.arc_source],
+                                        self.node_y[self.arc_target], self.node_x[self.arc_target])
+
+        self._prepared = OrderedDict()
+        # Guards the incident delay state and the prepared slice and hour profile caches
+        self._weights_lock = threading.RLock()
+        self._hierarchies = {}
+        self._minutes_per_meter = None
+        self._hour_profiles = OrderedDict()
+        # Incident delay factor per edge (1 = no incident) and how many edges have one
+        self.edge_delay = np.ones(self.num_edges, dtype=np.float64)
+        self.delayed_edges = 0
+        # Bumped on every delay change, so callers can tell a search overlapped one
+        self.delay_version = 0
+        self.base = self.prepare(edge_weight)
+
+    @classmethod
+    def from_graph(cls, G, weight='weight'):
+        """Build from a networkx MultiDiGraph in stable edge index order"""
+        node_ids = list(G.nodes)
+        node_index = {node: i for i, node in enumerate(node_ids)}
+        n = G.number_of_edges()
+        edge_u = np.empty(n, dtype=np.int64)
+        edge_v = np.empty(n, dtype=np.int64)
+        edge_length = np.empty(n, dtype=np.float64)
+        edge_weight = np.empty(n, dtype=np.float64)
+        for i, (u, v, data) in enumerate(G.edges(data=True)):
+            edge_u[i] = node_index[u]
+            edge_v[i] = node_index[v]
+            edge_length[i] = data.get('length', 0)
+            edge_weight[i] = data.get(weight, 1)
+        node_x = [G.nodes[node]['x'] for node in node_ids]
+        node_y = [G.nodes[node]['y'] for node in node_ids]
+        return cls(node_ids, node_x, node_y, edge_u, edge_v, edge_length, edge_weight)
+
+    @classmethod
+    def from_store(cls, store):
+        """Build from a GraphStore's columns; edges default to weight 1 without stored weights"""
+        edge_weight = store.edge_weight if store.edge_weight is not None else np.ones(store.num_edges)
+        return cls(store.node_ids, store.node_x, store.node_y, store.edge_u, store.edge_v,
+                   store.edge_length, edge_weight)
+
+    def prepare(self, weights=None, key=None):
+        """Collapse a weight source (array or callable by edge index) onto arcs"""
+        if weights is None:
+            return self.base
+        with self._weights_lock:
+            if key is not None and key in self._prepared:
+                self._prepared.move_to_end(key)
+                return self._prepared[key]
+
+        if callable(weights):
+            source_weight = np.fromiter((weights(i) for i in range(self.num_edges)),
+                                        dtype=np.float64, count=self.num_edges)
+        else:
+            source_weight = np.asarray(weights, dtype=np.float64)
+        # Delays applied and the slice cached atomically, so set_edge_delays() patches it or came before
+        with self._weights_lock:
+            return self._prepare(source_weight, key)
+
+    def cached_weights(self, key):
+        """Source weights of the slice prepared under key, or None when it is not cached"""
+        with self._weights_lock:
+            prepared = self._prepared.get(key)
+        return None if prepared is None else prepared.source_weight
+
+    def _prepare(self, source_weight, key):
+        if key is not None and key in self._prepared:
+            self._prepared.move_to_end(key)
+            return self._prepared[key]
+        edge_weight = self.delayed_weights(source_weight)
+
+        # Cheapest parallel edge per arc: sort by (arc, weight) and take each arc's first edge
+        order = np.lexsort((edge_weight, self.edge_arc))
+        arc_eid = order[self.arc_start]
+        arc_weight = edge_weight[arc_eid]
+        # Delays only add cost, so a bound from the undelayed weights holds while they come and go
+        spans = self.arc_distance > 0
+        undelayed = np.minimum.reduceat(source_weight[self.edge_order], self.arc_start)
+        min_cost_per_meter = float((undelayed[spans] / self.arc_distance[spans]).min()) if spans.any() else 0.0
+        # Shave off rounding error so the heuristic stays admissible
+        prepared = PreparedWeights(source_weight, edge_weight, arc_weight, arc_eid, min_cost_per_meter * (1 - 1e-9))
+
+        if key is not None:
+            self._prepared[key] = prepared
+            if len(self._prepared) > PREPARED_WEIGHTS_CACHE_SIZE:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def delayed_weights(self, weights, eids=None):
+        """Weights with incident delays applied, for every edge or just the edges eids
+
+        A delay factor d makes an edge d times slower to drive: with travel
+        time proportional to 1 + w x CONGESTION_SCALE, its weight w becomes
+        d x w + (d - 1) / CONGESTION_SCALE. Always returns a new array.
+        """
+        with self._weights_lock:
+            if eids is None:
+                if not self.delayed_edges:
+                    return np.array(weights, dtype=np.float64)
+                delay = self.edge_delay.copy()
+            else:
+                delay = self.edge_delay[eids]
+        return weights * delay + (delay - 1.0) / CONGESTION_SCALE
+
+    def parallel_edges(self, arcs):
+        """Edge ids of each arc's parallel edges, padded to the widest arc; returns (edges, padding mask)"""
+        width = int((self.arc_end[arcs] - self.arc_start[arcs]).max()) if len(arcs) else 1
+        slots = self.arc_start[arcs][:, None] + np.arange(width)
+        padding = slots >= self.arc_end[arcs][:, None]
+        return self.edge_order[np.minimum(slots, self.num_edges - 1)], padding
+
+    def set_edge_delays(self, eids, delays):
+        """Set the incident delay factor (1 for none) of some edges, patching cached weight slices in place
+
+        The base weights, every cached prepared slice and every cached hour
+        profile are updated for just these edges' arcs, so the work grows
+        with the number of edges and cached slices rather than the graph.
+        Returns the affected arcs.
+        """
+        eids = np.asarray(eids, dtype=np.int64)
+        delays = np.maximum(np.broadcast_to(np.asarray(delays, dtype=np.float64), eids.shape), 1.0)
+        eids, first = np.unique(eids, return_index=True)
+        with self._weights_lock:
+            return self._set_edge_delays(eids, delays[first])
+
+    def _set_edge_delays(self, eids, delays):
+        self.delayed_edges += int((delays > 1.0).sum() - (self.edge_delay[eids] > 1.0).sum())
+        self.edge_delay[eids] = delays
+        self.delay_version += 1
+
+        arcs = np.unique(self.edge_arc[eids])
+        parallel, padding = self.parallel_edges(arcs)
+        rows = np.arange(len(arcs))
+        arc_list = arcs.tolist()
+        for prepared in [self.base, *self._prepared.values()]:
+            prepared.edge_weight[eids] = self.delayed_weights(prepared.source_weight[eids], eids)
+            # Cheapest parallel edge, ties to the lowest edge id as in prepare()
+            choice = parallel[rows, np.where(padding, np.inf, prepared.edge_weight[parallel]).argmin(axis=1)]
+            prepared.arc_eid[arcs] = choice
+            prepared.arc_weight[arcs] = prepared.edge_weight[choice]
+            for a, w in zip(arc_list, prepared.arc_weight[arcs].tolist()):
+                prepared.cost[a] = w
+        minutes_per_mile = 60 / BASE_SPEED_MPH
+        for profile in self._hour_profiles.values():
+            profile['edge_weight'][eids] = self.delayed_weights(profile['source_weight'][eids], eids)
+            profile['edge_minutes'][eids] = (self.edge_length[eids] / METERS_PER_MILE * minutes_per_mile
+                                             * (1.0 + profile['edge_weight'][eids] * CONGESTION_SCALE))
+            minutes = np.where(padding, np.inf, profile['edge_minutes'][parallel]).min(axis=1)
+            for a, m in zip(arc_list, minutes.tolist()):
+                profile['cost'][a] = m
+        return arcs
+
+    def attach_hierarchy(self, hierarchy):
+        """Register a contraction hierarchy for its weight slice key"""
+        hierarchy.verified = False
+        self._hierarchies[hierarchy.key] = hierarchy
+
+    def hierarchy_for(self, prepared, key):
+        """Contraction hierarchy built for these weights, if one is attached"""
+        hierarchy = self._hierarchies.get(key)
+        if hierarchy is not None and not hierarchy.verified:
+            if not hierarchy.matches(self, prepared):
+                print(f"Contraction hierarchy for '{key or 'default'}' does not match current weights. Ignoring it.")
+                del self._hierarchies[key]
+                return None
+            hierarchy.verified = True
+        return hierarchy
+
+    def _dijkstra(self, source, target, cost):
+        """Heap-based Dijkstra over arcs; returns (dist, pred_arc, settled count)"""
+        offsets = self._offsets
+        targets = self._targets
+        dist = [math.inf] * self.num_nodes
+        pred = [-1] * self.num_nodes
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        settled = 0
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == target:
+                break
+            for a in range(offsets[u], offsets[u + 1]):
+                nd = d + cost[a]
+                v = targets[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd, v))
+        return dist, pred, settled
+
+    def _astar(self, source, target, cost, cost_per_meter):
+        """A* with an admissible great-circle heuristic; returns (dist, pred_arc, settled count)"""
+        offsets = self._offsets
+        targets = self._targets
+        lat_rad, lng_rad = self._lat_rad, self._lng_rad
+        target_lat, target_lng = lat_rad[target], lng_rad[target]
+        cos_target = math.cos(target_lat)
+        scale = 2 * EARTH_RADIUS_M * cost_per_meter
+
+        def h(v):
+            a = (math.sin((target_lat - lat_rad[v]) / 2) ** 2
+                 + math.cos(lat_rad[v]) * cos_target * math.sin((target_lng - lng_rad[v]) / 2) ** 2)
+            return scale * math.asin(math.sqrt(min(a, 1.0)))
+
+        dist = [math.inf] * self.num_nodes
+        pred = [-1] * self.num_nodes
+        dist[source] = 0.0
+        heap = [(h(source), 0.0, source)]
+        settled = 0
+        while heap:
+            _, d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == target:
+                break
+            for a in range(offsets[u], offsets[u + 1]):
+                nd = d + cost[a]
+                v = targets[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd + h(v), nd, v))
+        return dist, pred, settled
+
+    def _bidirectional(self, source, target, cost):
+        """Bidirectional Dijkstra; returns (cost, arc path, settled count)"""
+        if source == target:
+            return 0.0, [], 1
+        offsets, targets = self._offsets, self._targets
+        rev_offsets, rev_arcs, sources = self._rev_offsets, self._rev_arcs, self._sources
+        dist_f = {source: 0.0}
+        dist_b = {target: 0.0}
+        pred_f = {}
+        pred_b = {}
+        heap_f = [(0.0, source)]
+        heap_b = [(0.0, target)]
+        best = math.inf
+        meet = -1
+        settled = 0
+        while heap_f and heap_b:
+            if heap_f[0][0] + heap_b[0][0] >= best:
+                break
+            if heap_f[0][0] <= heap_b[0][0]:
+                d, u = heappop(heap_f)
+                if d > dist_f[u]:
+                    continue
+                settled += 1
+                for a in range(offsets[u], offsets[u + 1]):
+                    v = targets[a]
+                    nd = d + cost[a]
+                    if nd < dist_f.get(v, math.inf):
+                        dist_f[v] = nd
+                        pred_f[v] = a
+                        heappush(heap_f, (nd, v))
+                        if v in dist_b and nd + dist_b[v] < best:
+                            best = nd + dist_b[v]
+                            meet = v
+            else:
+                d, u = heappop(heap_b)
+                if d > dist_b[u]:
+                    continue
+                settled += 1
+                for i in range(rev_offsets[u], rev_offsets[u + 1]):
+                    a = rev_arcs[i]
+                    v = sources[a]
+                    nd = d + cost[a]
+                    if nd < dist_b.get(v, math.inf):
+                        dist_b[v] = nd
+                        pred_b[v] = a
+                        heappush(heap_b, (nd, v))
+                        if v in dist_f and nd + dist_f[v] < best:
+                            best = nd + dist_f[v]
+                            meet = v
+        if meet < 0:
+            return math.inf, None, settled
+
+        arcs = self._unwind(pred_f, source, meet)
+        node = meet
+        while node != target:
+            a = pred_b[node]
+            arcs.append(a)
+            node = targets[a]
+        return best, arcs, settled
+
+    def _dijkstra_multi(self, sources, targets, cost):
+        """Dijkstra from several sources with initial costs to several targets with remaining costs
+
+        Returns (best total cost, target node reached, pred_arc, settled count).
+        """
+        offsets = self._offsets
+        heads = self._targets
+        dist = [math.inf] * self.num_nodes
+        pred = [-1] * self.num_nodes
+        heap = []
+        for s, c in sources.items():
+            if c < dist[s]:
+                dist[s] = c
+                heappush(heap, (c, s))
+        best = math.inf
+        meet = -1
+        settled = 0
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            if d >= best:
+                break
+            settled += 1
+            if u in targets and d + targets[u] < best:
+                best = d + targets[u]
+                meet = u
+            for a in range(offsets[u], offsets[u + 1]):
+                nd = d + cost[a]
+                v = heads[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd, v))
+        return best, meet, pred, settled
+
+    def _dijkstra_tree(self, source, targets, cost):
+        """Single-source Dijkstra that stops once every target is settled; returns (dist, pred_arc, settled count)"""
+        offsets = self._offsets
+        heads = self._targets
+        dist = [math.inf] * self.num_nodes
+        pred = [-1] * self.num_nodes
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        remaining = set(targets)
+        settled = 0
+        while heap and remaining:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            remaining.discard(u)
+            for a in range(offsets[u], offsets[u + 1]):
+                nd = d + cost[a]
+                v = heads[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd, v))
+        return dist, pred, settled
+
+    def _unwind_to_root(self, pred, node):
+        """Arc path from whichever source a predecessor tree started at; returns (root, arcs)"""
+        sources = self._sources
+        arcs = []
+        while pred[node] != -1:
+            a = pred[node]
+            arcs.append(a)
+            node = sources[a]
+        arcs.reverse()
+        return node, arcs
+
+    def reverse_arc(self, a):
+        """Arc running opposite to arc a, or -1"""
+        u, v = self._sources[a], self._targets[a]
+        for b in range(self._offsets[v], self._offsets[v + 1]):
+            if self._targets[b] == u:
+                return b
+        return -1
+
+    def _snap_arcs(self, snap):
+        """(arc, fraction) pairs a snapped point can be driven along, both directions where allowed"""
+        arcs = [(snap['arc'], snap['fraction'])]
+        reverse = self.reverse_arc(snap['arc'])
+        if reverse >= 0:
+            arcs.append((reverse, 1.0 - snap['fraction']))
+        return arcs
+
+    def shortest_path_between(self, start_snap, end_snap, weights=None, key=None):
+        """Shortest path between two points snapped onto arcs (see SpatialIndex.nearest_arc)"""
+        prepared = self.prepare(weights, key)
+        cost = prepared.cost
+        start_arcs = self._snap_arcs(start_snap)
+        end_arcs = self._snap_arcs(end_snap)
+
+        sources, source_arc = {}, {}
+        for a, t in start_arcs:
+            head = self._targets[a]
+            c = (1.0 - t) * cost[a]
+            if c < sources.get(head, math.inf):
+                sources[head] = c
+                source_arc[head] = (a, t)
+        targets, target_arc = {}, {}
+        for a, t in end_arcs:
+            tail = self._sources[a]
+            c = t * cost[a]
+            if c < targets.get(tail, math.inf):
+                targets[tail] = c
+                target_arc[tail] = (a, t)
+
+        best, meet, pred, settled = self._dijkstra_multi(sources, targets, cost)
+
+        # Both points on the same arc, the end further along than the start
+        direct = None
+        for a, t in start_arcs:
+            for b, t_end in end_arcs:
+                if a == b and t_end >= t and (t_end - t) * cost[a] <= best:
+                    best = (t_end - t) * cost[a]
+                    direct = (a, t, t_end)
+        if best == math.inf:
+            raise nx.NetworkXNoPath("No path between the snapped locations.")
+
+        if direct is not None:
+            a, t, t_end = direct
+            arcs = [a]
+            fractions = [t_end - t]
+            node_idx = np.empty(0, dtype=np.int64)
+        else:
+            root, middle = self._unwind_to_root(pred, meet)
+            first, t_first = source_arc[root]
+            last, t_last = target_arc[meet]
+            arcs = [first] + middle + [last]
+            fractions = [1.0 - t_first] + [1.0] * len(middle) + [t_last]
+            node_idx = np.concatenate(([root], self.arc_target[np.asarray(middle, dtype=np.int64)])).astype(np.int64)
+
+        arcs = np.asarray(arcs, dtype=np.int64)
+        coords = ([(start_snap['lat'], start_snap['lng'])]
+                  + list(zip(self.node_y[node_idx].tolist(), self.node_x[node_idx].tolist()))
+                  + [(end_snap['lat'], end_snap['lng'])])
+        return {
+            'nodes': [self._node_id_list[i] for i in node_idx.tolist()],
+            'node_index': node_idx,
+            'edges': prepared.arc_eid[arcs],
+            'fractions': np.asarray(fractions, dtype=np.float64),
+            'coords': coords,
+            'cost': best,
+            'settled': settled,
+            'weights': prepared,
+            'algorithm': 'dijkstra'
+        }
+
+    def node_id(self, index):
+        """Node id for a routing-graph node index"""
+        return self._node_id_list[index]
+
+    def _unwind(self, pred, source, target):
+        """Arc path from source to target following predecessor arcs"""
+        sources = self._sources
+        arcs = []
+        node = target
+        while node != source:
+            a = pred[node]
+            arcs.append(a)
+            node = sources[a]
+        arcs.reverse()
+        return arcs
+
+    def shortest_path(self, source_node, target_node, weights=None, key=None, algorithm='dijkstra'):
+        """Shortest path between node ids; returns node ids, edge indices, cost and search stats"""
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown routing algorithm '{algorithm}'")
+        prepared = self.prepare(weights, key)
+        source = self.node_index[source_node]
+        target = self.node_index[target_node]
+        if algorithm == 'ch':
+            # Hierarchies are built on undelayed weights
+            if (weights is not None and key is None) or self.delayed_edges:
+                hierarchy = None
+            else:
+                hierarchy = self.hierarchy_for(prepared, key)
+            if hierarchy is None:
+                algorithm = 'bidirectional'
+        if algorithm == 'ch':
+            cost, arcs, settled = hierarchy.query(source, target)
+        elif algorithm == 'bidirectional':
+            cost, arcs, settled = self._bidirectional(source, target, prepared.cost)
+        else:
+            if algorithm == 'astar':
+                dist, pred, settled = self._astar(source, target, prepared.cost, prepared.min_cost_per_meter)
+            else:
+                dist, pred, settled = self._dijkstra(source, target, prepared.cost)
+            cost = dist[target]
+            if cost < math.inf:
+                arcs = self._unwind(pred, source, target)
+        if cost == math.inf:
+            raise nx.NetworkXNoPath(f"No path between {source_node} and {target_node}.")
+        path = self._path_result(arcs, source, cost, prepared, settled)
+        path['algorithm'] = algorithm
+        return path
+
+    def shortest_paths_from(self, source_node, target_nodes, weights=None, key=None):
+        """Shortest paths from one node id to many, answered from a single search tree
+
+        Returns {target node id: path as shortest_path returns it, or None if unreachable}.
+        """
+        prepared = self.prepare(weights, key)
+        source = self.node_index[source_node]
+        targets = {self.node_index[node]: node for node in target_nodes}
+        dist, pred, settled = self._dijkstra_tree(source, targets, prepared.cost)
+        paths = {}
+        for target, node in targets.items():
+            if dist[target] == math.inf:
+                paths[node] = None
+                continue
+            path = self._path_result(self._unwind(pred, source, target), source, dist[target], prepared, settled)
+            path['algorithm'] = 'dijkstra_tree'
+            paths[node] = path
+        return paths
+
+    def alternative_paths(self, source_node, target_node, k=3, weights=None, key=None,
+                          penalty=ALTERNATIVE_PENALTY, max_stretch=ALTERNATIVE_MAX_STRETCH,
+                          max_overlap=ALTERNATIVE_MAX_OVERLAP):
+        """Up to k diverse paths between node ids by the penalty method, best first
+
+        Each search is bidirectional Dijkstra over the weights with every arc
+        of the paths found so far made `penalty` times more expensive. A
+        candidate is kept when its true cost is within max_stretch of the
+        best and at most max_overlap of its length is shared with kept
+        paths. Paths also carry 'stretch', 'overlap' and 'search_ms' (time
+        spent since the previous kept path, rejected candidates included).
+        """
+        prepared = self.prepare(weights, key)
+        source = self.node_index[source_node]
+        target = self.node_index[target_node]
+        true_cost = prepared.cost
+        cost = list(true_cost)
+        arc_length = self.edge_length[prepared.arc_eid]
+        shared = np.zeros(self.num_arcs, dtype=bool)
+        paths = []
+        t_start = time.perf_counter()
+        for _ in range(k * ALTERNATIVE_SEARCHES_PER_ROUTE):
+            _, arcs, settled = self._bidirectional(source, target, cost)
+            if arcs is None:
+                raise nx.NetworkXNoPath(f"No path between {source_node} and {target_node}.")
+            path_cost = math.fsum(true_cost[a] for a in arcs)
+            length = arc_length[arcs].sum()
+            stretch = path_cost / paths[0]['cost'] if paths and paths[0]['cost'] > 0 else 1.0
+            overlap = arc_length[arcs][shared[arcs]].sum() / length if paths and length > 0 else 0.0
+            if paths and (stretch > max_stretch or not arcs):
+                break
+            for a in arcs:
+                cost[a] *= penalty
+            if paths and overlap > max_overlap:
+                continue
+            path = self._path_result(arcs, source, path_cost, prepared, settled)
+            path.update(algorithm='penalty', stretch=stretch, overlap=overlap,
+                        search_ms=(time.perf_counter() - t_start) * 1000)
+            paths.append(path)
+            shared[arcs] = True
+            if len(paths) == k:
+                break
+            t_start = time.perf_counter()
+        return paths
+
+    def min_minutes_per_meter(self):
+        """Lower bound on travel minutes per great-circle meter (no congestion), for time-dependent A*"""
+        if self._minutes_per_meter is None:
+            arc_length = np.minimum.reduceat(self.edge_length[self.edge_order], self.arc_start)
+            spans = self.arc_distance > 0
+            ratio = float((arc_length[spans] / self.arc_distance[spans]).min()) if spans.any() else 0.0
+            self._minutes_per_meter = ratio / METERS_PER_MILE * (60 / BASE_SPEED_MPH) * (1 - 1e-9)
+        return self._minutes_per_meter
+
+    def hour_profile(self, weights=None, key=None):
+        """Per-arc travel minutes (fastest parallel edge) for one hour's weights, cached by key
+
+        The default weights (weights None) are cached under 'default'.
+        """
+        if weights is None:
+            source_weight, key = self.base.source_weight, 'default'
+        else:
+            source_weight = np.asarray(weights, dtype=np.float64)
+        with self._weights_lock:
+            return self._hour_profile(source_weight, key)
+
+    def _hour_profile(self, source_weight, key):
+        if key is not None and key in self._hour_profiles:
+            self._hour_profiles.move_to_end(key)
+            return self._hour_profiles[key]
+        edge_weight = self.delayed_weights(source_weight)
+        edge_minutes = self.edge_length / METERS_PER_MILE * (60 / BASE_SPEED_MPH) * (1.0 + edge_weight * CONGESTION_SCALE)
+        profile = {
+            'cost': np.minimum.reduceat(edge_minutes[self.edge_order], self.arc_start).tolist(),
+            'edge_minutes': edge_minutes,
+            'edge_weight': edge_weight,
+            'source_weight': source_weight
+        }
+        if key is not None:
+            self._hour_profiles[key] = profile
+            if len(self._hour_profiles) > PREPARED_WEIGHTS_CACHE_SIZE:
+                self._hour_profiles.popitem(last=False)
+        return profile
+
+    def time_dependent_path(self, source_node, target_node, hour_weights, start_minute=0.0,
+                            max_hours=TIME_DEPENDENT_MAX_HOURS):
+        """Fastest path with every arc priced at the time the trip reaches it
+
+        hour_weights(i) returns (weights, key) for the i-th hour from the
+        departure hour, weights None meaning the default weights; it is only
+        called for hours the search reaches. start_minute is the departure's
+        minute within its hour. Each hour's travel times apply at the middle
+        of the hour and are interpolated linearly in between, and no arc may
+        speed up by more than the hour between two anchors, so leaving later
+        never arrives earlier (FIFO) and a label-setting search stays exact.
+        The path cost is the trip's duration in minutes.
+        """
+        source = self.node_index[source_node]
+        target = self.node_index[target_node]
+        hours = []
+
+        def profile(i):
+            """Per-arc minutes list for hour i, loading hours up to it"""
+            i = min(i, max_hours - 1)
+            while len(hours) <= i:
+                hours.append(self.hour_profile(*hour_weights(len(hours))))
+            return hours[i]['cost']
+
+        def position(t):
+            """(hour index, fraction towards the next hour) for minute t of the trip"""
+            x = max(start_minute + t - 30.0, 0.0) / 60.0
+            i = int(x)
+            return i, x - i
+
+        offsets = self._offsets
+        targets = self._targets
+        lat_rad, lng_rad = self._lat_rad, self._lng_rad
+        target_lat, target_lng = lat_rad[target], lng_rad[target]
+        cos_target = math.cos(target_lat)
+        scale = 2 * EARTH_RADIUS_M * self.min_minutes_per_meter()
+
+        def h(v):
+            a = (math.sin((target_lat - lat_rad[v]) / 2) ** 2
+                 + math.cos(lat_rad[v]) * cos_target * math.sin((target_lng - lng_rad[v]) / 2) ** 2)
+            return scale * math.asin(math.sqrt(min(a, 1.0)))
+
+        arrival = [math.inf] * self.num_nodes
+        pred = [-1] * self.num_nodes
+        arrival[source] = 0.0
+        heap = [(h(source), 0.0, source)]
+        settled = 0
+        while heap:
+            _, t, u = heappop(heap)
+            if t > arrival[u]:
+                continue
+            settled += 1
+            if u == target:
+                break
+            i, f = position(t)
+            lo = profile(i)
+            hi = profile(i + 1)
+            for a in range(offsets[u], offsets[u + 1]):
+                change = hi[a] - lo[a]
+                if change < -60.0:
+                    change = -60.0
+                nt = t + lo[a] + change * f
+                v = targets[a]
+                if nt < arrival[v]:
+                    arrival[v] = nt
+                    pred[v] = a
+                    heappush(heap, (nt + h(v), nt, v))
+        if arrival[target] == math.inf:
+            raise nx.NetworkXNoPath(f"No path between {source_node} and {target_node}.")
+
+        # Replay the trip: fastest parallel edge and interpolated weight at each arc's entry time
+        arcs = self._unwind(pred, source, target)
+        eids, congestion = [], []
+        t = 0.0
+        for a in arcs:
+            i, f = position(t)
+            lo, hi = hours[min(i, max_hours - 1)], hours[min(i + 1, max_hours - 1)]
+            parallel = self.edge_order[self.arc_start[a]:self.arc_end[a]]
+            minutes = lo['edge_minutes'][parallel] * (1 - f) + hi['edge_minutes'][parallel] * f
+            e = int(parallel[minutes.argmin()])
+            eids.append(e)
+            congestion.append(lo['edge_weight'][e] * (1 - f) + hi['edge_weight'][e] * f)
+            t += lo['cost'][a] + max(hi['cost'][a] - lo['cost'][a], -60.0) * f
+
+        arcs = np.asarray(arcs, dtype=np.int64)
+        node_idx = np.concatenate(([source], self.arc_target[arcs])).astype(np.int64)
+        return {
+            'nodes': [self._node_id_list[i] for i in node_idx.tolist()],
+            'node_index': node_idx,
+            'edges': np.asarray(eids, dtype=np.int64),
+            'congestion': np.asarray(congestion, dtype=np.float64),
+            'cost': arrival[target],
+            'settled': settled,
+            'hours': len(hours),
+            'algorithm': 'time_dependent'
+        }
+
+    def _path_result(self, arcs, source, cost, prepared, settled):
+        arcs = np.asarray(arcs, dtype=np.int64)
+        node_idx = np.concatenate(([source], self.arc_target[arcs])).astype(np.int64)
+        return {
+            'nodes': [self._node_id_list[i] for i in node_idx.tolist()],
+            'node_index': node_idx,
+            'edges': prepared.arc_eid[arcs],
+            'cost': cost,
+            'settled': settled,
+            'weights': prepared
+        }
+
+    def route_summary(self, path):
+        """Distance, base time and congestion figures for a path, computed from the edge arrays"""
+        eids = path['edges']
+        node_idx = path['node_index']
+        congestion_factor = path['congestion'] if 'congestion' in path else path['weights'].edge_weight[eids]
+        distance_mi = self.edge_length[eids] / METERS_PER_MILE
+        if 'fractions' in path:
+            distance_mi = distance_mi * path['fractions']
+        base_time = distance_mi * (60 / BASE_SPEED_MPH)
+        actual_time = base_time * (1.0 + congestion_factor * CONGESTION_SCALE)
+        congestion_impact = actual_time - base_time
+        congestion_level = np.minimum(1.0, congestion_factor / CONGESTION_LEVEL_MAX)
+
+        if 'coords' in path:
+            coords = path['coords']
+        else:
+            coords = list(zip(self.node_y[node_idx].tolist(), self.node_x[node_idx].tolist()))
+        edges = [
+            {
+                'start': coords[i],
+                'end': coords[i + 1],
+                'distance': d,
+                'base_time': b,
+                'actual_time': a,
+                'congestion_impact': c,
+                'congestion_level': l
+            }
+            for i, (d, b, a, c, l) in enumerate(zip(
+                distance_mi.tolist(), base_time.tolist(), actual_time.tolist(),
+                congestion_impact.tolist(), congestion_level.tolist()))
+        ]
+        total_distance = float(distance_mi.sum())
+        total_base_time = float(base_time.sum())
+        total_congestion_effect = float(congestion_impact.sum())
+        return {
+            'route_nodes': path['nodes'],
+            'route_coords': coords,
+            'edges': edges,
+            'estimated_travel_time': round(total_base_time + total_congestion_effect, 1),
+            'base_travel_time': round(total_base_time, 1),
+            'congestion_delay': round(total_congestion_effect, 1),
+            'distance_miles': round(total_distance, 1),
+            'route_length': len(path['nodes'])
+        }
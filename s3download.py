@@ -1,56 +1,370 @@
-import boto3
+#!/usr/bin/env python3
+"""Parallel, verified, resumable sync of the project's data and model artifacts
+
+Usage: python s3download.py [--source s3://bucket | DIR] [--workers 8] [--only data|models] [--verify]
+"""
 import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
 from botocore import UNSIGNED
 from botocore.config import Config
 
-def download_from_s3():
-    dir_data = 'static/data'
-    dir_model = 'static/models'
+BUCKET_NAME = 'cse6242-project-team81'
+DATA_DIR = 'static/data'
+MODEL_DIR = 'static/models'
+
+DATA_FILES = [
+    'filtered_location_counts.csv',
+    'state_year_data.csv',
+    'us-states.json'
+]
+
+MODEL_FILES = [
+    'edge_weights.pkl',
+    'nyc_graph.pkl',
+    'traffic_model.txt',
+    'x_columns.json'
+]
+
+# Optional {key: {"size": ..., "sha256": ...}} object published next to the artifacts
+MANIFEST_KEY = 'manifest.json'
+
+# Ranged-read size, concurrent transfers and attempts per range
+CHUNK_SIZE = 8 * 1024 * 1024
+SYNC_WORKERS = 8
+MAX_ATTEMPTS = 4
+RETRY_BACKOFF = 0.5
+
+# Per-directory record of verified files: {key: {"size", "etag"}}
+SYNC_STATE_FILE = '.sync_state.json'
+
+# Artifacts the app rewrites locally (recalculated edge weights): an existing copy is kept even
+# when it no longer matches the source
+LOCAL_ARTIFACTS = {'edge_weights.pkl'}
+
+class S3Source:
+    """Artifacts in an S3 bucket (or an S3-compatible endpoint such as a local stand-in)"""
+
+    def __init__(self, bucket=BUCKET_NAME, endpoint_url=None):
+        self.bucket = bucket
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or os.environ.get('S3_ENDPOINT_URL'),
+                                   config=Config(signature_version=UNSIGNED, max_pool_connections=SYNC_WORKERS * 2,
+                                                 connect_timeout=5, read_timeout=30, retries={'max_attempts': 2}))
 
-    data_files = [
-        'filtered_location_counts.csv',
-        'state_year_data.csv',
-        'us-states.json'
-    ]
+    def head(self, key):
+        """(size, etag) of an object"""
+        response = self.client.head_object(Bucket=self.bucket, Key=key)
+        return response['ContentLength'], response['ETag'].strip('"')
 
-    model_files = [
-        'edge_weights.pkl',
-        'nyc_graph.pkl',
-        'route_cache.pkl',
-        'traffic_model.txt',
-        'x_columns.json'
-    ]
+    def read_range(self, key, start, end):
+        """Bytes [start, end] (inclusive) of an object"""
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f'bytes={start}-{end}')
+        return response['Body'].read()
 
-    if not os.path.exists(dir_data):
-        os.makedirs(dir_data)
-    if not os.path.exists(dir_model):
-        os.makedirs(dir_model)
+    def manifest(self):
+        """Published checksum manifest, or None"""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=MANIFEST_KEY)
+            return json.loads(response['Body'].read())
+        except self.client.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            print(f"No checksum manifest available: {e}")
+            return None
 
-    bucket_name = 'cse6242-project-team81'
-    s3 = boto3.client('s3',config=Config(signature_version=UNSIGNED))
+class LocalSource:
+    """Artifacts in a local directory, for offline runs and tests"""
 
+    def __init__(self, directory):
+        self.directory = directory
+
+    def head(self, key):
+        path = os.path.join(self.directory, key)
+        # Single-part S3 ETags are the object's MD5
+        return os.path.getsize(path), file_md5(path)
+
+    def read_range(self, key, start, end):
+        with open(os.path.join(self.directory, key), 'rb') as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def manifest(self):
+        path = os.path.join(self.directory, MANIFEST_KEY)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+def source_from_spec(spec=None):
+    """Source for 's3://bucket', a local directory, or the project bucket by default"""
+    spec = spec or os.environ.get('ARTIFACT_SOURCE', '')
+    if not spec:
+        return S3Source()
+    if spec.startswith('s3://'):
+        return S3Source(spec[len('s3://'):].strip('/'))
+    return LocalSource(spec)
+
+def file_digest(path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_md5(path):
+    return file_digest(path, 'md5')
+
+def load_state(directory):
+    path = os.path.join(directory, SYNC_STATE_FILE)
+    if not os.path.exists(path):
+        return {}
     try:
-        for key in data_files:
-            local_path = os.path.join(dir_data, key)
-            if os.path.exists(local_path):
-                print(f"Skipping {key} - file already exists")
-                continue
-            print(f"Downloading {key}...")
-            s3.download_file(bucket_name, key, local_path)
-            print(f"{key} Saved to {dir_data}")
+        with open(path) as f:
+            return json.load(f)
+    except Exception:
+        return {}
 
-        for key in model_files:
-            local_path = os.path.join(dir_model, key)
-            if os.path.exists(local_path):
-                print(f"Skipping {key} - file already exists")
+def save_state(directory, state):
+    path = os.path.join(directory, SYNC_STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+def verify_file(path, size, etag, expected=None):
+    """Check a downloaded file against the manifest checksum, else the size and simple ETag
+
+    Multipart ETags ('<md5>-<parts>') depend on the uploader's part size,
+    so for those only the size is checked unless the manifest has a checksum.
+    """
+    if os.path.getsize(path) != size:
+        return False, f"size {os.path.getsize(path)} != {size}"
+    if expected and expected.get('sha256'):
+        actual = file_digest(path, 'sha256')
+        return actual == expected['sha256'], f"sha256 {actual}"
+    if etag and '-' not in etag:
+        actual = file_md5(path)
+        return actual == etag, f"md5 {actual} != etag {etag}"
+    return True, 'size only'
+
+class FileSync:
+    """Ranged download of one artifact into a .part file, resumable across runs
+
+    Completed ranges are recorded in '<file>.part.json' so an interrupted
+    sync only fetches the ranges that are still missing.
+    """
+
+    def __init__(self, source, key, local_path, size, etag, chunk_size=CHUNK_SIZE):
+        self.source = source
+        self.key = key
+        self.local_path = local_path
+        self.part_path = local_path + '.part'
+        self.progress_path = local_path + '.part.json'
+        self.size = size
+        self.etag = etag
+        self.chunk_size = chunk_size
+        self.num_chunks = max(1, -(-size // chunk_size))
+        self.done = set()
+        self._lock = threading.Lock()
+        self.resumed_bytes = 0
+        self.fetched_bytes = 0
+        self.retries = 0
+
+        progress = None
+        if os.path.exists(self.part_path) and os.path.exists(self.progress_path):
+            try:
+                with open(self.progress_path) as f:
+                    progress = json.load(f)
+            except Exception:
+                progress = None
+        if progress and progress.get('etag') == etag and progress.get('size') == size \
+                and progress.get('chunk_size') == chunk_size and os.path.getsize(self.part_path) == size:
+            self.done = set(progress['done'])
+            self.resumed_bytes = sum(self._chunk_len(i) for i in self.done)
+        else:
+            with open(self.part_path, 'wb') as f:
+                f.truncate(size)
+            self._save_progress()
+
+    def _chunk_len(self, i):
+        return min(self.chunk_size, self.size - i * self.chunk_size)
+
+    def _save_progress(self):
+        with open(self.progress_path + '.tmp', 'w') as f:
+            json.dump({'etag': self.etag, 'size': self.size, 'chunk_size': self.chunk_size,
+                       'done': sorted(self.done)}, f)
+        os.replace(self.progress_path + '.tmp', self.progress_path)
+
+    def pending_chunks(self):
+        return [i for i in range(self.num_chunks) if i not in self.done]
+
+    def fetch_chunk(self, i):
+        """Download one range with retries; raises after MAX_ATTEMPTS failures"""
+        start = i * self.chunk_size
+        end = start + self._chunk_len(i) - 1
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                data = self.source.read_range(self.key, start, end) if self.size else b''
+                if len(data) != end - start + 1:
+                    raise IOError(f"short read {len(data)} of {end - start + 1} bytes")
+                break
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                self.retries += 1
+                print(f"Retrying {self.key} bytes {start}-{end} (attempt {attempt} failed: {e})")
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        with open(self.part_path, 'r+b') as f:
+            f.seek(start)
+            f.write(data)
+        with self._lock:
+            self.done.add(i)
+            self.fetched_bytes += len(data)
+            self._save_progress()
+
+    def finish(self, expected=None):
+        """Verify the assembled file and move it into place"""
+        ok, detail = verify_file(self.part_path, self.size, self.etag, expected)
+        if not ok:
+            os.remove(self.part_path)
+            os.remove(self.progress_path)
+            raise IOError(f"verification failed for {self.key}: {detail}")
+        os.replace(self.part_path, self.local_path)
+        os.remove(self.progress_path)
+        return detail
+
+def sync_artifacts(groups, source=None, workers=SYNC_WORKERS, chunk_size=CHUNK_SIZE, verify=False,
+                   keep_local=LOCAL_ARTIFACTS):
+    """Bring local artifacts in line with the source
+
+    groups maps a local directory to the keys it should hold. Files already
+    verified at the source's current size/ETag are skipped (re-hashed when
+    verify=True); anything else is downloaded in parallel ranged reads,
+    resuming partial downloads. Existing files named in keep_local are left
+    alone ('local'). Each file succeeds or fails on its own.
+    Returns {key: {"status", ...}}.
+    """
+    source = source or source_from_spec()
+    t_start = time.time()
+    results = {}
+    jobs = []
+    states = {}
+
+    def head(key):
+        try:
+            return source.head(key)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        manifest_future = pool.submit(source.manifest)
+        heads = {key: pool.submit(head, key) for keys in groups.values() for key in keys}
+        manifest = manifest_future.result() or {}
+        heads = {key: future.result() for key, future in heads.items()}
+
+    for directory, keys in groups.items():
+        os.makedirs(directory, exist_ok=True)
+        state = states[directory] = load_state(directory)
+        for key in keys:
+            local_path = os.path.join(directory, key)
+            if key in keep_local and os.path.exists(local_path):
+                results[key] = {'status': 'local', 'size': os.path.getsize(local_path)}
                 continue
-            print(f"Downloading {key}...")
-            s3.download_file(bucket_name, key, local_path)
-            print(f"{key} Saved to {dir_model}")
-        
+            if isinstance(heads[key], Exception):
+                e = heads[key]
+                status = 'kept' if os.path.exists(local_path) else 'failed'
+                results[key] = {'status': status, 'error': f"{type(e).__name__}: {e}"}
+                print(f"Could not check {key} at the source ({e}); {'keeping local copy' if status == 'kept' else 'not downloaded'}")
+                continue
+            size, etag = heads[key]
+            recorded = state.get(key)
+            if os.path.exists(local_path):
+                if not verify and recorded == {'size': size, 'etag': etag} and os.path.getsize(local_path) == size:
+                    results[key] = {'status': 'up-to-date', 'size': size}
+                    continue
+                ok, detail = verify_file(local_path, size, etag, manifest.get(key))
+                if ok:
+                    state[key] = {'size': size, 'etag': etag}
+                    results[key] = {'status': 'verified', 'size': size, 'check': detail}
+                    continue
+                print(f"{key} does not match the source ({detail}); downloading again")
+            jobs.append((directory, key, FileSync(source, key, local_path, size, etag, chunk_size)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for directory, key, job in jobs:
+            if job.resumed_bytes:
+                print(f"Resuming {key}: {job.resumed_bytes}/{job.size} bytes already downloaded")
+            for i in job.pending_chunks():
+                futures[pool.submit(job.fetch_chunk, i)] = key
+        errors = {}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.setdefault(futures[future], f"{type(e).__name__}: {e}")
+
+    for directory, key, job in jobs:
+        stats = {'size': job.size, 'fetched': job.fetched_bytes, 'resumed': job.resumed_bytes, 'retries': job.retries}
+        if key in errors:
+            # The .part file and its progress record stay for the next run to resume
+            results[key] = dict(stats, status='failed', error=errors[key])
+            print(f"Failed to download {key}: {errors[key]}")
+            continue
+        try:
+            check = job.finish(manifest.get(key))
+            states[directory][key] = {'size': job.size, 'etag': job.etag}
+            results[key] = dict(stats, status='downloaded', check=check)
+            print(f"{key} saved to {directory}")
+        except Exception as e:
+            results[key] = dict(stats, status='failed', error=str(e))
+            print(f"Failed to download {key}: {e}")
+
+    for directory, state in states.items():
+        save_state(directory, state)
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print(f"Artifact sync finished in {time.time() - t_start:.2f}s: {counts}")
+    return results
+
+def download_from_s3(data=True, models=True, source=None):
+    groups = {}
+    if data:
+        groups[DATA_DIR] = DATA_FILES
+    if models:
+        groups[MODEL_DIR] = MODEL_FILES
+    try:
+        return sync_artifacts(groups, source)
     except Exception as e:
-        print(f"Failed to download {key}: {e}")
+        print(f"Artifact sync failed: {e}")
+        return {}
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=None, help="s3://bucket or a local directory (default: the project bucket)")
+    parser.add_argument('--workers', type=int, default=SYNC_WORKERS)
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_SIZE // (1024 * 1024))
+    parser.add_argument('--only', choices=('data', 'models'), default=None)
+    parser.add_argument('--verify', action='store_true', help='re-hash files already marked as verified')
+    args = parser.parse_args()
 
+    groups = {}
+    if args.only in (None, 'data'):
+        groups[DATA_DIR] = DATA_FILES
+    if args.only in (None, 'models'):
+        groups[MODEL_DIR] = MODEL_FILES
+    results = sync_artifacts(groups, source_from_spec(args.source), workers=args.workers,
+                             chunk_size=args.chunk_mb * 1024 * 1024, verify=args.verify)
+    for key, result in results.items():
+        print(f"  {key:32s} {result['status']:10s} {result.get('error', result.get('check', ''))}")
+    if any(r['status'] == 'failed' for r in results.values()):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    download_from_s3()
+    main()
@@ -0,0 +1,123 @@
+import os
+import math
+import pickle
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+SPATIAL_INDEX_PATH = 'static/models/nyc_graph.kdtree.pkl'
+EARTH_RADIUS_M = 6371009
+
+# Nearest nodes whose incident arcs are considered when snapping to an edge
+SNAP_CANDIDATE_NODES = 12
+
+class SpatialIndex:
+    """KD-tree over node coordinates in a local equirectangular projection (meters)"""
+
+    def __init__(self, node_x, node_y, ref_lat=None):
+        node_x = np.asarray(node_x, dtype=np.float64)
+        node_y = np.asarray(node_y, dtype=np.float64)
+        self.ref_lat = float(np.mean(node_y)) if ref_lat is None else ref_lat
+        self._kx = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(self.ref_lat))
+        self._ky = math.radians(1) * EARTH_RADIUS_M
+        self.num_nodes = len(node_x)
+        self.points = np.column_stack(self.project(node_y, node_x))
+        self.tree = cKDTree(self.points)
+
+    @classmethod
+    def from_router(cls, router):
+        """Index the nodes of a RoutingGraph"""
+        return cls(router.node_x, router.node_y)
+
+    def project(self, lat, lng):
+        """Local planar coordinates in meters"""
+        return np.asarray(lng) * self._kx, np.asarray(lat) * self._ky
+
+    def unproject(self, x, y):
+        """Inverse of project(): (lat, lng)"""
+        return y / self._ky, x / self._kx
+
+    def nearest_node(self, lat, lng):
+        """Index of and distance (m) to the node closest to a point"""
+        distance, index = self.tree.query(self.project(lat, lng))
+        return int(index), float(distance)
+
+    def nearest_nodes(self, lats, lngs):
+        """Vectorized nearest_node: arrays of node indices and distances"""
+        x, y = self.project(lats, lngs)
+        distances, indices = self.tree.query(np.column_stack((x, y)))
+        return indices, distances
+
+    def nodes_within(self, lat, lng, radius_m):
+        """Indices of nodes within a radius of a point"""
+        return self.tree.query_ball_point(self.project(lat, lng), radius_m)
+
+    def nearest_arc(self, router, lat, lng, k=SNAP_CANDIDATE_NODES):
+        """Snap a point onto the closest arc incident to one of its k nearest nodes
+
+        Returns a dict with the arc, the fraction along it (0 at the tail,
+        1 at the head), the snapped lat/lng and the distance in meters, or
+        None when the candidate nodes have no arcs.
+        """
+        px, py = self.project(lat, lng)
+        _, nodes = self.tree.query((px, py), k=min(k, self.num_nodes))
+        nodes = np.atleast_1d(nodes)
+        arcs = np.unique(np.concatenate(
+            [np.arange(router.offsets[n], router.offsets[n + 1]) for n in nodes.tolist()]
+            + [router.rev_arc_order[router.rev_offsets[n]:router.rev_offsets[n + 1]] for n in nodes.tolist()]
+        ).astype(np.int64))
+        if len(arcs) == 0:
+            return None
+
+        ax, ay = self.points[router.arc_source[arcs]].T
+        bx, by = self.points[router.arc_target[arcs]].T
+        dx, dy = bx - ax, by - ay
+        seg_len2 = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(seg_len2 > 0, ((px - ax) * dx + (py - ay) * dy) / seg_len2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        sx, sy = ax + t * dx, ay + t * dy
+        distances = np.hypot(sx - px, sy - py)
+        best = int(np.argmin(distances))
+        snapped_lat, snapped_lng = self.unproject(sx[best], sy[best])
+        return {
+            'arc': int(arcs[best]),
+            'fraction': float(t[best]),
+            'lat': float(snapped_lat),
+            'lng': float(snapped_lng),
+            'distance': float(distances[best])
+        }
+
+    def matches(self, router):
+        """Check the index was built for this routing graph's nodes"""
+        return self.num_nodes == router.num_nodes and np.allclose(
+            self.points, np.column_stack(self.project(router.node_y, router.node_x)))
+
+    def save(self, path=SPATIAL_INDEX_PATH):
+        """Persist the index next to the graph"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path=SPATIAL_INDEX_PATH):
+        """Load a persisted index, or None"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+def load_or_build_spatial_index(router, path=SPATIAL_INDEX_PATH):
+    """Load the persisted index if it matches the routing graph, else build and save one"""
+    try:
+        index = SpatialIndex.load(path)
+        if index is not None and index.matches(router):
+            return index
+    except Exception as e:
+        print(f"Error loading spatial index: {e}")
+    index = SpatialIndex.from_router(router)
+    try:
+        index.save(path)
+    except Exception as e:
+        print(f"Error saving spatial index: {e}")
+    return index
@@ -0,0 +1,153 @@
+import json
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads for independent startup stages
+STARTUP_WORKERS = 4
+
+def log_event(event, **fields):
+    """One structured (JSON) startup log line"""
+    print("STARTUP " + json.dumps(dict(event=event, time=round(time.time(), 3), **fields)))
+
+class StartupStages:
+    """Dependency-ordered startup stages run concurrently on a thread pool
+
+    Each stage runs once all of its dependencies have finished; a failed
+    stage marks everything that depends on it as skipped. A stage function
+    may return a list of warnings, reported without failing it. Callers can ask
+    whether a set of stages is ready, so parts of the app can serve
+    traffic before the rest has loaded.
+    """
+
+    def __init__(self, workers=STARTUP_WORKERS):
+        self.workers = workers
+        self._stages = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._finished = False
+        self._on_complete = []
+        self._executor = None
+        self.started_at = None
+
+    def add(self, name, fn, deps=()):
+        """Register a stage function taking no arguments"""
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = {'fn': fn, 'deps': tuple(deps), 'status': 'pending',
+                              'started': None, 'duration_ms': None, 'error': None, 'warnings': []}
+        self._order.append(name)
+
+    def on_complete(self, fn):
+        """Call fn(stages) once every stage has finished, failed or been skipped"""
+        self._on_complete.append(fn)
+
+    def start(self):
+        """Submit every stage whose dependencies are met; returns immediately"""
+        self.started_at = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='startup')
+        log_event('startup_begin', stages=self._order, workers=self.workers)
+        self._schedule()
+        return self
+
+    def _schedule(self):
+        with self._lock:
+            runnable = []
+            # Dependencies are registered first, so one pass in order propagates skips
+            for name in self._order:
+                stage = self._stages[name]
+                if stage['status'] != 'pending':
+                    continue
+                dep_status = [self._stages[d]['status'] for d in stage['deps']]
+                if any(s in ('failed', 'skipped') for s in dep_status):
+                    stage['status'] = 'skipped'
+                    log_event('stage_skipped', stage=name, deps=stage['deps'])
+                elif all(s == 'done' for s in dep_status):
+                    stage['status'] = 'running'
+                    runnable.append(name)
+            finish = not self._finished and all(
+                s['status'] in ('done', 'failed', 'skipped') for s in self._stages.values())
+            self._finished = self._finished or finish
+        for name in runnable:
+            self._executor.submit(self._run, name)
+        if finish:
+            self._finish()
+
+    def _run(self, name):
+        stage = self._stages[name]
+        stage['started'] = time.time()
+        log_event('stage_start', stage=name)
+        try:
+            result = stage['fn']()
+            if isinstance(result, (list, tuple)):
+                stage['warnings'] = list(result)
+            stage['status'] = 'done'
+        except Exception as e:
+            stage['status'] = 'failed'
+            stage['error'] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        stage['duration_ms'] = round((time.time() - stage['started']) * 1000, 1)
+        log_event('stage_' + ('end' if stage['status'] == 'done' else 'failed'), stage=name,
+                  duration_ms=stage['duration_ms'], error=stage['error'], warnings=stage['warnings'])
+        self._schedule()
+
+    def _finish(self):
+        total_ms = round((time.time() - self.started_at) * 1000, 1)
+        log_event('startup_end', duration_ms=total_ms, failed=self.failed(),
+                  stage_ms={n: self._stages[n]['duration_ms'] for n in self._order})
+        self._executor.shutdown(wait=False)
+        for fn in self._on_complete:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"Error in startup completion hook: {e}")
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until every stage has finished"""
+        return self._done.wait(timeout)
+
+    def ready(self, names):
+        """True once all the named stages are done"""
+        return all(self._stages[n]['status'] == 'done' for n in names)
+
+    def failed(self, names=None):
+        """Failed or skipped stages among names (default: all)"""
+        names = self._order if names is None else names
+        return [n for n in names if self._stages[n]['status'] in ('failed', 'skipped')]
+
+    def waiting_for(self, names):
+        """Named stages that are not done yet"""
+        return [n for n in names if self._stages[n]['status'] != 'done']
+
+    def error(self, names=None):
+        """First failure message among the named stages, or None"""
+        for n in self.failed(names):
+            stage = self._stages[n]
+            return f"Stage '{n}' {stage['status']}" + (f": {stage['error']}" if stage['error'] else '')
+        return None
+
+    def warnings(self):
+        """{stage: warnings} for the stages that finished with any"""
+        return {n: list(self._stages[n]['warnings']) for n in self._order if self._stages[n]['warnings']}
+
+    def status(self):
+        """Per-stage status, dependencies, durations and warnings"""
+        return {
+            'complete': self._done.is_set(),
+            'elapsed_ms': round((time.time() - self.started_at) * 1000, 1) if self.started_at else None,
+            'warnings': self.warnings(),
+            'stages': {
+                name: {
+                    'status': s['status'],
+                    'deps': list(s['deps']),
+                    'duration_ms': s['duration_ms'],
+                    'started_after_ms': round((s['started'] - self.started_at) * 1000, 1) if s['started'] else None,
+                    'error': s['error'],
+                    'warnings': list(s['warnings'])
+                } for name, s in ((n, self._stages[n]) for n in self._order)
+            }
+        }
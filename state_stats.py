@@ -0,0 +1,169 @@
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from route_format import compress
+
+STATE_YEAR_CSV_PATH = 'static/data/state_year_data.csv'
+STATES_GEOJSON_PATH = 'static/data/us-states.json'
+
+# Color classes of the choropleth (quantile breaks, as chroma.limits(values, 'q', n))
+STATE_CLASSES = 7
+
+# Douglas-Peucker tolerance in degrees (~1km, under a pixel at the data page's zooms)
+STATE_SIMPLIFY_TOLERANCE = 0.01
+# Decimal places kept per simplified coordinate
+STATE_COORD_DECIMALS = 3
+# Feature properties kept in the simplified boundaries
+STATE_PROPERTIES = ('STATE', 'NAME')
+
+def class_breaks(values, classes=STATE_CLASSES):
+    """Quantile class limits (classes + 1 values, min to max) with chroma.js's interpolation"""
+    if len(values) == 0:
+        return []
+    return np.quantile(np.asarray(values, dtype=np.float64), np.linspace(0, 1, classes + 1)).round(2).tolist()
+
+class StateStats:
+    """Incident counts per state and year, indexed by year with precomputed class breaks"""
+
+    def __init__(self, years, codes, counts, version, classes=STATE_CLASSES):
+        self.years = years
+        self.codes = codes
+        # (year, state) counts, NaN where a state has no row for the year
+        self.counts = counts
+        self.version = version
+        self._by_year = {year: self._summarize(i, classes) for i, year in enumerate(years)}
+
+    def _summarize(self, i, classes):
+        present = ~np.isnan(self.counts[i])
+        values = [int(v) if v.is_integer() else v for v in self.counts[i, present].tolist()]
+        codes = [code for code, keep in zip(self.codes, present.tolist()) if keep]
+        return {
+            'year': self.years[i],
+            'values': dict(zip(codes, values)),
+            'breaks': class_breaks(values, classes),
+            'min': min(values, default=0),
+            'max': max(values, default=0)
+        }
+
+    @classmethod
+    def from_frame(cls, frame, version, classes=STATE_CLASSES):
+        """Index a code / Start_Year / Count frame"""
+        frame = frame.dropna(subset=['code', 'Start_Year'])
+        counts = (frame.assign(Count=pd.to_numeric(frame['Count'], errors='coerce'))
+                  .pivot_table(index='Start_Year', columns='code', values='Count', aggfunc='sum'))
+        return cls([int(year) for year in counts.index], [str(code) for code in counts.columns],
+                   counts.to_numpy(np.float64), version, classes)
+
+    @classmethod
+    def from_csv(cls, path=STATE_YEAR_CSV_PATH, classes=STATE_CLASSES):
+        """Load the state/year CSV; the version is a hash of its bytes"""
+        with open(path, 'rb') as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:16]
+        frame = pd.read_csv(path, usecols=['code', 'Start_Year', 'Count'], dtype={'code': str})
+        return cls.from_frame(frame, version, classes)
+
+    def year_stats(self, year=None):
+        """{year, values by state code, breaks, min, max} for a year (the latest if None)"""
+        if year is None:
+            year = self.years[-1]
+        if year not in self._by_year:
+            raise ValueError(f"No data for year {year}.")
+        return self._by_year[year]
+
+def simplify_line(points, tolerance):
+    """Indices of the points Douglas-Peucker keeps from an (n, 2) array"""
+    n = len(points)
+    if n < 3:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        dx, dy = points[b] - points[a]
+        rel = points[a + 1:b] - points[a]
+        length = np.hypot(dx, dy)
+        # Closed rings start and end on the same point: fall back to distance from it
+        dist = np.abs(rel[:, 0] * dy - rel[:, 1] * dx) / length if length else np.hypot(rel[:, 0], rel[:, 1])
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            m = a + 1 + i
+            keep[m] = True
+            stack += [(a, m), (m, b)]
+    return np.flatnonzero(keep)
+
+def simplify_polygon(rings, tolerance, decimals):
+    """Simplified, rounded rings of a polygon; None if its exterior collapses
+
+    Holes that collapse below four points are dropped.
+    """
+    simplified = []
+    for i, ring in enumerate(rings):
+        points = np.asarray(ring, dtype=np.float64)[:, :2]
+        kept = points[simplify_line(points, tolerance)].round(decimals)
+        kept = kept[np.r_[True, np.any(kept[1:] != kept[:-1], axis=1)]]
+        if len(kept) < 4:
+            if i == 0:
+                return None
+            continue
+        simplified.append(kept.tolist())
+    return simplified
+
+def simplify_geometry(geometry, tolerance=STATE_SIMPLIFY_TOLERANCE, decimals=STATE_COORD_DECIMALS):
+    """Polygon / MultiPolygon geometry with simplified, rounded rings
+
+    Islands that collapse are dropped; a geometry left with nothing keeps
+    its rounded, unsimplified rings.
+    """
+    if geometry['type'] == 'Polygon':
+        coordinates = (simplify_polygon(geometry['coordinates'], tolerance, decimals)
+                       or simplify_polygon(geometry['coordinates'], 0, decimals))
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = [simplify_polygon(rings, tolerance, decimals) for rings in geometry['coordinates']]
+        coordinates = ([polygon for polygon in polygons if polygon]
+                       or [polygon for polygon in (simplify_polygon(rings, 0, decimals)
+                                                   for rings in geometry['coordinates']) if polygon])
+    else:
+        return geometry
+    return {'type': geometry['type'], 'coordinates': coordinates}
+
+class StateShapes:
+    """State boundaries simplified and serialized once, with compressed copies made on first use"""
+
+    def __init__(self, body, source_bytes=None):
+        self.body = body
+        self.source_bytes = source_bytes
+        self.version = hashlib.sha1(body).hexdigest()[:16]
+        self._encoded = {}
+
+    @classmethod
+    def from_geojson(cls, geojson, tolerance=STATE_SIMPLIFY_TOLERANCE, decimals=STATE_COORD_DECIMALS,
+                     source_bytes=None):
+        """Simplify a FeatureCollection, keeping STATE_PROPERTIES"""
+        features = [{
+            'type': 'Feature',
+            'properties': {name: feature['properties'].get(name) for name in STATE_PROPERTIES},
+            'geometry': simplify_geometry(feature['geometry'], tolerance, decimals)
+        } for feature in geojson['features'] if feature.get('geometry')]
+        body = json.dumps({'type': 'FeatureCollection', 'features': features}, separators=(',', ':'))
+        return cls(body.encode(), source_bytes)
+
+    @classmethod
+    def from_file(cls, path=STATES_GEOJSON_PATH, tolerance=STATE_SIMPLIFY_TOLERANCE, decimals=STATE_COORD_DECIMALS):
+        """Simplify the us-states.json boundaries"""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return cls.from_geojson(json.loads(raw), tolerance, decimals, source_bytes=len(raw))
+
+    def encoded(self, encoding):
+        """Body compressed with a negotiated encoding (uncompressed for None)"""
+        if encoding is None:
+            return self.body
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compress(self.body, encoding)
+        return self._encoded[encoding]
@@ -28,6 +28,92 @@ function getThemeColors() {
 }
 
 let incidentLayerGroup;
+let congestionLayer;
+
+// Segment colors of the congestion overlay, one per quantized level (as the route's colors)
+function congestionColors() {
+    const colors = getThemeColors();
+    return [colors.low, colors.medium, colors.high, colors.severe];
+}
+
+// City-wide congestion overlay: canvas tiles drawn from /api/congestion-tiles
+// segment lists for the current weight slice, fetched only for visible tiles
+const CongestionLayer = L.GridLayer.extend({
+    createTile: function(coords, done) {
+        const tile = L.DomUtil.create('canvas', 'congestion-tile');
+        const size = this.getTileSize();
+        tile.width = size.x;
+        tile.height = size.y;
+        if (!this.info) {
+            setTimeout(() => done(null, tile), 0);
+            return tile;
+        }
+        const url = this.info.tiles.replace('{z}', coords.z).replace('{x}', coords.x).replace('{y}', coords.y);
+        fetch(url)
+            .then(res => res.json())
+            .then(data => {
+                if (!data.success) {
+                    // The hour's weight slice changed: pick up the new tile URLs
+                    if (data.slice && data.slice !== this.info.slice) this.refresh();
+                    throw new Error(data.error);
+                }
+                this.drawTile(tile, data, coords.z);
+                done(null, tile);
+            })
+            .catch(error => {
+                console.error('Error loading congestion tile:', error);
+                done(error, tile);
+            });
+        return tile;
+    },
+
+    drawTile: function(tile, data, zoom) {
+        const ctx = tile.getContext('2d');
+        const scale = tile.width / data.extent;
+        ctx.lineWidth = zoom < 14 ? 1.5 : zoom < 16 ? 3 : 5;
+        ctx.lineCap = 'round';
+        ctx.globalAlpha = 0.8;
+        const colors = congestionColors();
+        data.levels.forEach((segments, level) => {
+            ctx.strokeStyle = colors[level];
+            ctx.beginPath();
+            for (let i = 0; i < segments.length; i += 4) {
+                ctx.moveTo(segments[i] * scale, segments[i + 1] * scale);
+                ctx.lineTo(segments[i + 2] * scale, segments[i + 3] * scale);
+            }
+            ctx.stroke();
+        });
+    },
+
+    // Load the current weight slice's tile URLs and zoom range, then redraw
+    refresh: function() {
+        return fetch('/api/congestion-tiles')
+            .then(res => res.json())
+            .then(info => {
+                if (!info.success) throw new Error(info.error);
+                if (this.info && this.info.slice === info.slice) return;
+                this.info = info;
+                this.options.minZoom = info.min_zoom;
+                this.options.maxNativeZoom = info.max_zoom;
+                this.redraw();
+            })
+            .catch(error => {
+                console.error('Error loading congestion overlay:', error);
+            });
+    },
+
+    onAdd: function(map) {
+        L.GridLayer.prototype.onAdd.call(this, map);
+        this.refresh();
+        // Weight slices change by the hour
+        this._refreshTimer = setInterval(() => this.refresh(), 10 * 60 * 1000);
+    },
+
+    onRemove: function(map) {
+        clearInterval(this._refreshTimer);
+        L.GridLayer.prototype.onRemove.call(this, map);
+    }
+});
 
 // Map initialization
 function initMap() {
@@ -60,7 +146,8 @@ function initMap() {
     
     incidentLayerGroup = L.layerGroup().addTo(map);
 
-    L.control.layers(baseLayers).addTo(map);
+    congestionLayer = new CongestionLayer({ minZoom: 12, maxNativeZoom: 17, maxZoom: 19, zIndex: 5 });
+    L.control.layers(baseLayers, { "Congestion": congestionLayer }).addTo(map);
 
 }
 
@@ -85,6 +172,10 @@ function applyTheme() {
             createHeatmapLayer(lastRouteData);
         }
     }
+
+    if (congestionLayer && map.hasLayer(congestionLayer)) {
+        congestionLayer.redraw();
+    }
 }
 
 function toggleTheme() {
@@ -206,13 +297,15 @@ function calculateRoute() {
             start: start,
             end: end,
             date: date,
-            time: time
+            time: time,
+            format: 'compact'
         })
     })
     .then(response => response.json())
     .then(data => {
         hideLoading();
         if (data.success) {
+            data.route = expandRoute(data.route);
             lastRouteData = data.route;
             
             // Get weather data to enhance the route display
@@ -235,6 +328,50 @@ function calculateRoute() {
     });
 }
 
+// Decode an encoded polyline into [lat, lng] pairs
+function decodePolyline(encoded, precision) {
+    const factor = Math.pow(10, precision || 5);
+    const coords = [];
+    let index = 0, lat = 0, lng = 0;
+    while (index < encoded.length) {
+        const deltas = [];
+        for (let axis = 0; axis < 2; axis++) {
+            let result = 0, shift = 0, byte;
+            do {
+                byte = encoded.charCodeAt(index++) - 63;
+                result |= (byte & 0x1f) << shift;
+                shift += 5;
+            } while (byte >= 0x20);
+            deltas.push(result & 1 ? ~(result >> 1) : result >> 1);
+        }
+        lat += deltas[0];
+        lng += deltas[1];
+        coords.push([lat / factor, lng / factor]);
+    }
+    return coords;
+}
+
+// Rebuild route_coords and per-edge objects from a compact route response
+function expandRoute(route) {
+    if (!route || route.format !== 'compact') return route;
+    const coords = decodePolyline(route.polyline, route.precision);
+    const columns = route.edges;
+    const edges = columns.distance.map((distance, i) => ({
+        start: coords[i],
+        end: coords[i + 1],
+        distance: distance,
+        base_time: columns.base_time[i],
+        actual_time: columns.actual_time[i],
+        congestion_impact: columns.actual_time[i] - columns.base_time[i],
+        congestion_level: columns.congestion_level[i]
+    }));
+    const expanded = Object.assign({}, route, { route_coords: coords, edges: edges });
+    if (route.alternatives) {
+        expanded.alternatives = route.alternatives.map(expandRoute);
+    }
+    return expanded;
+}
+
 // Marker creation
 function createMarkers(start, end) {
     if (startMarker) map.removeLayer(startMarker);
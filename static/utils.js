@@ -1,16 +1,14 @@
 function buildMap()  {const bucket_name = 'cse6242-project-team81';
 
     const state_year_data = `s3://${bucket_name}/state_year_data.csv`;
-    const location_counts = `s3://${bucket_name}/filtered_location_counts.csv`;
     const us_states = `s3://${bucket_name}/us-states.json`;
     
     // Load and parse the data
     Promise.all([
         fetch(state_year_data).then(res => res.text()).then(d3.csvParse),
-        fetch(location_counts).then(res => res.text()).then(d3.csvParse),
         fetch(us_states).then(res => res.json())
     ])
-    .then(([state_year_data, location_counts, us_states]) => {
+    .then(([state_year_data, us_states]) => {
     
         var map = L.map('map').setView([37.8, -96], 4);
           L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
@@ -52,16 +50,8 @@ function buildMap()  {const bucket_name = 'cse6242-project-team81';
           }).addTo(map);
     
           // ----- Heatmap Layer Setup -----
-          // Convert CSV data into an array of points for leaflet.heat.
-          // Each point should be in the form: [latitude, longitude, intensity]
-          var heatArray = location_counts.map(d => [
-            parseFloat(d.Start_Lat), 
-            parseFloat(d.Start_Lng), 
-            parseFloat(d.Count) || 1  // default weight to 1 if not provided
-          ]);
-    
-          // Create the heatmap layer with desired options and add it to the map.
-          var heat = L.heatLayer(heatArray, {
+          // Bins for the visible area come from /api/heatmap as the map moves
+          var heat = incrementalHeatmap(map, {}, {
             radius: 25,
             blur: 15,
             maxZoom: 17,
@@ -73,6 +63,90 @@ function buildMap()  {const bucket_name = 'cse6242-project-team81';
     });
 }
 
+// Heatmap layer fed with /api/heatmap bins for the visible 256px tiles.
+// Tiles are fetched once per zoom level (stable URLs, so the browser cache
+// and ETags apply) and dropped when the zoom or the query params change.
+function incrementalHeatmap(map, params, heatOptions) {
+    const heat = L.heatLayer([], heatOptions);
+    const tiles = new Map();  // "z/x/y" -> [[lat, lng, count], ...], null while loading
+    let zoom = null;
+    let generation = 0;  // bumped whenever loaded tiles are dropped, so late responses are ignored
+
+    function reset() {
+        generation++;
+        tiles.clear();
+        heat.setLatLngs([]);
+    }
+
+    // Bounding box just inside a tile, so it never reaches into a neighbour's bins
+    function tileBbox(x, y, z) {
+        const n = Math.pow(2, z);
+        const inset = 1 / 64;
+        const lng = t => t / n * 360 - 180;
+        const lat = t => Math.atan(Math.sinh(Math.PI * (1 - 2 * t / n))) * 180 / Math.PI;
+        return [lng(x + inset), lat(y + 1 - inset), lng(x + 1 - inset), lat(y + inset)]
+            .map(v => v.toFixed(6)).join(',');
+    }
+
+    function redraw() {
+        const points = [];
+        tiles.forEach(bins => {
+            if (bins) bins.forEach(bin => points.push(bin));
+        });
+        heat.setLatLngs(points);
+    }
+
+    function load() {
+        if (!map.hasLayer(heat)) return;
+        const z = Math.round(map.getZoom());
+        if (z !== zoom) {
+            zoom = z;
+            reset();
+        }
+        const current = generation;
+        const n = Math.pow(2, z);
+        const bounds = map.getBounds();
+        const nw = map.project(bounds.getNorthWest(), z).divideBy(256).floor();
+        const se = map.project(bounds.getSouthEast(), z).divideBy(256).floor();
+        for (let x = nw.x; x <= se.x; x++) {
+            for (let y = Math.max(nw.y, 0); y <= Math.min(se.y, n - 1); y++) {
+                const tileX = ((x % n) + n) % n;
+                const key = `${z}/${tileX}/${y}`;
+                if (tiles.has(key)) continue;
+                tiles.set(key, null);
+                const query = new URLSearchParams(Object.assign({ bbox: tileBbox(tileX, y, z), zoom: z }, params));
+                fetch(`/api/heatmap?${query}`)
+                    .then(res => res.json())
+                    .then(data => {
+                        if (generation !== current) return;
+                        if (!data.success) {
+                            console.error('Error loading heatmap bins:', data.error);
+                            return;
+                        }
+                        tiles.set(key, data.bins);
+                        redraw();
+                    })
+                    .catch(error => {
+                        if (generation === current) tiles.delete(key);
+                        console.error('Error loading heatmap bins:', error);
+                    });
+            }
+        }
+    }
+
+    // Swap the query params (e.g. the year) and reload the visible tiles
+    heat.setParams = function(newParams) {
+        params = newParams;
+        reset();
+        load();
+        return heat;
+    };
+
+    map.on('moveend', load);
+    heat.on('add', load);
+    return heat;
+}
+
 // function formatHeatMapData(data) {
 //     return data.map(item => [item.Start_Lat, item.Start_Lng, item.Count]);
 // }
@@ -0,0 +1,24 @@
+"""Shared fixtures for the endpoint tests"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup import StartupStages
+
+@pytest.fixture
+def api(monkeypatch):
+    """The app module with every endpoint's startup stages marked done, and a test client
+
+    Tests set the globals an endpoint reads (HEATMAP, STATE_STATS, ...) with monkeypatch.
+    """
+    app = pytest.importorskip('app')
+    stages = StartupStages()
+    for name in sorted({name for names in app.ENDPOINT_STAGES.values() for name in names}):
+        stages.add(name, lambda: None)
+    stages.start()
+    assert stages.wait(timeout=10)
+    monkeypatch.setattr(app, 'STARTUP', stages)
+    return app, app.app.test_client()
@@ -0,0 +1,141 @@
+"""CongestionTiles rendering, caching and invalidation, and the /api/congestion-tiles endpoints
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import json
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import RoutingGraph, CONGESTION_LEVEL_MAX
+from congestion_tiles import (CongestionTiles, mercator_xy, clip_segments, CONGESTION_CLASSES,
+                              CONGESTION_TILE_EXTENT, CONGESTION_TILE_BUFFER)
+from test_routing import random_graph
+
+# The whole test graph falls inside one tile at this zoom
+WHOLE_ZOOM = 14
+
+@pytest.fixture
+def tiles():
+    G = random_graph(size=8, seed=9)
+    router = RoutingGraph.from_graph(G)
+    return G, router, CongestionTiles(router)
+
+def tile_of(router, node, z):
+    x, y = mercator_xy(router.node_y[router.node_index[node]], router.node_x[router.node_index[node]])
+    return int(x * (1 << z)), int(y * (1 << z))
+
+def segments(levels, c):
+    return {tuple(levels[c][i:i + 4]) for i in range(0, len(levels[c]), 4)}
+
+def test_clip_segments():
+    kept, x0, y0, x1, y1 = clip_segments(np.array([-5.0, 1.0, 20.0]), np.array([5.0, 1.0, 20.0]),
+                                         np.array([15.0, 2.0, 30.0]), np.array([5.0, 2.0, 30.0]), 0, 0, 10, 10)
+    assert kept.tolist() == [True, True, False]
+    assert (x0[0], y0[0], x1[0], y1[0]) == (0, 5, 10, 5)
+    assert (x0[1], y0[1], x1[1], y1[1]) == (1, 1, 2, 2)
+
+def test_every_street_is_one_segment_in_one_class(tiles):
+    G, router, congestion = tiles
+    x, y = tile_of(router, 0, WHOLE_ZOOM)
+    assert all(tile_of(router, node, WHOLE_ZOOM) == (x, y) for node in G.nodes)
+    levels = congestion.render(router.prepare(np.zeros(router.num_edges)), WHOLE_ZOOM, x, y)
+    assert len(levels[0]) == 4 * congestion.num_segments
+    assert not any(levels[1:])
+    saturated = congestion.render(router.prepare(np.full(router.num_edges, CONGESTION_LEVEL_MAX)), WHOLE_ZOOM, x, y)
+    assert saturated[CONGESTION_CLASSES - 1] == levels[0]
+
+def test_segments_take_their_most_congested_direction(tiles):
+    G, router, congestion = tiles
+    z = WHOLE_ZOOM
+    x, y = tile_of(router, 0, z)
+    # One direction of a two-way street jammed, the other clear
+    u, v = next((u, v) for u, v in G.edges() if G.has_edge(v, u))
+    weights = np.zeros(router.num_edges)
+    weights[[i for i, (a, b) in enumerate(G.edges()) if (a, b) == (u, v)]] = CONGESTION_LEVEL_MAX
+    levels = congestion.render(router.prepare(weights), z, x, y)
+    scale = (1 << z) * CONGESTION_TILE_EXTENT
+    ends = sorted((int(np.rint(congestion._node_x[i] * scale - x * CONGESTION_TILE_EXTENT)),
+                   int(np.rint(congestion._node_y[i] * scale - y * CONGESTION_TILE_EXTENT)))
+                  for i in (router.node_index[u], router.node_index[v]))
+    assert segments(levels, CONGESTION_CLASSES - 1) == {tuple(ends[0] + ends[1])}
+    assert len(levels[0]) == 4 * (congestion.num_segments - 1)
+
+def test_deep_tiles_are_clipped_to_their_buffer(tiles):
+    G, router, congestion = tiles
+    z = 17
+    prepared = router.prepare(np.ones(router.num_edges))
+    covered = {tile_of(router, node, z) for node in G.nodes}
+    total = 0
+    for x, y in covered:
+        levels = congestion.render(prepared, z, x, y)
+        coords = np.array(sum(levels, []))
+        assert np.all((coords >= -CONGESTION_TILE_BUFFER) & (coords <= CONGESTION_TILE_EXTENT + CONGESTION_TILE_BUFFER))
+        total += len(coords) // 4
+    assert total >= congestion.num_segments
+    assert not any(congestion.render(prepared, z, 0, 0))
+
+def test_tiles_are_cached_per_slice(tiles):
+    G, router, congestion = tiles
+    x, y = tile_of(router, 0, WHOLE_ZOOM)
+    prepared = router.prepare(np.ones(router.num_edges))
+    body, etag = congestion.get('a', prepared, WHOLE_ZOOM, x, y)
+    assert congestion.get('a', prepared, WHOLE_ZOOM, x, y) == (body, etag)
+    assert json.loads(body)['slice'] == 'a'
+    other, other_etag = congestion.get('b', router.prepare(np.zeros(router.num_edges)), WHOLE_ZOOM, x, y)
+    assert other_etag != etag
+    status = congestion.status()
+    assert (status['hits'], status['misses'], status['size']) == (1, 2, 2)
+
+def test_invalidation_drops_only_overlapping_tiles(tiles):
+    G, router, congestion = tiles
+    z = 17
+    prepared = router.prepare(np.ones(router.num_edges))
+    covered = sorted({tile_of(router, node, z) for node in G.nodes})
+    for x, y in covered + [(0, 0)]:
+        congestion.get('a', prepared, z, x, y)
+    assert congestion.invalidate_arcs([]) == 0
+
+    node = next(iter(G.nodes))
+    arcs = np.flatnonzero(router.arc_source == router.node_index[node])
+    dropped = congestion.invalidate_arcs(arcs)
+    assert 0 < dropped < len(covered)
+    # The arc's own tile is regenerated, a far away tile is still cached
+    x, y = tile_of(router, node, z)
+    misses = congestion.stats['misses']
+    congestion.get('a', prepared, z, x, y)
+    congestion.get('a', prepared, z, 0, 0)
+    assert congestion.stats['misses'] == misses + 1
+    assert congestion.status()['size'] == len(covered) + 1
+
+def test_info_endpoint(api, monkeypatch):
+    app, client = api
+    monkeypatch.setattr(app, 'current_congestion_slice', lambda: (None, 'forecast/8'))
+    body = client.get('/api/congestion-tiles').get_json()
+    assert body['success'] and body['slice'] == 'forecast/8'
+    assert body['tiles'] == '/api/congestion-tiles/forecast%2F8/{z}/{x}/{y}'
+    assert (body['extent'], body['classes']) == (CONGESTION_TILE_EXTENT, CONGESTION_CLASSES)
+
+def test_tile_endpoint(api, tiles, monkeypatch):
+    app, client = api
+    G, router, congestion = tiles
+    monkeypatch.setattr(app, 'ROUTER', router)
+    monkeypatch.setattr(app, 'CONGESTION_TILES', congestion)
+    monkeypatch.setattr(app, 'current_congestion_slice', lambda: (np.ones(router.num_edges), 'hour'))
+    x, y = tile_of(router, 0, WHOLE_ZOOM)
+    url = f'/api/congestion-tiles/hour/{WHOLE_ZOOM}/{x}/{y}'
+    response = client.get(url)
+    body = response.get_json()
+    assert body['success'] and sum(len(level) for level in body['levels']) == 4 * congestion.num_segments
+    etag = response.headers['ETag']
+    assert etag.startswith('W/') and 'public' in response.headers['Cache-Control']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    stale = client.get(f'/api/congestion-tiles/yesterday/{WHOLE_ZOOM}/{x}/{y}').get_json()
+    assert stale['success'] is False and stale['slice'] == 'hour'
+    for z, x, y in ((11, 0, 0), (18, 0, 0), (12, 4096, 0)):
+        assert client.get(f'/api/congestion-tiles/hour/{z}/{x}/{y}').get_json()['success'] is False
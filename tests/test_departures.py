@@ -0,0 +1,67 @@
+"""Departure sweeps checked against a shortest path search per departure bucket
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import RoutingGraph
+from departures import sweep_departures
+from test_routing import random_graph, node_pairs
+
+@pytest.fixture(scope='module')
+def graph():
+    G = random_graph(size=8, seed=21)
+    router = RoutingGraph.from_graph(G)
+    rng = np.random.default_rng(8)
+    base = router.base.source_weight
+    # Default weights, then hours that get busier and then quieter, each with its own noise
+    slices = [(None, None)] + [(base * scale * rng.lognormal(0, 0.3, len(base)), f"hour:{h}")
+                               for h, scale in enumerate([1.0, 1.5, 2.0, 1.2, 0.8])]
+    return G, router, slices
+
+def test_exact_sweep_matches_a_search_per_bucket(graph):
+    G, router, slices = graph
+    for source, target in node_pairs(G, count=10, seed=2):
+        sweep = sweep_departures(router, source, target, slices, search_every=1, alternatives=1)
+        assert sweep['searches'] == len(slices)
+        for b, (weights, key) in enumerate(slices):
+            path = router.shortest_path(source, target, weights=weights, key=key)
+            assert sweep['cost'][b] == pytest.approx(path['cost'], rel=1e-9)
+
+def test_path_set_sweep_is_never_cheaper_than_exact(graph):
+    G, router, slices = graph
+    for source, target in node_pairs(G, count=10, seed=3):
+        exact = sweep_departures(router, source, target, slices, search_every=1, alternatives=1)
+        sweep = sweep_departures(router, source, target, slices, search_every=3)
+        # Buckets 0 (with two penalty-method alternatives), 3 and the last
+        assert sweep['searches'] == 5
+        assert np.all(sweep['cost'] >= exact['cost'] * (1 - 1e-9))
+        # Buckets that ran a full search price their own shortest path
+        for b in (0, len(slices) - 1):
+            assert sweep['cost'][b] == pytest.approx(exact['cost'][b], rel=1e-9)
+
+def test_best_departure_is_the_fastest_bucket(graph):
+    G, router, slices = graph
+    source, target = node_pairs(G, count=1, seed=4)[0]
+    sweep = sweep_departures(router, source, target, slices)
+    assert sweep['best'] == int(np.argmin(sweep['minutes']))
+    best = sweep['best_path']
+    assert best['nodes'][0] == source and best['nodes'][-1] == target
+    assert best['cost'] == pytest.approx(sweep['cost'][sweep['best']])
+    summary = router.route_summary(best)
+    assert summary['estimated_travel_time'] == pytest.approx(sweep['minutes'][sweep['best']], abs=0.05)
+    assert summary['distance_miles'] == pytest.approx(sweep['miles'][sweep['best']], abs=0.05)
+
+def test_unreachable_target_raises():
+    G = random_graph(size=4)
+    G.add_node(10 ** 6, y=40.71, x=-73.99)
+    router = RoutingGraph.from_graph(G)
+    with pytest.raises(nx.NetworkXNoPath):
+        sweep_departures(router, 0, 10 ** 6, [(None, None)])
@@ -0,0 +1,74 @@
+"""LocalGeocoder street matching and intersection resolution
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocoder import LocalGeocoder, canonical_street, street_aliases, in_outline, BOROUGH_OUTLINES
+
+def street_grid():
+    """Avenues 1st-3rd crossing East/West 40th-42nd Streets, plus a divided Park Ave at 42nd St"""
+    G = nx.MultiDiGraph()
+    for a in range(3):
+        for s in range(3):
+            G.add_node((a, s), y=40.750 + s * 0.001, x=-73.980 + a * 0.002)
+    for a in range(3):
+        name = f"{a + 1}{['st', 'nd', 'rd'][a]} Avenue"
+        for s in range(2):
+            G.add_edge((a, s), (a, s + 1), name=name)
+    for s in range(3):
+        for a in range(2):
+            G.add_edge((a, s), (a + 1, s), name=f"{'East' if a else 'West'} {40 + s}th Street")
+    # Both carriageways of Park Ave meet 42nd St, 30m apart
+    G.add_node('park_n', y=40.7520, x=-73.9770)
+    G.add_node('park_s', y=40.7520, x=-73.9766)
+    G.add_edge((2, 2), 'park_n', name='East 42nd Street')
+    G.add_edge('park_n', 'park_s', name=['Park Avenue', 'East 42nd Street'])
+    return G
+
+@pytest.fixture(scope='module')
+def geocoder():
+    return LocalGeocoder.from_graph(street_grid())
+
+def test_canonical_street_spellings():
+    assert canonical_street('Fifth Avenue') == canonical_street('5 av') == '5th ave'
+    assert canonical_street('West 34th Street') == 'w 34th st'
+    assert street_aliases('East 42nd Street') == {'e 42nd st', '42nd st'}
+
+@pytest.mark.parametrize('address, node', [
+    ('1st ave & 40th st', (0, 0)),
+    ('Second Avenue and East 41st Street, New York, NY', (1, 1)),
+    ('42 st @ 3 av', (2, 2)),
+    ('3rd Avenu / 41st Street', (2, 1)),
+])
+def test_resolves_intersections(geocoder, address, node):
+    assert geocoder.resolve(address)['node'] == node
+
+def test_divided_road_resolves_to_one_node(geocoder):
+    match = geocoder.resolve('park ave & 42nd st')
+    assert match['node'] in ('park_n', 'park_s')
+    assert match['streets'] == ('park ave', '42nd st')
+
+def test_unresolvable_addresses(geocoder):
+    assert geocoder.resolve('350 5th Avenue') is None
+    assert geocoder.resolve('1st ave & 2nd ave') is None
+    assert geocoder.resolve('Nonexistent Rd & Imaginary Ln') is None
+
+def test_borough_picks_among_same_named_intersections():
+    twins = LocalGeocoder({'1st ave': {1, 2, 3}, '1st st': {1, 2, 3}},
+                          {1: (40.7231, -73.9845), 2: (40.7232, -73.9843), 3: (40.6745, -73.9955)})
+    assert twins.resolve('1st ave & 1st st') is None
+    assert twins.resolve('1st Avenue & 1st Street, Manhattan, NY')['node'] in (1, 2)
+    assert twins.resolve('1st ave and 1st st, brooklyn')['node'] == 3
+    assert twins.resolve('1st ave & 1st st, the bronx') is None
+
+def test_borough_outlines():
+    assert in_outline((40.7580, -73.9855), BOROUGH_OUTLINES['manhattan'])
+    assert in_outline((40.6782, -73.9442), BOROUGH_OUTLINES['brooklyn'])
+    assert not in_outline((40.6782, -73.9442), BOROUGH_OUTLINES['manhattan'])
@@ -0,0 +1,95 @@
+"""Heatmap bins and the /api/heatmap endpoint
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from heatmap import HeatmapBins, load_or_build_heatmap, HEATMAP_MAX_ZOOM
+
+def location_frame(seed=2):
+    """Counts clustered around Manhattan and Chicago over two years"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for lat, lng in ((40.75, -73.98), (41.88, -87.63)):
+        for year in (2019, 2020):
+            points = rng.normal((lat, lng), 0.05, (200, 2))
+            rows.append(pd.DataFrame({'Start_Lat': points[:, 0], 'Start_Lng': points[:, 1],
+                                      'Count': rng.integers(1, 5, 200), 'Start_Year': year}))
+    return pd.concat(rows, ignore_index=True)
+
+@pytest.fixture(scope='module')
+def frame():
+    return location_frame()
+
+@pytest.fixture(scope='module')
+def bins(frame):
+    return HeatmapBins.from_frame(frame, 'v1')
+
+def in_box(frame, south, west, north, east):
+    return frame[frame.Start_Lat.between(south, north) & frame.Start_Lng.between(west, east)]
+
+def test_bins_sum_the_counts_in_a_box(bins, frame):
+    box = (40.0, -75.0, 41.5, -73.0)
+    for zoom in (3, 8, 12):
+        level, lat, lng, count, year_max = bins.query(*box, zoom=zoom)
+        assert level == zoom
+        assert count.sum() == pytest.approx(in_box(frame, *box).Count.sum())
+        assert np.all((lat >= 40.0) & (lat <= 41.5) & (lng >= -75.0) & (lng <= -73.0))
+        assert count.max() <= year_max
+
+def test_year_filter(bins, frame):
+    box = (40.0, -90.0, 43.0, -70.0)
+    _, _, _, count, _ = bins.query(*box, zoom=6, year=2020)
+    assert count.sum() == pytest.approx(frame[frame.Start_Year == 2020].Count.sum())
+    _, _, _, count, _ = bins.query(*box, zoom=6)
+    assert count.sum() == pytest.approx(frame.Count.sum())
+    with pytest.raises(ValueError):
+        bins.query(*box, zoom=6, year=1999)
+
+def test_zoom_is_clamped_and_coarsened_to_fit(bins):
+    assert bins.query(40.0, -75.0, 41.5, -73.0, zoom=30)[0] == HEATMAP_MAX_ZOOM
+    level, _, _, count, _ = bins.query(40.0, -75.0, 41.5, -73.0, zoom=12, max_bins=10)
+    assert level < 12 and len(count) <= 10
+
+def test_index_is_rebuilt_when_the_csv_changes(tmp_path, frame):
+    csv_path = str(tmp_path / 'counts.csv')
+    index_path = str(tmp_path / 'bins.npz')
+    frame.to_csv(csv_path, index=False)
+    built = load_or_build_heatmap(csv_path, index_path)
+    loaded = load_or_build_heatmap(csv_path, index_path)
+    assert loaded.version == built.version and loaded.years == [2019, 2020]
+    np.testing.assert_array_equal(loaded.levels[5][3], built.levels[5][3])
+    frame.head(100).to_csv(csv_path, index=False)
+    assert load_or_build_heatmap(csv_path, index_path).version != built.version
+
+def test_endpoint_serves_bins_under_a_weak_etag(api, bins, monkeypatch):
+    app, client = api
+    monkeypatch.setattr(app, 'HEATMAP', bins)
+    url = '/api/heatmap?bbox=-75,40,-73,41.5&zoom=8&year=2019'
+    response = client.get(url)
+    body = response.get_json()
+    assert response.status_code == 200 and body['success'] and body['zoom'] == 8 and body['year'] == 2019
+    assert all(len(b) == 3 for b in body['bins']) and body['bins']
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'public' in response.headers['Cache-Control']
+    # Weak and strong forms of the tag both revalidate
+    for tag in (etag, etag[2:]):
+        revalidated = client.get(url, headers={'If-None-Match': tag})
+        assert revalidated.status_code == 304 and revalidated.data == b''
+    assert client.get('/api/heatmap?bbox=-75,40,-73,41.5&zoom=8&year=2020').headers['ETag'] != etag
+
+@pytest.mark.parametrize('query', ['bbox=1,2,3&zoom=5', 'zoom=5', 'bbox=-75,40,-73,41.5&zoom=5&year=1999'])
+def test_endpoint_reports_bad_queries(api, bins, monkeypatch, query):
+    app, client = api
+    monkeypatch.setattr(app, 'HEATMAP', bins)
+    body = client.get(f'/api/heatmap?{query}').get_json()
+    assert body['success'] is False and body['error']
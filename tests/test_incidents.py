@@ -0,0 +1,110 @@
+"""IncidentStore edge delays: overlap, replacement, expiry and the cached slices they patch
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import RoutingGraph, CONGESTION_SCALE
+from spatial import SpatialIndex
+from incidents import IncidentStore, SEVERITY_DELAYS, ROAD_CLOSED_DELAY
+from test_routing import random_graph, node_pairs
+
+@pytest.fixture
+def graph():
+    G = random_graph(size=8, seed=17)
+    router = RoutingGraph.from_graph(G)
+    changes = []
+    store = IncidentStore(router, SpatialIndex.from_router(router),
+                          on_change=lambda arcs, lifted: changes.append((set(arcs.tolist()), lifted)))
+    return G, router, store, changes
+
+def at_node(router, node):
+    i = router.node_index[node]
+    return float(router.node_y[i]), float(router.node_x[i])
+
+def delayed(weights, delay):
+    return weights * delay + (delay - 1.0) / CONGESTION_SCALE
+
+def test_incident_delays_the_edges_around_it(graph):
+    G, router, store, changes = graph
+    record = store.add(*at_node(router, 27), severity=3, incident_id='crash')
+    edges = np.flatnonzero(router.edge_delay > 1)
+    assert record['id'] == 'crash' and record['edges'] == len(edges) > 0
+    assert np.all(router.edge_delay[edges] == SEVERITY_DELAYS[3])
+    # Every edge into or out of the node is slowed
+    i = router.node_index[27]
+    assert {e for e in range(router.num_edges) if i in (router.edge_u[e], router.edge_v[e])} <= set(edges.tolist())
+    np.testing.assert_allclose(router.base.edge_weight[edges], delayed(router.base.source_weight[edges], SEVERITY_DELAYS[3]))
+    assert changes == [(set(router.edge_arc[edges].tolist()), False)]
+
+def test_cached_slices_match_a_fresh_prepare(graph):
+    G, router, store, _ = graph
+    overlay = [d['overlay'] for _, _, d in G.edges(data=True)]
+    cached = router.prepare(overlay, key='overlay')
+    store.add(*at_node(router, 27), severity=2)
+    store.add(*at_node(router, 44), closed=True)
+    fresh = router.prepare(overlay)
+    np.testing.assert_allclose(cached.edge_weight, fresh.edge_weight)
+    np.testing.assert_allclose(cached.arc_weight, fresh.arc_weight)
+    assert cached.cost == pytest.approx(list(fresh.arc_weight))
+
+def test_routes_price_incident_delays(graph):
+    G, router, store, _ = graph
+    store.add(*at_node(router, 27), severity=3)
+    store.add(*at_node(router, 36), closed=True)
+    for (u, v, d), weight in zip(G.edges(data=True), router.base.edge_weight.tolist()):
+        d['delayed'] = weight
+    for source, target in node_pairs(G, count=20, seed=6):
+        path = router.shortest_path(source, target)
+        assert path['cost'] == pytest.approx(nx.shortest_path_length(G, source, target, weight='delayed'), rel=1e-9)
+
+def test_overlapping_incidents_take_the_largest_delay(graph):
+    G, router, store, changes = graph
+    lat, lng = at_node(router, 27)
+    store.add(lat, lng, severity=1, incident_id='minor')
+    store.add(lat, lng, closed=True, incident_id='closure')
+    edges = np.flatnonzero(router.edge_delay > 1)
+    assert np.all(router.edge_delay[edges] == ROAD_CLOSED_DELAY)
+    assert store.remove('closure')
+    assert changes[-1][1] is True
+    assert np.all(router.edge_delay[edges] == SEVERITY_DELAYS[1])
+    assert not store.remove('closure')
+    assert store.remove('minor')
+    assert router.delayed_edges == 0
+    np.testing.assert_array_equal(router.base.edge_weight, router.base.source_weight)
+
+def test_reposting_an_incident_replaces_it(graph):
+    G, router, store, changes = graph
+    store.add(*at_node(router, 27), severity=3, incident_id='crash')
+    store.add(*at_node(router, 52), severity=1, incident_id='crash')
+    assert len(store) == 1 and store.stats['replaced'] == 1
+    assert changes[-1][1] is True
+    i = router.node_index[27]
+    old_edges = [e for e in range(router.num_edges) if router.edge_u[e] == i]
+    assert np.all(router.edge_delay[old_edges] == 1.0)
+    assert set(np.unique(router.edge_delay).tolist()) == {1.0, SEVERITY_DELAYS[1]}
+
+def test_incidents_expire(graph):
+    G, router, store, changes = graph
+    store.add(*at_node(router, 27), severity=2, ttl=60, incident_id='short')
+    store.add(*at_node(router, 52), severity=2, ttl=600, incident_id='long')
+    assert store.expire(now=time.time() + 120) == 1
+    assert [incident['id'] for incident in store.incidents()] == ['long']
+    assert changes[-1][1] is True
+    assert store.expire(now=time.time() + 1200) == 1
+    assert len(store) == 0 and router.delayed_edges == 0
+
+@pytest.mark.parametrize('kwargs', [{'severity': 7}, {'radius_m': 0}, {'radius_m': 5000}, {'ttl': 0}, {'ttl': 10 ** 6}])
+def test_invalid_incidents_are_rejected(graph, kwargs):
+    G, router, store, _ = graph
+    with pytest.raises(ValueError):
+        store.add(*at_node(router, 27), **kwargs)
+    assert len(store) == 0 and router.delayed_edges == 0
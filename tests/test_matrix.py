@@ -0,0 +1,72 @@
+"""TravelTimeMatrix cells checked against single route searches
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import RoutingGraph, METERS_PER_MILE, BASE_SPEED_MPH, CONGESTION_SCALE
+from matrix import TravelTimeMatrix
+from test_routing import random_graph
+
+@pytest.fixture(scope='module')
+def router():
+    G = random_graph(size=7, seed=9)
+    # An isolated node: unreachable from and to everything else
+    G.add_node(10 ** 6, y=40.72, x=-73.98)
+    return RoutingGraph.from_graph(G)
+
+def path_figures(router, path):
+    """(minutes, miles) of a searched path, summed the way route_summary does"""
+    eids = path['edges']
+    miles = router.edge_length[eids] / METERS_PER_MILE
+    minutes = miles * (60 / BASE_SPEED_MPH) * (1.0 + path['weights'].edge_weight[eids] * CONGESTION_SCALE)
+    return minutes.sum(), miles.sum()
+
+def test_cells_match_route_searches(router):
+    rng = np.random.default_rng(4)
+    origins = rng.choice(router.num_nodes - 1, 6, replace=False)
+    destinations = rng.choice(router.num_nodes - 1, 5, replace=False)
+    minutes, miles = TravelTimeMatrix(router, router.base).compute(origins, destinations)
+    assert minutes.shape == miles.shape == (6, 5) and minutes.dtype == np.float32
+    for i, origin in enumerate(origins.tolist()):
+        for j, destination in enumerate(destinations.tolist()):
+            try:
+                path = router.shortest_path(router.node_id(origin), router.node_id(destination))
+            except nx.NetworkXNoPath:
+                assert np.isnan(minutes[i, j]) and np.isnan(miles[i, j])
+                continue
+            expected_minutes, expected_miles = path_figures(router, path)
+            assert minutes[i, j] == pytest.approx(expected_minutes, rel=1e-5, abs=1e-6)
+            assert miles[i, j] == pytest.approx(expected_miles, rel=1e-5, abs=1e-6)
+
+def test_unreachable_cells_are_nan(router):
+    isolated = router.node_index[10 ** 6]
+    minutes, miles = TravelTimeMatrix(router, router.base).compute([0, isolated], [isolated, 1])
+    assert np.isnan(minutes[0, 0]) and np.isnan(minutes[1, 1]) and np.isnan(miles[0, 0])
+    assert minutes[1, 0] == 0 and miles[1, 0] == 0
+    assert np.isfinite(minutes[0, 1])
+
+def test_blocks_and_repeated_origins_do_not_change_results(router):
+    origins = [3, 8, 3, 20, 8, 0, 41]
+    destinations = list(range(0, 49, 4))
+    matrix = TravelTimeMatrix(router, router.base)
+    whole = matrix.compute(origins, destinations)
+    blocked = matrix.compute(origins, destinations, block_size=2)
+    np.testing.assert_array_equal(whole[0], blocked[0])
+    np.testing.assert_array_equal(whole[1], blocked[1])
+    np.testing.assert_array_equal(whole[0][0], whole[0][2])
+
+def test_weight_slice_changes_travel_times(router):
+    slow = router.prepare(router.base.source_weight * 3, key='slow')
+    base_minutes, base_miles = TravelTimeMatrix(router, router.base).compute([0], [48])
+    slow_minutes, slow_miles = TravelTimeMatrix(router, slow).compute([0], [48])
+    assert slow_minutes[0, 0] > base_minutes[0, 0]
+    # Tripling every weight keeps the same cheapest path
+    assert slow_miles[0, 0] == pytest.approx(base_miles[0, 0])
@@ -0,0 +1,75 @@
+"""NodeStore persistence, eviction, legacy import and concurrent writers
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import pickle
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from node_store import NodeStore
+
+def test_mappings_persist_across_instances(tmp_path):
+    path = str(tmp_path / 'nodes.sqlite')
+    store = NodeStore(path)
+    store.put('5th ave & 42nd st', 42, 40.75, -73.98)
+    store.flush()
+    assert store.get('5th ave & 42nd st') == 42
+    assert store.get('unknown') is None
+    assert (store.stats['hits'], store.stats['misses']) == (1, 1)
+
+    reopened = NodeStore(path)
+    assert len(reopened) == 1 and '5th ave & 42nd st' in reopened
+    assert reopened.get('5th ave & 42nd st') == 42
+
+def test_least_recently_used_rows_are_evicted(tmp_path):
+    store = NodeStore(str(tmp_path / 'nodes.sqlite'), max_entries=3)
+    for i, key in enumerate(['a', 'b', 'c']):
+        store.put(key, i)
+        store.flush()
+    store.get('a')
+    store.flush()
+    store.put('d', 3)
+    store.flush()
+    assert len(store) == 3
+    assert store.get('b') is None
+    assert [store.get(key) for key in ['a', 'c', 'd']] == [0, 2, 3]
+    assert store.stats['evictions'] == 1
+
+def test_replacing_a_mapping_does_not_count_as_growth(tmp_path):
+    store = NodeStore(str(tmp_path / 'nodes.sqlite'), max_entries=2)
+    store.put('a', 1)
+    store.put('b', 2)
+    store.flush()
+    store.put('a', 10)
+    store.flush()
+    assert len(store) == 2 and store._count == 2
+    assert store.get('a') == 10 and store.get('b') == 2
+    assert store.stats['evictions'] == 0
+
+def test_legacy_pickle_is_imported_once(tmp_path):
+    legacy_path = str(tmp_path / 'node_cache.pkl')
+    with open(legacy_path, 'wb') as f:
+        pickle.dump({'a': 1, 'b': 2}, f)
+    store = NodeStore(str(tmp_path / 'nodes.sqlite'))
+    assert store.import_pickle(legacy_path) == 2
+    assert store.import_pickle(legacy_path) == 0
+    assert store.get('b') == 2
+    assert store.import_pickle(str(tmp_path / 'missing.pkl')) == 0
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    store = NodeStore(str(tmp_path / 'nodes.sqlite'))
+    def write(w):
+        for i in range(500):
+            store.put(f"{w} writer {i}", w * 1000 + i)
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    assert len(store) == 2000
+    assert store.stats['write_errors'] == 0
+    assert store.get('3 writer 499') == 3499
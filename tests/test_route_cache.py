@@ -0,0 +1,103 @@
+"""RouteCache expiry, LRU eviction, log replay/compaction and segment invalidation
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from route_cache import (RouteCache, ttl_for_weight_key, route_segments, DEFAULT_WEIGHTS_TTL,
+                         TABLE_WEIGHTS_TTL)
+
+def route(*nodes):
+    return {'route_nodes': list(nodes), 'distance_miles': len(nodes)}
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'route_cache.log')
+
+def test_ttl_by_weight_key():
+    assert ttl_for_weight_key(None) == DEFAULT_WEIGHTS_TTL
+    assert ttl_for_weight_key('default') == DEFAULT_WEIGHTS_TTL
+    assert ttl_for_weight_key('table:10:2') == TABLE_WEIGHTS_TTL
+    assert 0 < ttl_for_weight_key('forecast:20240101_0800:1:abcd1234') <= 3600
+
+def test_expired_entry_is_a_miss(log_path):
+    cache = RouteCache(log_path)
+    cache.put((1, 2, 'default'), route(1, 2), ttl=-1)
+    cache.put((2, 3, 'default'), route(2, 3), ttl=60)
+    assert cache.get((1, 2, 'default')) is None
+    assert cache.get((2, 3, 'default')) == route(2, 3)
+    assert cache.stats['expirations'] == 1
+    assert len(cache) == 1
+
+def test_least_recently_used_entry_is_evicted(log_path):
+    cache = RouteCache(log_path, max_entries=2)
+    cache.put((1, 2, 'default'), route(1, 2), ttl=60)
+    cache.put((2, 3, 'default'), route(2, 3), ttl=60)
+    cache.get((1, 2, 'default'))
+    cache.put((3, 4, 'default'), route(3, 4), ttl=60)
+    assert cache.get((2, 3, 'default')) is None
+    assert cache.get((1, 2, 'default')) == route(1, 2)
+    assert cache.stats['evictions'] == 1
+
+def test_log_replay_keeps_the_newest_live_record(log_path):
+    cache = RouteCache(log_path, version='v1')
+    cache.put((1, 2, 'default'), route(1, 2), ttl=60)
+    cache.put((1, 2, 'default'), route(1, 5, 2), ttl=60)
+    cache.put((2, 3, 'default'), route(2, 3), ttl=60)
+    cache.put((3, 4, 'default'), route(3, 4), ttl=-1)
+    cache.invalidate([(2, 3, 'default')])
+    cache.flush()
+
+    replayed = RouteCache(log_path, version='v1')
+    assert replayed.load() == 1
+    assert replayed.get((1, 2, 'default')) == route(1, 5, 2)
+    assert replayed.get((2, 3, 'default')) is None
+    assert replayed.get((3, 4, 'default')) is None
+
+def test_transient_entries_are_not_logged(log_path):
+    cache = RouteCache(log_path, version='v1')
+    cache.put((1, 2, 'default'), route(1, 2), ttl=60, transient=True)
+    cache.put((2, 3, 'default'), route(2, 3), ttl=60)
+    cache.flush()
+    assert cache.invalidate_transient() == 1
+    assert cache.get((1, 2, 'default')) is None
+
+    replayed = RouteCache(log_path, version='v1')
+    assert replayed.load() == 1
+    assert replayed.get((2, 3, 'default')) == route(2, 3)
+
+def test_log_of_another_version_is_discarded(log_path):
+    cache = RouteCache(log_path, version='v1')
+    cache.put((1, 2, 'default'), route(1, 2), ttl=60)
+    cache.flush()
+
+    assert RouteCache(log_path, version='v2').load() == 0
+    assert not os.path.exists(log_path)
+
+def test_compaction_rewrites_only_live_entries(log_path):
+    cache = RouteCache(log_path, max_entries=3, version='v1')
+    for i in range(20):
+        cache.put((i, i + 1, 'default'), route(i, i + 1), ttl=60)
+    cache.flush()
+    assert cache.status()['log_records'] <= 2 * cache.max_entries
+
+    replayed = RouteCache(log_path, max_entries=3, version='v1')
+    assert replayed.load() == 3
+    assert [replayed.get((i, i + 1, 'default')) for i in (17, 18, 19)] == [route(17, 18), route(18, 19), route(19, 20)]
+
+def test_segment_invalidation_drops_only_routes_over_it(log_path):
+    cache = RouteCache(log_path)
+    cache.put((1, 3, 'default'), route(1, 2, 3), ttl=60)
+    cache.put((4, 6, 'default'), route(4, 5, 6), ttl=60)
+    cache.put((('arc', 7), 9, 'default'), route(8, 9), ttl=60)
+    assert cache.invalidate_segments([(2, 3)]) == 1
+    assert cache.get((1, 3, 'default')) is None
+    assert cache.get((4, 6, 'default')) == route(4, 5, 6)
+    # A snapped start point's arc counts as a segment the route drives
+    assert cache.invalidate_segments([('arc', 7)]) == 1
+    assert cache.status()['indexed_segments'] == len(route_segments((4, 6, 'default'), route(4, 5, 6)))
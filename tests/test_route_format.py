@@ -0,0 +1,81 @@
+"""Polyline encoding, compact routes and response compression
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import gzip
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import Accept
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import route_format
+from route_format import encode_polyline, decode_polyline, compact_route, negotiate_encoding, compress
+
+def reference_encode(coords, precision=5):
+    """Google's polyline algorithm, one value at a time"""
+    out = []
+    previous = (0, 0)
+    for lat, lng in coords:
+        point = (int(round(lat * 10 ** precision)), int(round(lng * 10 ** precision)))
+        for value in (point[0] - previous[0], point[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        previous = point
+    return ''.join(out)
+
+def test_documented_example():
+    coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(coords) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@') == pytest.approx(coords)
+
+def test_matches_the_reference_encoder():
+    rng = np.random.default_rng(1)
+    # A street-level walk, plus long jumps and repeated points
+    coords = np.cumsum(rng.normal(0, 0.001, (300, 2)), axis=0) + (40.75, -73.98)
+    coords[100] = coords[99]
+    coords[200:] += (5.0, -10.0)
+    coords = [tuple(point) for point in coords.tolist()]
+    for precision in (5, 6):
+        encoded = encode_polyline(coords, precision)
+        assert encoded == reference_encode(coords, precision)
+        assert np.abs(np.subtract(decode_polyline(encoded, precision), coords)).max() <= 0.5 / 10 ** precision + 1e-12
+
+def test_empty_and_single_point():
+    assert encode_polyline([]) == ''
+    assert decode_polyline(encode_polyline([(0.0, 0.0)])) == [(0.0, 0.0)]
+
+def route(coords, alternatives=None):
+    edges = [{'start': a, 'end': b, 'distance': 0.123456, 'base_time': 0.25, 'actual_time': 0.31234,
+              'congestion_impact': 0.06234, 'congestion_level': 0.5} for a, b in zip(coords[:-1], coords[1:])]
+    result = {'route_nodes': list(range(len(coords))), 'route_coords': coords, 'edges': edges,
+              'estimated_travel_time': 0.9, 'distance_miles': 0.4, 'search': {'cached': True}}
+    if alternatives is not None:
+        result['alternatives'] = alternatives
+    return result
+
+def test_compact_route_keeps_geometry_totals_and_alternatives():
+    coords = [(40.75, -73.98), (40.751, -73.981), (40.752, -73.979)]
+    full = route(coords, alternatives=[route(coords[::-1])])
+    compact = compact_route(full)
+    assert compact['format'] == 'compact' and 'route_nodes' not in compact and 'route_coords' not in compact
+    assert decode_polyline(compact['polyline']) == pytest.approx(coords)
+    assert compact['edges']['distance'] == [0.1235, 0.1235]
+    assert compact['edges']['actual_time'] == [0.312, 0.312]
+    assert set(compact['edges']) == set(route_format.EDGE_COLUMN_DECIMALS)
+    assert compact['estimated_travel_time'] == 0.9 and compact['search'] == {'cached': True}
+    assert decode_polyline(compact['alternatives'][0]['polyline']) == pytest.approx(coords[::-1])
+
+def test_encoding_negotiation_and_compression(monkeypatch):
+    body = b'{"route": "' + b'x' * 4096 + b'"}'
+    assert negotiate_encoding(Accept([('gzip', 1)])) == 'gzip'
+    assert negotiate_encoding(Accept([('identity', 1)])) is None
+    assert gzip.decompress(compress(body, 'gzip')) == body
+    monkeypatch.setattr(route_format, 'brotli', None)
+    assert negotiate_encoding(Accept([('br', 1), ('gzip', 0.5)])) == 'gzip'
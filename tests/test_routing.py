@@ -0,0 +1,87 @@
+"""RoutingGraph shortest paths checked against networkx on small synthetic graphs
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import RoutingGraph
+from contraction import ContractionHierarchy
+
+def random_graph(size=8, seed=3):
+    """Jittered grid MultiDiGraph with one-way streets, parallel edges and diagonals, random weights"""
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph()
+    for r in range(size):
+        for c in range(size):
+            G.add_node(r * size + c, y=40.70 + r * 0.001 + rng.uniform(-2e-4, 2e-4),
+                       x=-74.00 + c * 0.0013 + rng.uniform(-2e-4, 2e-4))
+
+    def add(u, v):
+        length = float(np.hypot(G.nodes[u]['y'] - G.nodes[v]['y'], G.nodes[u]['x'] - G.nodes[v]['x']) * 1e5)
+        G.add_edge(u, v, length=length, weight=float(rng.uniform(0.1, 3.0)), overlay=float(rng.uniform(0.1, 3.0)))
+
+    for r in range(size):
+        for c in range(size):
+            u = r * size + c
+            for v in ([u + 1] if c + 1 < size else []) + ([u + size] if r + 1 < size else []):
+                add(u, v)
+                if rng.random() < 0.8:
+                    add(v, u)
+                if rng.random() < 0.15:
+                    add(u, v)
+            if r + 1 < size and c + 1 < size and rng.random() < 0.2:
+                add(u, u + size + 1)
+    return G
+
+def node_pairs(G, count=40, seed=5):
+    rng = np.random.default_rng(seed)
+    nodes = list(G.nodes)
+    pairs = []
+    while len(pairs) < count:
+        source, target = (nodes[i] for i in rng.choice(len(nodes), 2, replace=False))
+        if nx.has_path(G, source, target):
+            pairs.append((source, target))
+    return pairs
+
+@pytest.fixture(scope='module')
+def graph():
+    G = random_graph()
+    router = RoutingGraph.from_graph(G)
+    router.attach_hierarchy(ContractionHierarchy.build(router, router.base))
+    return G, router
+
+@pytest.mark.parametrize('algorithm', ['dijkstra', 'astar', 'bidirectional', 'ch'])
+def test_shortest_path_matches_networkx(graph, algorithm):
+    G, router = graph
+    for source, target in node_pairs(G):
+        expected = nx.shortest_path(G, source, target, weight='weight')
+        expected_cost = nx.shortest_path_length(G, source, target, weight='weight')
+        path = router.shortest_path(source, target, algorithm=algorithm)
+        assert path['algorithm'] == algorithm
+        assert path['cost'] == pytest.approx(expected_cost, rel=1e-9)
+        assert path['nodes'] == expected
+        # Each step takes the cheapest of its parallel edges
+        for (u, v), eid in zip(zip(expected[:-1], expected[1:]), path['edges'].tolist()):
+            assert router.base.edge_weight[eid] == min(d['weight'] for d in G[u][v].values())
+
+def test_weight_overlay_matches_networkx(graph):
+    G, router = graph
+    overlay = [d['overlay'] for _, _, d in G.edges(data=True)]
+    for source, target in node_pairs(G, seed=11):
+        path = router.shortest_path(source, target, weights=overlay, key='overlay')
+        assert path['cost'] == pytest.approx(nx.shortest_path_length(G, source, target, weight='overlay'), rel=1e-9)
+        assert path['nodes'] == nx.shortest_path(G, source, target, weight='overlay')
+
+def test_unreachable_target_raises():
+    G = random_graph(size=4)
+    G.add_node(10 ** 6, y=40.71, x=-73.99)
+    router = RoutingGraph.from_graph(G)
+    with pytest.raises(nx.NetworkXNoPath):
+        router.shortest_path(0, 10 ** 6)
@@ -0,0 +1,112 @@
+"""sync_artifacts against a local source: skips, verification, resume and kept local files
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import s3download
+from s3download import LocalSource, sync_artifacts, MANIFEST_KEY
+
+CHUNK = 16
+
+class FlakySource(LocalSource):
+    """Local source whose range reads of one key fail after a number of successful reads"""
+
+    def __init__(self, directory, key, good_reads):
+        super().__init__(directory)
+        self.key = key
+        self.good_reads = good_reads
+        self.reads = []
+        self._lock = threading.Lock()
+
+    def read_range(self, key, start, end):
+        with self._lock:
+            self.reads.append((key, start))
+            if key == self.key:
+                if self.good_reads <= 0:
+                    raise IOError('connection reset')
+                self.good_reads -= 1
+        return super().read_range(key, start, end)
+
+@pytest.fixture
+def source_dir(tmp_path):
+    directory = tmp_path / 'source'
+    directory.mkdir()
+    (directory / 'a.csv').write_bytes(bytes(range(100)))
+    (directory / 'b.json').write_bytes(b'{"b": 1}')
+    return str(directory)
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(s3download, 'RETRY_BACKOFF', 0)
+
+def sync(target, source, **kwargs):
+    return sync_artifacts({str(target): ['a.csv', 'b.json']}, source, workers=2, chunk_size=CHUNK, **kwargs)
+
+def statuses(results):
+    return {key: result['status'] for key, result in results.items()}
+
+def test_downloads_then_skips_verified_files(tmp_path, source_dir):
+    target = tmp_path / 'local'
+    assert statuses(sync(target, LocalSource(source_dir))) == {'a.csv': 'downloaded', 'b.json': 'downloaded'}
+    assert (target / 'a.csv').read_bytes() == bytes(range(100))
+
+    source = FlakySource(source_dir, None, 0)
+    assert statuses(sync(target, source)) == {'a.csv': 'up-to-date', 'b.json': 'up-to-date'}
+    assert source.reads == []
+    assert statuses(sync(target, source, verify=True)) == {'a.csv': 'verified', 'b.json': 'verified'}
+
+def test_changed_source_file_is_downloaded_again(tmp_path, source_dir):
+    target = tmp_path / 'local'
+    sync(target, LocalSource(source_dir))
+    with open(os.path.join(source_dir, 'b.json'), 'wb') as f:
+        f.write(b'{"b": 2}')
+    assert statuses(sync(target, LocalSource(source_dir)))['b.json'] == 'downloaded'
+    assert (target / 'b.json').read_bytes() == b'{"b": 2}'
+
+def test_interrupted_download_resumes_missing_ranges(tmp_path, source_dir):
+    target = tmp_path / 'local'
+    flaky = FlakySource(source_dir, 'a.csv', 3)
+    results = sync(target, flaky)
+    assert results['a.csv']['status'] == 'failed' and results['b.json']['status'] == 'downloaded'
+    assert not (target / 'a.csv').exists() and (target / 'a.csv.part').exists()
+
+    source = FlakySource(source_dir, None, 0)
+    results = sync(target, source)
+    assert results['a.csv']['status'] == 'downloaded'
+    assert results['a.csv']['resumed'] == 3 * CHUNK
+    assert len([r for r in source.reads if r[0] == 'a.csv']) == -(-100 // CHUNK) - 3
+    assert (target / 'a.csv').read_bytes() == bytes(range(100))
+    assert not (target / 'a.csv.part').exists()
+
+def test_manifest_checksum_mismatch_fails_the_file(tmp_path, source_dir):
+    with open(os.path.join(source_dir, MANIFEST_KEY), 'w') as f:
+        json.dump({'a.csv': {'size': 100, 'sha256': '0' * 64}}, f)
+    target = tmp_path / 'local'
+    results = sync(target, LocalSource(source_dir))
+    assert results['a.csv']['status'] == 'failed' and 'verification failed' in results['a.csv']['error']
+    assert results['b.json']['status'] == 'downloaded'
+    assert not (target / 'a.csv').exists()
+
+def test_local_artifacts_are_kept(tmp_path, source_dir):
+    target = tmp_path / 'local'
+    sync(target, LocalSource(source_dir))
+    (target / 'b.json').write_bytes(b'{"b": "recalculated"}')
+    results = sync(target, LocalSource(source_dir), keep_local={'b.json'})
+    assert results['b.json']['status'] == 'local'
+    assert (target / 'b.json').read_bytes() == b'{"b": "recalculated"}'
+
+def test_unreachable_source_keeps_existing_files(tmp_path, source_dir):
+    target = tmp_path / 'local'
+    sync(target, LocalSource(source_dir))
+    os.remove(os.path.join(source_dir, 'a.csv'))
+    (target / 'b.json').unlink()
+    os.remove(os.path.join(source_dir, 'b.json'))
+    assert statuses(sync(target, LocalSource(source_dir))) == {'a.csv': 'kept', 'b.json': 'failed'}
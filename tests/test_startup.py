@@ -0,0 +1,94 @@
+"""StartupStages ordering, failure propagation and warnings, and the artifact sync stage
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup import StartupStages
+
+def run(stages):
+    stages.start()
+    assert stages.wait(timeout=10)
+    return stages
+
+def test_stages_run_after_their_dependencies():
+    order = []
+    lock = threading.Lock()
+    def stage(name):
+        def fn():
+            with lock:
+                order.append(name)
+        return fn
+    stages = StartupStages(workers=3)
+    stages.add('a', stage('a'))
+    stages.add('b', stage('b'))
+    stages.add('c', stage('c'), deps=('a', 'b'))
+    stages.add('d', stage('d'), deps=('c',))
+    run(stages)
+    assert set(order[:2]) == {'a', 'b'} and order[2:] == ['c', 'd']
+    assert stages.ready(['a', 'b', 'c', 'd'])
+    assert stages.failed() == [] and stages.error() is None
+
+def test_failure_skips_everything_downstream():
+    def broken():
+        raise RuntimeError('no model')
+    completed = []
+    stages = StartupStages()
+    stages.add('model', broken)
+    stages.add('weather', lambda: None)
+    stages.add('weights', lambda: None, deps=('model', 'weather'))
+    stages.add('router', lambda: None, deps=('weights',))
+    stages.on_complete(completed.append)
+    run(stages)
+    status = stages.status()
+    assert status['complete'] and completed == [stages]
+    assert {n: s['status'] for n, s in status['stages'].items()} == {
+        'model': 'failed', 'weather': 'done', 'weights': 'skipped', 'router': 'skipped'}
+    assert stages.failed() == ['model', 'weights', 'router']
+    assert stages.failed(['weather']) == []
+    assert stages.error(['router']) == "Stage 'router' skipped"
+    assert stages.error() == "Stage 'model' failed: RuntimeError: no model"
+    assert stages.waiting_for(['weather', 'router']) == ['router']
+
+def test_returned_warnings_do_not_fail_a_stage():
+    stages = StartupStages()
+    stages.add('sync', lambda: ['edge_weights.pkl kept'])
+    stages.add('load', lambda: None, deps=('sync',))
+    run(stages)
+    assert stages.ready(['sync', 'load'])
+    assert stages.warnings() == {'sync': ['edge_weights.pkl kept']}
+    assert stages.status()['stages']['sync']['warnings'] == ['edge_weights.pkl kept']
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        StartupStages().add('router', lambda: None, deps=('graph',))
+
+@pytest.fixture
+def app_module():
+    return pytest.importorskip('app')
+
+def test_artifact_sync_warns_for_rebuildable_files(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'download_from_s3', lambda **kw: {
+        'nyc_graph.pkl': {'status': 'failed', 'error': 'timeout'},
+        'traffic_model.txt': {'status': 'kept', 'error': 'timeout'},
+        'x_columns.json': {'status': 'up-to-date'}})
+    warnings = app_module.sync_artifacts_stage(models=True)
+    assert len(warnings) == 2
+    assert 'nyc_graph.pkl' in warnings[0] and 'traffic_model.txt' in warnings[1]
+
+def test_artifact_sync_fails_for_files_without_fallback(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'download_from_s3', lambda **kw: {
+        'filtered_location_counts.csv': {'status': 'failed', 'error': 'timeout'}})
+    with pytest.raises(RuntimeError, match='filtered_location_counts.csv'):
+        app_module.sync_artifacts_stage(data=True)
+
+@pytest.mark.parametrize('result', [None, {}])
+def test_artifact_sync_without_results_falls_back_to_local_files(app_module, monkeypatch, result):
+    monkeypatch.setattr(app_module, 'download_from_s3', lambda **kw: result)
+    assert app_module.sync_artifacts_stage(data=True) == ["Artifact sync unavailable; using local files."]
@@ -0,0 +1,113 @@
+"""State counts, boundary simplification and the /api/state-stats and /api/state-shapes endpoints
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import gzip
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_stats import StateStats, StateShapes, class_breaks, simplify_line, simplify_geometry
+
+def state_frame():
+    return pd.DataFrame({
+        'code': ['NY', 'NY', 'CA', 'TX', 'NY', 'CA', None],
+        'Start_Year': [2021, 2021, 2021, 2021, 2022, 2022, 2022],
+        'Count': [10, 5, 40, 7.5, 12, 30, 99]
+    })
+
+def circle(lat, lng, radius, points=400):
+    angles = np.linspace(0, 2 * math.pi, points)
+    ring = np.column_stack((lng + radius * np.cos(angles), lat + radius * np.sin(angles)))
+    ring[-1] = ring[0]
+    return ring.tolist()
+
+def boundaries():
+    return {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'STATE': '36', 'NAME': 'New York', 'CENSUSAREA': 1},
+         'geometry': {'type': 'Polygon', 'coordinates': [circle(43.0, -75.0, 2.0)]}},
+        {'type': 'Feature', 'properties': {'STATE': '44', 'NAME': 'Rhode Island'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [[circle(41.6, -71.5, 0.3)], [circle(41.2, -71.6, 0.001)]]}},
+        {'type': 'Feature', 'properties': {'STATE': '99', 'NAME': 'Nowhere'}, 'geometry': None}
+    ]}
+
+@pytest.fixture(scope='module')
+def stats():
+    return StateStats.from_frame(state_frame(), 'stats-v1')
+
+@pytest.fixture(scope='module')
+def shapes():
+    return StateShapes.from_geojson(boundaries())
+
+def test_year_stats(stats):
+    year = stats.year_stats(2021)
+    assert year['values'] == {'CA': 40, 'NY': 15, 'TX': 7.5}
+    assert (year['min'], year['max']) == (7.5, 40)
+    assert year['breaks'][0] == 7.5 and year['breaks'][-1] == 40 and len(year['breaks']) == 8
+    # Latest year by default; states without a row that year are left out
+    assert stats.year_stats()['values'] == {'CA': 30, 'NY': 12}
+    with pytest.raises(ValueError):
+        stats.year_stats(1999)
+
+def test_class_breaks():
+    assert class_breaks([]) == []
+    assert class_breaks([1, 2, 3, 4, 5], classes=4) == [1, 2, 3, 4, 5]
+    assert class_breaks([5] * 3, classes=2) == [5, 5, 5]
+
+def test_simplify_line_keeps_corners():
+    line = np.array([(0, 0), (1, 0.001), (2, 0), (2, 1), (2, 2.002), (2, 3)], dtype=np.float64)
+    assert simplify_line(line, 0.01).tolist() == [0, 2, 5]
+    # With no tolerance only the exactly collinear points go
+    assert simplify_line(line, 0).tolist() == [0, 1, 2, 5]
+
+def test_simplified_boundaries(shapes):
+    collection = json.loads(shapes.body)
+    assert [f['properties'] for f in collection['features']] == [
+        {'STATE': '36', 'NAME': 'New York'}, {'STATE': '44', 'NAME': 'Rhode Island'}]
+    ring = collection['features'][0]['geometry']['coordinates'][0]
+    assert 4 <= len(ring) < 400 and ring[0] == ring[-1]
+    assert all(round(v, 3) == v for point in ring for v in point)
+    # The tiny island collapses and is dropped; the main island stays
+    assert len(collection['features'][1]['geometry']['coordinates']) == 1
+
+def test_collapsed_geometry_keeps_its_rounded_rings():
+    tiny = {'type': 'Polygon', 'coordinates': [circle(41.2, -71.6, 0.004, points=9)]}
+    simplified = simplify_geometry(tiny, tolerance=1.0)
+    assert len(simplified['coordinates'][0]) >= 4
+
+def test_state_stats_endpoint(api, stats, shapes, monkeypatch):
+    app, client = api
+    monkeypatch.setattr(app, 'STATE_STATS', stats)
+    monkeypatch.setattr(app, 'STATE_SHAPES', shapes)
+    response = client.get('/api/state-stats?year=2021')
+    body = response.get_json()
+    assert body['success'] and body['values'] == {'CA': 40, 'NY': 15, 'TX': 7.5}
+    assert body['shapes'] == f'/api/state-shapes?v={shapes.version}'
+    etag = response.headers['ETag']
+    assert etag.startswith('W/') and 'Accept-Encoding' in response.headers['Vary']
+    assert client.get('/api/state-stats?year=2021', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/state-stats').headers['ETag'] != etag
+    assert client.get('/api/state-stats?year=1999').get_json()['success'] is False
+    assert client.get('/api/state-stats?year=abc').get_json()['success'] is False
+
+def test_state_shapes_endpoint(api, shapes, monkeypatch):
+    app, client = api
+    big = StateShapes.from_geojson(boundaries(), tolerance=0)
+    assert len(big.body) >= app.COMPRESS_MIN_BYTES
+    monkeypatch.setattr(app, 'STATE_SHAPES', big)
+    url = f'/api/state-shapes?v={big.version}'
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == big.body
+    assert 'immutable' in response.headers['Cache-Control']
+    plain = client.get('/api/state-shapes')
+    assert plain.data == big.body and 'Content-Encoding' not in plain.headers
+    assert 'immutable' not in plain.headers['Cache-Control']
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
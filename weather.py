@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NYC_LAT = 40.7128
+NYC_LNG = -74.0060
+WEATHER_GOV_URL = 'https://api.weather.gov'
+WEATHER_USER_AGENT = 'CSE6242-Project NYC traffic routing'
+
+# Seconds before a connection attempt / response read is abandoned
+WEATHER_TIMEOUT = (3.05, 10)
+# Seconds a fetched hourly forecast is considered fresh
+WEATHER_TTL = 15 * 60
+# Seconds between background refreshes, and after a failed one
+WEATHER_REFRESH_INTERVAL = 10 * 60
+WEATHER_RETRY_INTERVAL = 60
+
+# Model features the hourly forecast does not provide
+DEFAULT_WEATHER_FEATURES = {
+    'Humidity(%)': 50,
+    'Visibility(mi)': 10,
+    'Precipitation(in)': 0
+}
+
+def parse_period(period):
+    """Model weather features for one weather.gov hourly forecast period"""
+    return dict(
+        {
+            'Temperature(F)': period['temperature'],
+            'WindSpeed(mph)': int(period['windSpeed'].split()[0]),
+            'Weather_Conditions': period['shortForecast']
+        },
+        **DEFAULT_WEATHER_FEATURES
+    )
+
+def parse_forecast(forecast_data):
+    """(start, end, features) for each period of a weather.gov hourly forecast document"""
+    return [
+        (datetime.fromisoformat(p['startTime']), datetime.fromisoformat(p['endTime']), parse_period(p))
+        for p in forecast_data['properties']['periods']
+    ]
+
+class WeatherGovSource:
+    """Hourly forecast from weather.gov over a shared, connection-pooled session"""
+
+    def __init__(self, base_url=WEATHER_GOV_URL, lat=NYC_LAT, lng=NYC_LNG, timeout=WEATHER_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.lat = lat
+        self.lng = lng
+        self.timeout = timeout
+        self.forecast_url = None
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = WEATHER_USER_AGENT
+        self.session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+        self.session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+    def fetch(self):
+        """Fetch and return the hourly forecast document"""
+        if self.forecast_url is None:
+            response = self.session.get(f'{self.base_url}/points/{self.lat},{self.lng}', timeout=self.timeout)
+            response.raise_for_status()
+            self.forecast_url = response.json()['properties']['forecastHourly']
+        response = self.session.get(self.forecast_url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+class FileSource:
+    """Hourly forecast document read from a local JSON fixture"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+def source_from_env():
+    """Weather source named by WEATHER_SOURCE: a fixture path, a weather.gov-compatible URL, or the default"""
+    spec = os.environ.get('WEATHER_SOURCE', '')
+    if spec.startswith('http://') or spec.startswith('https://'):
+        return WeatherGovSource(base_url=spec)
+    if spec:
+        return FileSource(spec)
+    return WeatherGovSource()
+
+class WeatherProvider:
+    """In-memory hourly forecast kept fresh by a background refresher
+
+    Request paths only read the cached forecast and never fetch: until a
+    forecast has loaded they get None, and a failed refresh keeps serving
+    the last good (possibly stale) forecast while it is retried sooner.
+    """
+
+    def __init__(self, source=None, ttl=WEATHER_TTL, refresh_interval=WEATHER_REFRESH_INTERVAL):
+        self.source = source or source_from_env()
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._periods = []
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+        self.stats = {'fetches': 0, 'fetch_errors': 0, 'last_error': None, 'last_fetch_ms': None}
+
+    def refresh(self):
+        """Fetch and parse the forecast now; returns True on success"""
+        t_start = time.time()
+        try:
+            periods = parse_forecast(self.source.fetch())
+        except Exception as e:
+            self.stats['fetch_errors'] += 1
+            self.stats['last_error'] = f"{type(e).__name__}: {e}"
+            print(f"Error fetching weather data: {e}")
+            return False
+        with self._lock:
+            self._periods = periods
+            self._fetched_at = time.time()
+        self.stats['fetches'] += 1
+        self.stats['last_fetch_ms'] = round((time.time() - t_start) * 1000, 1)
+        return True
+
+    def start(self):
+        """Load the forecast and start the background refresher thread"""
+        if self._refresher is None:
+            interval = self.refresh_interval if self.refresh() else WEATHER_RETRY_INTERVAL
+            self._refresher = threading.Thread(target=self._refresh_loop, args=(interval,),
+                                               name='weather-refresher', daemon=True)
+            self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self, interval):
+        while not self._stop.wait(interval):
+            interval = self.refresh_interval if self.refresh() else WEATHER_RETRY_INTERVAL
+
+    def forecast_for(self, dt=None):
+        """Weather features for the forecast period containing dt (default now), or None
+
+        Times before the forecast (and "now" outside it, e.g. with an old
+        fixture) use its first period; explicit times after its end return
+        None, since they are beyond what weather.gov predicts.
+        """
+        with self._lock:
+            periods = self._periods
+        if not periods:
+            return None
+        explicit = dt is not None
+        if not explicit:
+            dt = datetime.now(timezone.utc)
+        elif dt.tzinfo is None:
+            dt = dt.replace(tzinfo=periods[0][0].tzinfo)
+        for start, end, features in periods:
+            if start <= dt < end:
+                return dict(features)
+        if explicit and dt >= periods[-1][1]:
+            return None
+        return dict(periods[0][2])
+
+    def periods(self):
+        """Cached (start, end, features) forecast periods and the time they were fetched"""
+        with self._lock:
+            return list(self._periods), self._fetched_at
+
+    def current(self):
+        """Weather features for the current forecast hour, or None"""
+        return self.forecast_for()
+
+    def status(self):
+        """Forecast age and fetch counters"""
+        with self._lock:
+            fetched_at = self._fetched_at
+            periods = len(self._periods)
+        age = time.time() - fetched_at if fetched_at else None
+        return dict(
+            self.stats,
+            source=type(self.source).__name__,
+            periods=periods,
+            age_seconds=round(age, 1) if age is not None else None,
+            stale=age is None or age > self.ttl
+        )
@@ -0,0 +1,236 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Rows scored per model.predict call when batching edge inference
+PREDICT_CHUNK_SIZE = 65536
+
+# Lower bound applied to every predicted edge delay
+MIN_EDGE_WEIGHT = 0.1
+
+DEFAULT_LAT = 40.7128
+DEFAULT_LNG = -74.0060
+DEFAULT_LENGTH_M = 100
+METERS_PER_MILE = 1609.34
+
+def weather_condition_flags(X_columns, current_condition):
+    """One-hot weather condition values for a forecast condition string"""
+    return {
+        col: int(col.split('_')[-1] in current_condition)
+        for col in X_columns if col.startswith('Weather_Conditions_')
+    }
+
+def constant_features(current_weather, now, X_columns):
+    """Feature values shared by every edge for one weather/time combination"""
+    features = {
+        'Severity': 2,
+        'Temperature(F)': current_weather['Temperature(F)'],
+        'Humidity(%)': current_weather['Humidity(%)'],
+        'Visibility(mi)': current_weather['Visibility(mi)'],
+        'WindSpeed(mph)': current_weather['WindSpeed(mph)'],
+        'Precipitation(in)': current_weather['Precipitation(in)'],
+        'Start_Hour': now.hour,
+        'Start_Minute': now.minute,
+        'Start_Day': now.day,
+        'Start_Month': now.month,
+        'Start_DayOfWeek': now.weekday(),
+        'Duration_min': 10,
+        'DelayFromFreeFlowSpeed(mins)': 0
+    }
+    features.update(weather_condition_flags(X_columns, current_weather['Weather_Conditions']))
+    return features
+
+def edge_features(edge_data):
+    """Per-edge feature columns for a sequence of edge attribute dicts"""
+    n = len(edge_data)
+    return {
+        'Start_Lat': np.fromiter((d.get('y', DEFAULT_LAT) for d in edge_data), dtype=np.float64, count=n),
+        'Start_Lng': np.fromiter((d.get('x', DEFAULT_LNG) for d in edge_data), dtype=np.float64, count=n),
+        'Distance(mi)': np.fromiter((d.get('length', DEFAULT_LENGTH_M) for d in edge_data), dtype=np.float64, count=n) / METERS_PER_MILE
+    }
+
+def build_feature_matrix(edge_columns, constants, X_columns):
+    """Assemble the model input matrix, broadcasting constant columns across edges"""
+    n = len(next(iter(edge_columns.values())))
+    X = np.empty((n, len(X_columns)), dtype=np.float64)
+    for i, col in enumerate(X_columns):
+        if col in edge_columns:
+            X[:, i] = edge_columns[col]
+        elif col in constants:
+            X[:, i] = constants[col]
+        else:
+            raise KeyError(f"No feature value available for model column '{col}'")
+    return X
+
+def predict_edge_weights(model, X, chunk_size=PREDICT_CHUNK_SIZE):
+    """Score a feature matrix in chunks and clamp to the minimum edge weight"""
+    predictions = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), chunk_size):
+        predictions[start:start + chunk_size] = model.predict(X[start:start + chunk_size])
+    return np.maximum(predictions, MIN_EDGE_WEIGHT)
+
+# Hour-of-week x weather-class weight table
+WEIGHT_TABLE_DIR = 'static/models/weight_table'
+HOURS_PER_WEEK = 168
+OTHER_WEATHER_CLASS = 'Other'
+
+# Non-condition weather features used when precomputing table slices
+REFERENCE_WEATHER = {
+    'Temperature(F)': 55,
+    'WindSpeed(mph)': 5,
+    'Humidity(%)': 50,
+    'Visibility(mi)': 10,
+    'Precipitation(in)': 0
+}
+
+def edge_list(G):
+    """Stable edge index: (u, v, key) tuples in graph iteration order"""
+    return list(G.edges(keys=True))
+
+def hour_of_week(dt):
+    """Hour-of-week bucket (0 = Monday 00:00)"""
+    return dt.weekday() * 24 + dt.hour
+
+def weather_classes(X_columns):
+    """Weather classes known to the model: the dropped baseline plus each one-hot column"""
+    return [OTHER_WEATHER_CLASS] + [
+        col.split('_')[-1] for col in X_columns if col.startswith('Weather_Conditions_')
+    ]
+
+def classify_weather(condition, X_columns):
+    """Map a forecast condition string to the index of its weather class"""
+    classes = weather_classes(X_columns)
+    flags = weather_condition_flags(X_columns, condition or '')
+    for i, name in enumerate(classes[1:], start=1):
+        if weather_condition_flags(X_columns, name) == flags:
+            return i
+    matches = [(len(name), i) for i, name in enumerate(classes[1:], start=1) if name in (condition or '')]
+    return max(matches)[1] if matches else 0
+
+class WeightTable:
+    """Memory-mapped edges x hour-of-week x weather-class weight table"""
+
+    def __init__(self, path=WEIGHT_TABLE_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        self.weights = np.load(os.path.join(path, 'weights.npy'), mmap_mode='r')
+        self.edges = np.load(os.path.join(path, 'edges.npy'), mmap_mode='r')
+        self.ready = np.load(os.path.join(path, 'ready.npy'))
+        self.classes = self.meta['weather_classes']
+
+    @classmethod
+    def load(cls, path=WEIGHT_TABLE_DIR):
+        """Load the table if it has been precomputed"""
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        return cls(path)
+
+    def matches(self, edges):
+        """Check the table was built for this edge index"""
+        if len(edges) != len(self.edges):
+            return False
+        return np.array_equal(np.asarray(edges, dtype=np.int64), self.edges)
+
+    def get_slice(self, hour, weather_class):
+        """Weights for one hour-of-week and weather class, or None if not precomputed"""
+        if not self.ready[hour, weather_class]:
+            return None
+        return self.weights[hour, weather_class]
+
+    def status(self):
+        """Summary of which slices exist"""
+        return {
+            "edges": int(self.weights.shape[2]),
+            "size_mb": round(self.weights.nbytes / (1024 * 1024), 2),
+            "week_start": self.meta['week_start'],
+            "ready_slices": int(self.ready.sum()),
+            "total_slices": int(self.ready.size),
+            "slices": {
+                name: np.flatnonzero(self.ready[:, i]).tolist()
+                for i, name in enumerate(self.classes)
+            }
+        }
+
+def precompute_weight_table(G, model, X_columns, path=WEIGHT_TABLE_DIR, week_start=None,
+                            hours=None, classes=None, reference_weather=None):
+    """Fill hour-of-week x weather-class weight slices, resuming any existing table"""
+    classes_all = weather_classes(X_columns)
+    hours = range(HOURS_PER_WEEK) if hours is None else hours
+    class_ids = range(len(classes_all)) if classes is None else [classes_all.index(c) for c in classes]
+    reference_weather = dict(REFERENCE_WEATHER, **(reference_weather or {}))
+
+    edges = edge_list(G)
+    weights_path = os.path.join(path, 'weights.npy')
+    ready_path = os.path.join(path, 'ready.npy')
+    meta_path = os.path.join(path, 'meta.json')
+
+    table = WeightTable.load(path)
+    if table is not None and table.matches(edges) and table.classes == classes_all:
+        print(f"Resuming weight table with {int(table.ready.sum())} ready slices...")
+        week_start = datetime.fromisoformat(table.meta['week_start'])
+        reference_weather = table.meta['reference_weather']
+        ready = table.ready.copy()
+        del table
+        weights = np.load(weights_path, mmap_mode='r+')
+    else:
+        if week_start is None:
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            week_start = today - timedelta(days=today.weekday())
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'edges.npy'), np.asarray(edges, dtype=np.int64).reshape(-1, 3))
+        weights = np.lib.format.open_memmap(weights_path, mode='w+', dtype=np.float32,
+                                            shape=(HOURS_PER_WEEK, len(classes_all), len(edges)))
+        ready = np.zeros((HOURS_PER_WEEK, len(classes_all)), dtype=bool)
+        np.save(ready_path, ready)
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'weather_classes': classes_all,
+                'week_start': week_start.isoformat(),
+                'reference_weather': reference_weather,
+                'created': datetime.now().isoformat()
+            }, f)
+
+    edge_columns = edge_features([G.edges[u, v, k] for u, v, k in edges])
+    t_start = time.time()
+    computed = 0
+    for hour in hours:
+        now = week_start + timedelta(hours=hour)
+        for c in class_ids:
+            if ready[hour, c]:
+                continue
+            current_weather = dict(reference_weather, Weather_Conditions=classes_all[c] if c else '')
+            X = build_feature_matrix(edge_columns, constant_features(current_weather, now, X_columns), X_columns)
+            weights[hour, c] = predict_edge_weights(model, X)
+            ready[hour, c] = True
+            computed += 1
+        weights.flush()
+        np.save(ready_path, ready)
+    print(f"Computed {computed} weight slices in {time.time() - t_start:.2f}s "
+          f"({int(ready.sum())}/{ready.size} ready).")
+    return ready
+
+def compute_weight_slice(edge_columns, model, current_weather, X_columns, now):
+    """Predict a weight slice for every edge without touching the graph"""
+    X = build_feature_matrix(edge_columns, constant_features(current_weather, now, X_columns), X_columns)
+    return predict_edge_weights(model, X).astype(np.float32)
+
+def compute_weight_slices(edge_columns, model, departures, X_columns, chunk_size=PREDICT_CHUNK_SIZE):
+    """Predict one weight slice per (weather, time) departure in a single batched pass over the edges
+
+    Each model call scores a run of edges for every departure at once, so
+    the feature matrix stays within chunk_size rows however many slices
+    are requested. Returns a (departures x edges) float32 array.
+    """
+    n = len(next(iter(edge_columns.values())))
+    constants = [constant_features(weather, now, X_columns) for weather, now in departures]
+    slices = np.empty((len(constants), n), dtype=np.float32)
+    step = max(chunk_size // max(len(constants), 1), 1)
+    for start in range(0, n, step):
+        columns = {col: values[start:start + step] for col, values in edge_columns.items()}
+        X = np.concatenate([build_feature_matrix(columns, c, X_columns) for c in constants])
+        slices[:, start:start + step] = predict_edge_weights(model, X, chunk_size=len(X)).reshape(len(constants), -1)
+    return slices